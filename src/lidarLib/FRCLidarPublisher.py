@@ -1,18 +1,35 @@
 import threading
 import time
 import ntcore
+import numpy as np
 from wpimath.geometry import Pose2d, Rotation2d
 
 from lidarLib.constants import constants
+from lidarLib.lidarClockSync import lidarClockSync
 from lidarLib.lidarHitboxingMap import lidarHitboxMap
 from lidarLib.lidarMeasurement import lidarMeasurement
 from lidarLib.lidarHitboxNode import lidarHitboxNode
+from lidarLib.lidarObstacleFitting import lidarObstacle
+from lidarLib.lidarObstacleTracker import lidarTrack
+from lidarLib.lidarPoseBuffer import lidarPoseBuffer
+from lidarLib.lidarWireFormat import encodeGridDelta, encodeGridKeyframe, encodePoints, encodePointsArray
 from lidarLib.translation import translation
 
 
 class publisher:
     def __init__ (self, teamNumber, autoConnect=True):
         self.publisher=None
+        self.poseBuffer=lidarPoseBuffer()
+        self.clockSync=lidarClockSync()
+        #newest network tables timestamp given to each group of timestamped topics, see toNTTime
+        self.lastNTTimes:dict[str, int]={}
+
+        #last published occupancy keyframe, deltas are made against it
+        self.occupancyGeneration=0
+        self.occupancyKeyframe:np.ndarray=None
+        self.occupancyKeyframeGeneration=0
+        self.occupancyKeyframeCellSize=None
+        self.lastOccupancy:np.ndarray=None
 
         self.teamNumber=teamNumber
         self.autoConnect=autoConnect
@@ -28,20 +45,69 @@ class publisher:
         self.individualPointTopic = self.publishFolder.getStructArrayTopic("individualReadings", Pose2d)
         self.individualPointPublisher = self.individualPointTopic.publish()
 
+        #the same points as individualReadings without a rotation per point, see lidarWireFormat.encodePoints and encodePointsArray for the layouts
+        self.packedPointTopic = self.publishFolder.getRawTopic("packedReadings")
+        self.packedPointPublisher = self.packedPointTopic.publish("lidarPoints")
+
+        self.pointArrayTopic = self.publishFolder.getDoubleArrayTopic("readingsXY")
+        self.pointArrayPublisher = self.pointArrayTopic.publish()
+
+        #the occupancy grid as a bitset keyframe plus a delta of every cell changed since it, see lidarWireFormat.encodeGridKeyframe and encodeGridDelta
+        self.occupancyKeyframeTopic = self.publishFolder.getRawTopic("occupancyKeyframe")
+        self.occupancyKeyframePublisher = self.occupancyKeyframeTopic.publish("lidarOccupancy")
+
+        self.occupancyDeltaTopic = self.publishFolder.getRawTopic("occupancyDelta")
+        self.occupancyDeltaPublisher = self.occupancyDeltaTopic.publish("lidarOccupancy")
+
         self.hitboxTopic = self.publishFolder.getStructArrayTopic("detectedHitboxes", Pose2d)
         self.hitboxPublisher = self.hitboxTopic.publish()
 
         self.poseTopic = self.publisher.getStructTopic("robotPose", Pose2d)
-        self.poseSubscriber = self.poseTopic.subscribe(Pose2d())
+        #every pose update is queued, not just the newest, so updatePoses can fill the pose buffer
+        self.poseSubscriber = self.poseTopic.subscribe(Pose2d(), ntcore.PubSubOptions(pollStorage=constants.poseBufferCapacity, keepDuplicates=True))
         
 
         self.nodeWidthTopic = self.publishFolder.getFloatTopic("NodeWidth")
         self.nodeWidthPublisher = self.nodeWidthTopic.publish()
         self.nodeWidthPublisher.set(constants.mapNodeSizeMeters)
 
+        #scan id, lidar time, server time and latency of the newest published scan, see publishScanTiming
+        self.scanTimingTopic = self.publishFolder.getDoubleArrayTopic("scanTiming")
+        self.scanTimingPublisher = self.scanTimingTopic.publish()
+
+        self.latencyTopic = self.publishFolder.getDoubleTopic("latency")
+        self.latencyPublisher = self.latencyTopic.publish()
+
         self.lidarPoseTopic = self.publishFolder.getStructArrayTopic("lidarPoses", Pose2d)
         self.lidarPosePublisher = self.lidarPoseTopic.publish()
 
+        self.obstacleTopic = self.publishFolder.getStructArrayTopic("detectedObstacles", Pose2d)
+        self.obstaclePublisher = self.obstacleTopic.publish()
+
+        self.obstacleSizeTopic = self.publishFolder.getDoubleArrayTopic("detectedObstacleSizes")
+        self.obstacleSizePublisher = self.obstacleSizeTopic.publish()
+
+        self.obstacleConfidenceTopic = self.publishFolder.getDoubleArrayTopic("detectedObstacleConfidences")
+        self.obstacleConfidencePublisher = self.obstacleConfidenceTopic.publish()
+
+        self.trackIDTopic = self.publishFolder.getIntegerArrayTopic("trackedObstacleIDs")
+        self.trackIDPublisher = self.trackIDTopic.publish()
+
+        self.trackPoseTopic = self.publishFolder.getStructArrayTopic("trackedObstacles", Pose2d)
+        self.trackPosePublisher = self.trackPoseTopic.publish()
+
+        self.trackVelocityTopic = self.publishFolder.getDoubleArrayTopic("trackedObstacleVelocities")
+        self.trackVelocityPublisher = self.trackVelocityTopic.publish()
+
+        self.trackCovarianceTopic = self.publishFolder.getDoubleArrayTopic("trackedObstacleCovariances")
+        self.trackCovariancePublisher = self.trackCovarianceTopic.publish()
+
+        self.pathGoalTopic = self.publishFolder.getStructTopic("pathGoal", Pose2d)
+        self.pathGoalSubscriber = self.pathGoalTopic.subscribe(Pose2d())
+
+        self.plannedPathTopic = self.publishFolder.getStructArrayTopic("plannedPath", Pose2d)
+        self.plannedPathPublisher = self.plannedPathTopic.publish()
+
 
     def connect(self, port:str=None, teamNumber:int=None, name="lidar", startAsServer=False, saveConnectionIfSuccessful=True)->bool:
         connecter:ntcore.NetworkTableInstance = ntcore.NetworkTableInstance.getDefault()
@@ -91,6 +157,64 @@ class publisher:
 
     def getPoseAsTran(self)->Pose2d:
         return translation.fromPose2d(self.getPose())
+
+    def updateClockSync(self)->float:
+        """Updates self.clockSync with the newest server time offset measured by network tables. Returns the smoothed offset in seconds or None if the server time is not known yet"""
+        if not self.isConnected():
+            return self.clockSync.offset
+        return self.clockSync.update(self.publisher.getServerTimeOffset(), ntcore._now())
+
+    def toServerTime(self, lidarTime:float)->float:
+        """Converts a time on the lidar's clock (time.monotonic) to the server's (robot's) clock in seconds, or None if the server time is not known yet"""
+        self.updateClockSync()
+        return self.clockSync.toServerTime(lidarTime)
+
+    def toNTTime(self, lidarTime:float, topic:str=None)->int:
+        """
+            Converts a time on the lidar's clock (time.monotonic) to a network tables local timestamp in microseconds to give to set, or the current time if lidarTime is None.
+            Values set with this timestamp arrive on the robot with a server time of when they were measured rather than when they were published.
+            Network tables ignores a value stamped older than the one before it, so if topic is given the timestamp is kept above the last one returned for that topic.
+        """
+        now = ntcore._now()
+        ntTime = now if lidarTime==None else int(now+(lidarTime-time.monotonic())*1e6)
+        if topic!=None:
+            ntTime = max(ntTime, self.lastNTTimes.get(topic, 0)+1)
+            self.lastNTTimes[topic]=ntTime
+        return ntTime
+
+    def toLidarTime(self, serverTime:int, localTime:int)->float:
+        """
+            Converts a network tables timestamp (in microseconds) to the lidar's clock (time.monotonic in seconds).
+            The server time is used through self.clockSync when the server time is known since it is when the robot set the value, otherwise the local time the value arrived at is used.
+        """
+        self.updateClockSync()
+        if self.clockSync.isSynced() and serverTime:
+            return self.clockSync.toLidarTime(serverTime/1e6)
+        return time.monotonic()+(localTime-ntcore._now())/1e6
+
+    def updatePoses(self)->int:
+        """
+            Moves every robot pose received since the last call into self.poseBuffer with its timestamp converted to the lidar's clock. Returns the number of poses added.
+            Poses are only queued while this is called regularly (at least every constants.poseBufferCapacity updates).
+        """
+        if not self.isConnected():
+            return 0
+        added = 0
+        for sample in self.poseSubscriber.readQueue():
+            pose:Pose2d = sample.value
+            added += self.poseBuffer.add(self.toLidarTime(sample.serverTime, sample.time), pose.X(), pose.Y(), pose.rotation().degrees())
+        return added
+
+    def getPoseAt(self, timestamp:float)->translation:
+        """Returns the robot pose at the given time (on the lidar's clock, time.monotonic) interpolated from the received poses, or None if none have been received. See lidarPoseBuffer.getAt"""
+        self.updatePoses()
+        return self.poseBuffer.getAt(timestamp)
+
+    def getPathGoal(self)->Pose2d:
+        """Returns the goal pose the robot has requested a path to (at lidar/pathGoal) or None if a goal has never been set"""
+        if self.pathGoalSubscriber.getLastChange()==0:
+            return None
+        return self.pathGoalSubscriber.get()
     
     def publishPointsFromPoses(self, poses:list[Pose2d]):
         
@@ -104,6 +228,39 @@ class publisher:
         self.publishPointsFromPoses(poses)
     
 
+    def publishPointsFromArray(self, xy:np.ndarray):
+        """Publishes every point in a (n, 2) array of field coordinates, such as the cloud from lidarFusion.getCloud"""
+        self.publishPointsFromPoses([Pose2d(x, y, Rotation2d()) for x, y in np.asarray(xy).reshape(-1, 2).tolist()])
+
+
+    def publishPointsPacked(self, xy:np.ndarray, scanID:int=0, timestamp:float=None):
+        """
+            Publishes a (n, 2) array of field coordinates to packedReadings as int16 centimeters with a small header holding the scan id and timestamp.
+            timestamp is when the points were measured on the lidar's clock, it is converted to the server's clock for the header (0 if the server time is not known yet)
+            and used as the network tables timestamp of the value (kept above the last one, see toNTTime).
+            Decode it with lidarWireFormat.decodePoints in python or LidarPoints.decode (robotCode/LidarPoints.java) in java.
+        """
+        self.packedPointPublisher.set(encodePoints(xy, scanID, self.toServerTime(timestamp) if timestamp else None), self.toNTTime(timestamp, "packedReadings"))
+
+    def publishPointsAsArray(self, xy:np.ndarray, scanID:int=0, timestamp:float=None):
+        """
+            Publishes a (n, 2) array of field coordinates to readingsXY as a double array of the scan id, timestamp and point count followed by interleaved x, y pairs.
+            The timestamp is handled the same way as publishPointsPacked.
+            Decode it with lidarWireFormat.decodePointsArray in python or LidarPoints.decodeArray (robotCode/LidarPoints.java) in java.
+        """
+        self.pointArrayPublisher.set(encodePointsArray(xy, scanID, self.toServerTime(timestamp) if timestamp else None).tolist(), self.toNTTime(timestamp, "readingsXY"))
+
+    def publishPoints(self, xy:np.ndarray, scanID:int=0, timestamp:float=None, layout:str=constants.pointPublishLayout):
+        """Publishes a (n, 2) array of field coordinates with the given layout, "packed" (publishPointsPacked), "array" (publishPointsAsArray) or "poses" (publishPointsFromArray)"""
+        if layout=="packed":
+            self.publishPointsPacked(xy, scanID, timestamp)
+        elif layout=="array":
+            self.publishPointsAsArray(xy, scanID, timestamp)
+        elif layout=="poses":
+            self.publishPointsFromArray(xy)
+        else:
+            raise ValueError("unknown point publish layout", layout, "expected packed, array or poses")
+
     def publishHitboxesFromPoses(self, poses:list[Pose2d]):
         
         self.hitboxPublisher.set(poses)
@@ -118,6 +275,105 @@ class publisher:
         
         self.publishHitboxesFromPoses(poses)
 
+    def publishOccupancy(self, occupancy:np.ndarray, cellSize:float=constants.mapNodeSizeMeters)->bool:
+        """
+            Publishes a [y][x] boolean occupancy grid (such as lidarHitboxMap.occupancy or lidarFusion.getGrid) to occupancyKeyframe and occupancyDelta.
+            Nothing is sent if the grid has not changed since the last call. Otherwise only the cells that differ from the last keyframe are sent as a delta, 
+            and a new keyframe is sent once the delta would be bigger than half a keyframe or constants.occupancyKeyframeInterval generations have passed since the last one.
+            Readers need the newest value of each topic, decode them with lidarWireFormat.decodeGrid in python or LidarOccupancy.decode (robotCode/LidarOccupancy.java) in java.
+            Returns wether or not anything was sent.
+        """
+        occupancy = np.asarray(occupancy, dtype=bool)
+        if self.lastOccupancy is not None and self.lastOccupancy.shape==occupancy.shape and self.occupancyKeyframeCellSize==cellSize and np.array_equal(self.lastOccupancy, occupancy):
+            return False
+
+        self.occupancyGeneration+=1
+        self.lastOccupancy=occupancy.copy()
+        keyframeLength = (occupancy.size+7)//8
+        if (
+            self.occupancyKeyframe is None 
+            or self.occupancyKeyframe.shape!=occupancy.shape 
+            or self.occupancyKeyframeCellSize!=cellSize
+            or self.occupancyGeneration-self.occupancyKeyframeGeneration>=constants.occupancyKeyframeInterval
+            or 4*int(np.count_nonzero(self.occupancyKeyframe!=occupancy))>keyframeLength//2
+        ):
+            self.occupancyKeyframe=self.lastOccupancy
+            self.occupancyKeyframeGeneration=self.occupancyGeneration
+            self.occupancyKeyframeCellSize=cellSize
+            self.occupancyKeyframePublisher.set(encodeGridKeyframe(occupancy, cellSize, self.occupancyGeneration))
+            #a empty delta for the new keyframe so readers never apply the old delta to it
+            self.occupancyDeltaPublisher.set(encodeGridDelta(occupancy, occupancy, cellSize, self.occupancyGeneration, self.occupancyGeneration))
+        else:
+            self.occupancyDeltaPublisher.set(encodeGridDelta(self.occupancyKeyframe, occupancy, cellSize, self.occupancyGeneration, self.occupancyKeyframeGeneration))
+        return True
+
+    def publishHitboxMap(self, map:lidarHitboxMap, layout:str=constants.occupancyPublishLayout):
+        """Publishes the closed nodes of a hitbox map with the given layout, "bitmask" (publishOccupancy) or "poses" (publishHitboxesFromHitboxMap)"""
+        if layout=="bitmask":
+            self.publishOccupancy(map.occupancy, map.nodeSideLen)
+        elif layout=="poses":
+            self.publishHitboxesFromHitboxMap(map)
+        else:
+            raise ValueError("unknown occupancy publish layout", layout, "expected bitmask or poses")
+
+    def publishObstacles(self, obstacles:list[lidarObstacle], timestamp:float=None):
+        """
+            Publishes the center pose of every obstacle to detectedObstacles.
+            Sizes are published to detectedObstacleSizes as a flat list of length, width pairs and confidences to detectedObstacleConfidences, both in the same order as the poses.
+            If timestamp (when the obstacles were measured, on the lidar's clock) is given every topic is stamped with it, see toNTTime.
+        """
+        ntTime = self.toNTTime(timestamp, "obstacles")
+        poses:list[Pose2d] = []
+        sizes:list[float] = []
+        confidences:list[float] = []
+        for obstacle in obstacles:
+            poses.append(obstacle.pose)
+            sizes.extend((obstacle.length, obstacle.width))
+            confidences.append(obstacle.confidence)
+
+        self.obstaclePublisher.set(poses, ntTime)
+        self.obstacleSizePublisher.set(sizes, ntTime)
+        self.obstacleConfidencePublisher.set(confidences, ntTime)
+
+    def publishTracks(self, tracks:list[lidarTrack], timestamp:float=None):
+        """
+            Publishes every track with all topics in the same order. IDs go to trackedObstacleIDs and poses to trackedObstacles.
+            Velocities are published to trackedObstacleVelocities as a flat list of vx, vy pairs in meters per second
+            and covariances to trackedObstacleCovariances as 16 values per track (the row major 4x4 covariance of [x, y, vx, vy]).
+            If timestamp (the time the tracks were updated to, on the lidar's clock) is given every topic is stamped with it, see toNTTime.
+        """
+        ntTime = self.toNTTime(timestamp, "tracks")
+        ids:list[int] = []
+        poses:list[Pose2d] = []
+        velocities:list[float] = []
+        covariances:list[float] = []
+        for track in tracks:
+            ids.append(track.id)
+            poses.append(track.pose)
+            velocities.extend((track.vx, track.vy))
+            covariances.extend(track.covariance.flatten().tolist())
+
+        self.trackIDPublisher.set(ids, ntTime)
+        self.trackPosePublisher.set(poses, ntTime)
+        self.trackVelocityPublisher.set(velocities, ntTime)
+        self.trackCovariancePublisher.set(covariances, ntTime)
+
+    def publishScanTiming(self, scanID:int, lidarTime:float):
+        """
+            Publishes when a scan (or fused cloud) was measured to scanTiming as [scan id, lidar time, server time, latency] and the latency on its own to latency, all in seconds.
+            Server time is the lidar time on the robot's clock (0 if the server time is not known yet) so robot code can look up its pose at that time instead of assuming a fixed delay.
+            Latency is the time from the scan being measured to this being called.
+        """
+        latency = time.monotonic()-lidarTime
+        serverTime = self.toServerTime(lidarTime)
+        ntTime = self.toNTTime(lidarTime, "timing")
+        self.scanTimingPublisher.set([scanID, lidarTime, serverTime or 0, latency], ntTime)
+        self.latencyPublisher.set(latency, ntTime)
+
+    def publishPath(self, path:list[Pose2d]):
+        """Publishes a planned path to lidar/plannedPath. A empty list means no path could be found to the requested goal"""
+        self.plannedPathPublisher.set(path)
+
     def updateNodeWith(self, nodeWidth:int):
         self.nodeWidthPublisher.set(nodeWidth)
 
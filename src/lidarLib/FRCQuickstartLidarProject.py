@@ -2,13 +2,15 @@ import json
 import threading
 import time
 from lidarLib.lidarHitboxingMap import lidarHitboxMap
-from lidarLib import lidarManager
 from lidarLib.FRCLidarPublisher import publisher
-from lidarLib.Lidar import Lidar
 import sys
-import warnings
 from lidarLib.LidarConfigs import lidarConfigs
-from lidarLib.lidarPipeline import lidarPipeline
+from lidarLib.lidarFusion import clusterFusedCloud, lidarFusion
+from lidarLib.lidarObstacleFitting import fitObstacles
+from lidarLib.lidarObstacleTracker import lidarObstacleTracker
+from lidarLib.lidarPathPlanner import lidarPathPlanner
+from lidarLib.lidarPublishThread import lidarPublishThread
+from lidarLib.lidarSupervisor import lidarSupervisor
 class FRCQuickstartLidarProject:
 
     def __init__(self, configs:list[lidarConfigs], teamNumber:int, autoStart=True):
@@ -87,33 +89,71 @@ class FRCQuickstartLidarProject:
     def session(cls, ntPublisher:publisher, configList:list[lidarConfigs]):
         
         
-        lidars = []
-        for config in configList:
-            lidars.append(lidarManager.makePipedLidar(config))
+        #supervisors restart any lidar process that crashes or stops scanning, the pipelines keep working across restarts
+        supervisors = [lidarSupervisor(config) for config in configList]
+        lidars = [supervisor.pipeline for supervisor in supervisors]
         
-
-
-        
-        while ntPublisher.isConnected():
-
-            hitboxMap:lidarHitboxMap = lidarHitboxMap()
-            pointMap=[]
-            lidarTranslations = []
-            for lidar in lidars:
-                if lidar.isConnected() and lidar.getLastMap():
-                    lidar.setCurrentLocalTranslation(ntPublisher.getPoseAsTran())
-                    hitboxMap.addMap(lidar.getLastMap())
-                    pointMap = pointMap+lidar.getLastMap().getPoints()
-                    lidarTranslations.append(lidar.getCombinedTranslation())
+        #scans are merged in their own process straight from shared memory, this thread only reads the finished cloud and grid
+        fusion = lidarFusion(lidars)
+        tracker = lidarObstacleTracker()
+        planner = lidarPathPlanner()
+        #everything is published from its own thread at the rates in constants.publishRates, only the newest value of each channel is sent
+        publishThread = lidarPublishThread()
+        fusionID = 0
+        lastPoseTime = None
+
+
+        try:
+            while ntPublisher.isConnected():
+
+                #every robot pose received since the last loop is forwarded with its timestamp, the lidars use the newest one as their global translation
+                ntPublisher.updatePoses()
+                poses = ntPublisher.poseBuffer.getBatch(lastPoseTime)
+                if poses.shape[1]:
+                    lastPoseTime = ntPublisher.poseBuffer.getNewestTime()
+
+                lidarTranslations = []
+                for lidar in lidars:
+                    if lidar.isConnected():
+                        if poses.shape[1]:
+                            lidar.sendPoses(poses)
+                        lidarTranslations.append(lidar.getCombinedTranslation())
+
+                newFusionID = fusion.waitForNext(fusionID, timeout=0.1)
+                if newFusionID==fusionID:
+                    continue
+                fusionID = newFusionID
+
+                cloud, sources, cloudInfo = fusion.getCloud()
+                #the grid has to come from the same cloud, if a newer cloud was made in between this one is skipped and the next loop picks that one up
+                grid = fusion.getGrid(int(cloudInfo["fusionID"]))
+                if grid is None:
+                    continue
+                fusionID = int(cloudInfo["fusionID"])
+                hitboxMap:lidarHitboxMap = lidarHitboxMap()
+                hitboxMap.addOccupancy(grid)
                     
             
-            ntPublisher.publishHitboxesFromHitboxMap(hitboxMap)
-            ntPublisher.publishPointsFromLidarMeasurements(pointMap)
-            ntPublisher.publishLidarPosesFromTrans(lidarTranslations)
-
-
-        for lidar in lidars:
-            lidar.sendQuitRequest()
+                publishThread.submit("occupancy", ntPublisher.publishHitboxMap, hitboxMap, key=fusionID)
+                obstacles = fitObstacles(cloud, clusterFusedCloud(cloud, sources))
+                publishThread.submit("obstacles", ntPublisher.publishObstacles, obstacles, cloudInfo["newestEndTime"] or None, key=fusionID)
+
+                #every fused cloud holds at least one new scan so tracks are updated once per cloud
+                if cloudInfo["newestEndTime"]:
+                    publishThread.submit("tracks", ntPublisher.publishTracks, tracker.update(obstacles, cloudInfo["newestEndTime"]), cloudInfo["newestEndTime"], key=fusionID)
+                    publishThread.submit("timing", ntPublisher.publishScanTiming, fusionID, cloudInfo["newestEndTime"], key=fusionID)
+
+                pathGoal = ntPublisher.getPathGoal()
+                if pathGoal:
+                    publishThread.submit("path", ntPublisher.publishPath, planner.plan(hitboxMap, ntPublisher.getPose(), pathGoal), key=fusionID)
+                publishThread.submit("points", ntPublisher.publishPoints, cloud, fusionID, cloudInfo["newestEndTime"] or None, key=fusionID)
+                publishThread.submit("lidarPoses", ntPublisher.publishLidarPosesFromTrans, lidarTranslations, key=[str(trans) for trans in lidarTranslations])
+
+        finally:
+            publishThread.stop()
+            fusion.stop()
+            for supervisor in supervisors:
+                supervisor.stop()
 
 
     
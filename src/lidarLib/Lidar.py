@@ -6,7 +6,10 @@ from lidarLib.rplidarSerial import RPlidarSerial
 from lidarLib.lidarProtocol import *
 import lidarLib.lidarProtocol
 from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarFieldMask import lidarFieldMask
+from lidarLib.lidarScheduling import applyRealtimeScheduling
 from lidarLib.lidarMeasurement import lidarMeasurement
+from lidarLib.lidarPoseBuffer import lidarPoseBuffer
 import threading
 from lidarLib.translation import translation
 from typing import Callable
@@ -18,8 +21,11 @@ import os
 
 class Lidar:
     """class to handle, read, and translate data from a RPlidar (only A2M12 has been tested but should work for all)"""
-    def __init__(self, config:lidarConfigs):
-        """initializes lidar object but does not attempt to connect or start any scans"""
+    def __init__(self, config:lidarConfigs, deviceMetadata:dict=None):
+        """
+            initializes lidar object and connects to it if auto connect is on.
+            deviceMetadata is passed to connect, see getDeviceMetadata.
+        """
 
         if config.isStop:
             self.isStopFunction()
@@ -52,8 +58,13 @@ class Lidar:
         self.globalTranslation=translation.default()
         self.combinedTranslation=translation.default()
 
+        self.fieldMask=lidarFieldMask.load(self.config.fieldMask)
+        self.__newMapEvent=threading.Event()
+        self.readerScheduling:dict=None
+        self.poseBuffer=lidarPoseBuffer()
+
         if (config.autoConnect):
-            self.connect()
+            self.connect(deviceMetadata)
 
 
         
@@ -81,8 +92,12 @@ class Lidar:
             self.disconnect()
 
 
-    def connect(self)->None:
-        """Connects to a lidar object with the information specified in the config file."""
+    def connect(self, deviceMetadata:dict=None)->None:
+        """
+            Connects to a lidar object with the information specified in the config file.
+            If deviceMetadata (from getDeviceMetadata) is given the info, sample rate and scan modes are taken from it instead of being asked for again, 
+            which makes reconnecting to a lidar that was already connected once much faster. The health is always fetched.
+        """
         self.lidarSerial = RPlidarSerial()
         self.lidarSerial.open(self.config.port, self.config.vendorID, self.config.productID, self.config.serialNumber, self.config.baudrate,timeout=self.config.timeout)
         print(self.config.port)
@@ -100,11 +115,18 @@ class Lidar:
         time.sleep(0.002)
 
         self.__getHealth()
-        self.__getInfo()
-        self.__getSampleRate()
-        self.__getScanModeCount()
-        self.__getScanModes()
-        self.__getScanModeTypical()
+        if deviceMetadata:
+            self.lidarInfo=deviceMetadata["lidarInfo"]
+            self.sampleRate=deviceMetadata["sampleRate"]
+            self.scanModeCount=deviceMetadata["scanModeCount"]
+            self.scanModes=deviceMetadata["scanModes"]
+            self.typicalScanMode=deviceMetadata["typicalScanMode"]
+        else:
+            self.__getInfo()
+            self.__getSampleRate()
+            self.__getScanModeCount()
+            self.__getScanModes()
+            self.__getScanModeTypical()
         
         if self.config.autoStart:
             if self.config.mode=="normal":
@@ -115,6 +137,19 @@ class Lidar:
                 self.startScanExpress()
         
 
+    def getDeviceMetadata(self)->dict:
+        """
+            Returns everything fetched from the lidar when it was connected that does not change while it is powered (info, sample rate and scan modes) as a dict.
+            Giving this to connect (or the constructor) skips asking the lidar for them again.
+        """
+        return {
+            "lidarInfo" : self.getInfo(),
+            "sampleRate" : self.getSampleRate(),
+            "scanModeCount" : self.getScanModeCount(),
+            "scanModes" : self.getScanModes(),
+            "typicalScanMode" : self.getScanModeTypical()
+        }
+
     def isRunning(self):
         """Returns wether or not the lidar is currently scanning."""
         return self.loop and self.loop.is_alive()
@@ -153,6 +188,10 @@ class Lidar:
             INTERNAL FUNCTION, NOT FOR OUTSIDE USE
             function called by the update loop so that the actual update function can be changed depending on the scan type run
         """
+        self.readerScheduling = applyRealtimeScheduling(self.config.realtimePolicy, self.config.realtimePriority)
+        for error in self.readerScheduling["errors"]:
+            print("lidar reader scheduling:", error)
+
         while not self.isDone:
             self.__update()
             sleep(0.001)
@@ -593,7 +632,11 @@ class Lidar:
     def _mapIsDone(self)->None:
         """Handles all the cleanup that is needed when a scan map is done and a new one needs to be initialized"""
         self.__lastMap=self.currentMap
+        self.__lastMap.sensorPose=self.combinedTranslation
+        if self.fieldMask:
+            self.__lastMap.applyFieldMask(self.fieldMask)
         self.currentMap=lidarMap(self, mapID=self.__lastMap.mapID+1, deadband=self.config.deadband, sensorThetaOffset=self.localTranslation.theta)
+        self.__newMapEvent.set()
         if self.config.debugMode:
             print("map swap attempted")
             print(len(self.__lastMap.getPoints()),self.__lastMap.len, self.__lastMap.mapID, self.__lastMap.getRange(), self.__lastMap.getHz(), self.__lastMap.getPeriod())
@@ -618,6 +661,18 @@ class Lidar:
         self.combinedTranslation=self.globalTranslation.combineTranslation(self.localTranslation)
 
 
+    def addPoses(self, batch)->None:
+        """
+            Adds a batch of timestamped robot poses (a (4, n) array from lidarPoseBuffer.getBatch) to the lidar's pose buffer and sets the global translation to the newest pose.
+            Times must be on the lidar's clock (time.monotonic), see publisher.updatePoses.
+        """
+        if self.poseBuffer.addBatch(batch):
+            self.setCurrentGlobalTranslation(self.poseBuffer.getLatest())
+
+    def getPoseAt(self, timestamp:float)->translation:
+        """Returns the robot pose at the given time (on the lidar's clock) from the poses given to addPoses, or None if none have been given. See lidarPoseBuffer.getAt"""
+        return self.poseBuffer.getAt(timestamp)
+
     def setDeadband(self, deadband:list[int])->None:
         """
             Sets a deadband of angles that will be dropped by the lidar. The dropped angle is calculated after the local translation but before the global translation. 
@@ -632,3 +687,13 @@ class Lidar:
     def getLastMap(self)->lidarMap:
         """Returns the last full map measured by the lidar."""
         return self.__lastMap
+
+    def waitForNextMap(self, timeout:float=None)->bool:
+        """
+            Blocks until a new map is finished or timeout seconds have passed. Returns true if a new map finished and false if the wait timed out.
+            A map that finished since the last call to this function counts as new and will cause it to return straight away.
+        """
+        if self.__newMapEvent.wait(timeout):
+            self.__newMapEvent.clear()
+            return True
+        return False
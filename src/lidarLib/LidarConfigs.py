@@ -27,6 +27,11 @@ class lidarConfigs:
         "productID" : 0xea60,
         "serialNumber" : None, 
         "name" : None,
+        "fieldMask" : None,
+        "cpuAffinity" : None,
+        "niceness" : None,
+        "realtimePolicy" : None,
+        "realtimePriority" : 10,
         "type": "ValueThatWillNeverBeUsedButNeedsToExistForReasons"
 
     }
@@ -50,7 +55,12 @@ class lidarConfigs:
                     autoStart=defaultConfigs["autoStart"], 
                     autoConnect=defaultConfigs["autoConnect"], 
                     defaultSpeed=defaultConfigs["defaultSpeed"],
-                    name = defaultConfigs["name"]
+                    name = defaultConfigs["name"],
+                    fieldMask = defaultConfigs["fieldMask"],
+                    cpuAffinity = defaultConfigs["cpuAffinity"],
+                    niceness = defaultConfigs["niceness"],
+                    realtimePolicy = defaultConfigs["realtimePolicy"],
+                    realtimePriority = defaultConfigs["realtimePriority"]
                     
             ):
 
@@ -72,6 +82,12 @@ class lidarConfigs:
         self.productID = productID
         self.serialNumber = serialNumber
         self.name = name
+        self.fieldMask = fieldMask
+        #scheduling is only applied to piped lidars (the manager process) and the reader thread, see lidarScheduling
+        self.cpuAffinity = cpuAffinity
+        self.niceness = niceness
+        self.realtimePolicy = realtimePolicy
+        self.realtimePriority = realtimePriority
 
         if not self.port and not self.serialNumber:
             raise ValueError("Ether a serial number or a port must be specified in a lidar configs object")
@@ -95,7 +111,12 @@ class lidarConfigs:
             "\nvendorID: ", self.vendorID,
             "\nproductID: ", self.productID,
             "\nserialNumber: ", self.serialNumber,
-            "\nname:", self.name
+            "\nname:", self.name,
+            "\nfieldMask:", self.fieldMask,
+            "\ncpuAffinity:", self.cpuAffinity,
+            "\nniceness:", self.niceness,
+            "\nrealtimePolicy:", self.realtimePolicy,
+            "\nrealtimePriority:", self.realtimePriority
         )
 
     @classmethod
@@ -131,7 +152,12 @@ class lidarConfigs:
                     autoStart = data.get("autoStart", lidarConfigs.defaultConfigs["autoStart"]),
                     autoConnect = data.get("autoConnect", lidarConfigs.defaultConfigs["autoConnect"]),
                     defaultSpeed = data.get("defaultSpeed", lidarConfigs.defaultConfigs["defaultSpeed"]),
-                    name = data.get("name", lidarConfigs.defaultConfigs["name"])
+                    name = data.get("name", lidarConfigs.defaultConfigs["name"]),
+                    fieldMask = data.get("fieldMask", lidarConfigs.defaultConfigs["fieldMask"]),
+                    cpuAffinity = data.get("cpuAffinity", lidarConfigs.defaultConfigs["cpuAffinity"]),
+                    niceness = data.get("niceness", lidarConfigs.defaultConfigs["niceness"]),
+                    realtimePolicy = data.get("realtimePolicy", lidarConfigs.defaultConfigs["realtimePolicy"]),
+                    realtimePriority = data.get("realtimePriority", lidarConfigs.defaultConfigs["realtimePriority"])
 
                 )
             
@@ -168,6 +194,11 @@ class lidarConfigs:
                 "productID" : self.productID,
                 "vendorID" : self.vendorID,
                 "name" : self.name,
+                "fieldMask" : self.fieldMask,
+                "cpuAffinity" : self.cpuAffinity,
+                "niceness" : self.niceness,
+                "realtimePolicy" : self.realtimePolicy,
+                "realtimePriority" : self.realtimePriority,
                 "type" : "lidarConfig"
             }
 
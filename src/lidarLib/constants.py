@@ -2,6 +2,35 @@ class constants:
     mapWidthMeters=8.052
     mapHeightMeters=17.548
     mapNodeSizeMeters=0.3
+    fieldMaskResolutionMeters=0.1
+    robotRadiusMeters=0.5
+    sharedScanMaxPoints=8192
+    pipelineHeartbeatInterval=0.1
+    pipelineHeartbeatTimeout=1.0
+    pipelineStartupGrace=5.0
+    fusionPollInterval=0.002
+    supervisorCheckInterval=0.1
+    supervisorHeartbeatTimeout=2.0
+    supervisorScanDeadline=3.0
+    supervisorStartupGrace=15.0
+    supervisorMinBackoff=0.5
+    supervisorMaxBackoff=30.0
+    pointPublishLayout="packed"
+    occupancyPublishLayout="bitmask"
+    occupancyKeyframeInterval=50
+    #maximum publish rate in Hz of each lidarPublishThread channel used by the quickstart project
+    publishRates={"points" : 10, "occupancy" : 20, "obstacles" : 20, "tracks" : 20, "path" : 10, "lidarPoses" : 10, "timing" : 20}
+    publishDefaultRate=20
+    poseBufferCapacity=500
+    clockSyncSmoothing=0.1
+    clockSyncResetThreshold=0.05
+    headlessRenderFps=10
+    headlessRenderScale=8
+    headlessJpegQuality=80
+    renderSharedFeed=True
+    probeBaudrates=[115200, 256000, 1000000]
+    probeTimeout=0.15
+    probeStopDelay=0.01
     map = [
         [True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True],
         [True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True,True],
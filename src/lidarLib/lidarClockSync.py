@@ -0,0 +1,50 @@
+import time
+
+from lidarLib.constants import constants
+
+
+class lidarClockSync:
+    """
+        Tracks the offset between the lidar's clock (time.monotonic, used for every scan and pose timestamp) and the network tables server clock (the robot's FPGA clock).
+        Each update takes the offset network tables has measured to the server and smooths it with a exponential moving average.
+        A sample further than resetThreshold seconds from the current offset (the robot restarted or network tables resynced) replaces the offset instead of being averaged in.
+        All times are in seconds.
+    """
+    def __init__(self, smoothing:float=constants.clockSyncSmoothing, resetThreshold:float=constants.clockSyncResetThreshold):
+        """smoothing is the weight given to each new sample, between 0 (never changes) and 1 (no smoothing)"""
+        self.smoothing=smoothing
+        self.resetThreshold=resetThreshold
+        self.offset:float=None
+        self.resets=0
+
+    def update(self, serverTimeOffset:int, ntNow:int)->float:
+        """
+            Adds a sample from network tables. serverTimeOffset is NetworkTableInstance.getServerTimeOffset and ntNow is the network tables local time (ntcore._now), both in microseconds.
+            A serverTimeOffset of None (no server time yet) is ignored. Returns the smoothed offset (server time minus lidar time) or None if there has never been a sample.
+        """
+        if serverTimeOffset==None:
+            return self.offset
+
+        sample = (ntNow+serverTimeOffset)/1e6-time.monotonic()
+        if self.offset==None or abs(sample-self.offset)>self.resetThreshold:
+            self.offset=sample
+            self.resets+=1
+        else:
+            self.offset+=self.smoothing*(sample-self.offset)
+        return self.offset
+
+    def isSynced(self)->bool:
+        """Returns wether or not a offset has been measured"""
+        return self.offset!=None
+
+    def toServerTime(self, lidarTime:float)->float:
+        """Converts a time on the lidar's clock to the server's clock, returns None if there is no offset yet"""
+        if self.offset==None:
+            return None
+        return lidarTime+self.offset
+
+    def toLidarTime(self, serverTime:float)->float:
+        """Converts a time on the server's clock to the lidar's clock, returns None if there is no offset yet"""
+        if self.offset==None:
+            return None
+        return serverTime-self.offset
@@ -4,14 +4,14 @@ import os
 import threading
 import time
 
-import serial
 from importlib import resources
 from lidarLib.translation import translation
 from lidarLib.Lidar import Lidar
 from lidarLib.LidarConfigs import lidarConfigs
+from lidarLib.lidarProbe import formatProbeTable, probePort, probePorts
 from serial.tools import list_ports
 
-from lidarLib.lidarProtocol import RPLIDAR_CMD_GET_HEALTH, RPLIDAR_DESCRIPTOR_LEN, RPLIDAR_MAX_MOTOR_PWM, RPLIDAR_SYNC_BYTE1, RPLIDAR_SYNC_BYTE2, RPlidarCommand, RPlidarConnectionError, RPlidarHealth, RPlidarProtocolError, RPlidarResponse
+from lidarLib.lidarProtocol import RPLIDAR_MAX_MOTOR_PWM, RPlidarConnectionError, RPlidarProtocolError
 from lidarLib.renderLib.renderMachine import initMachine
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import pygame
@@ -158,6 +158,7 @@ class lidarConfigurationTool:
     def __init__(self):
         self.defaults = lidarConfigs.defaultConfigs
         self.configFile:lidarConfigs=None
+        self.probedDevices:dict[str, dict]={}
         # self.configFile = lidarConfigs(port="lol")
 
         # #opening
@@ -235,7 +236,12 @@ class lidarConfigurationTool:
     def findLidar(self):
         trash = getInput("Please plug in EXACTLY 1 Slamtec lidar to be configured. Press enter to continue")
     
-
+        #every port is probed at once so the baud rate is already known by the time it is asked for
+        devices = probePorts(vendorID=self.defaults["vendorID"])
+        self.probedDevices = {device["port"] : device for device in devices}
+        if self.verbose and devices:
+            print(formatProbeTable(devices))
+            print()
 
         for bus in list_ports.comports():
             if bus.vid == self.defaults["vendorID"]:
@@ -405,7 +411,7 @@ class lidarConfigurationTool:
 
     def baudRateAutoTest(self):
         
-
+        port = None
         for bus in list_ports.comports():
             if bus.serial_number == self.configFile.serialNumber and bus.vid == self.configFile.vendorID and bus.pid == self.configFile.productID:
                 port = bus.device
@@ -413,41 +419,13 @@ class lidarConfigurationTool:
         if not port:
             raise ValueError("Could not find port associated with lidar")
 
-        serialPort = serial.Serial(port)
-        serialPort.timeout = 0.5
-        for baudrate in [115200, 256000]:
-            serialPort.baudrate = baudrate
-            serialPort.write(RPlidarCommand(RPLIDAR_CMD_GET_HEALTH, None).raw_bytes)
-            count=0
-            while serialPort.in_waiting<7:
-                time.sleep(0.01)
-                count+=0.01
-                if count>1:
-                    break
-            if count>1: continue
-            
-            descriptor = RPlidarResponse(serialPort.read(RPLIDAR_DESCRIPTOR_LEN))
-
-                    
-            if descriptor.sync_byte1 != RPLIDAR_SYNC_BYTE1[0] or descriptor.sync_byte2 != RPLIDAR_SYNC_BYTE2[0]:
-                continue
+        #findLidar already probed every port, the port is only probed again if the lidar was not found then
+        device = self.probedDevices.get(port) or probePort(port)
+        if device==None or device["health"]!="GOOD":
+            return 'Unknown'
 
-
-            
-            while serialPort.in_waiting<descriptor.data_length:
-                time.sleep(0.1)
-                print("loop")
-            data = serialPort.read(descriptor.data_length)
-            
-            health = RPlidarHealth(data)
-            if health.status!=0:
-                continue
-
-            print(baudrate)
-            return baudrate
-        
-        
-        return 'Unknown'
+        print(device["baudrate"])
+        return device["baudrate"]
     
 
 
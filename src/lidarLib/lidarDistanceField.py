@@ -0,0 +1,75 @@
+import numpy as np
+
+
+def euclideanDistanceTransform(obstacles:np.ndarray)->np.ndarray:
+    """
+        Returns the exact euclidean distance (in cells) from the center of every cell to the center of the closest true cell in obstacles.
+        Uses two separable passes, first the distance to the closest obstacle in the same column and then the closest combination across each row.
+        Both passes are done with whole array numpy operations. If there are no obstacles every cell is given the length of the grid diagonal.
+    """
+    obstacles = np.asarray(obstacles, dtype=bool)
+    rows, cols = obstacles.shape
+    if not obstacles.any():
+        return np.full(obstacles.shape, np.hypot(rows, cols))
+
+    rowIndex = np.arange(rows, dtype=np.float64)[:, None]
+    above = np.maximum.accumulate(np.where(obstacles, rowIndex, -np.inf), axis=0)
+    below = np.minimum.accumulate(np.where(obstacles, rowIndex, np.inf)[::-1], axis=0)[::-1]
+    columnDistance = np.minimum(rowIndex-above, below-rowIndex)
+
+    colIndex = np.arange(cols, dtype=np.float64)
+    squaredOffsets = (colIndex[:, None]-colIndex[None, :])**2
+    squared = np.min(squaredOffsets[None, :, :] + (columnDistance**2)[:, None, :], axis=2)
+    return np.sqrt(squared)
+
+
+class lidarDistanceField:
+    """
+        Class to handle a precomputed distance field over a grid of obstacles.
+        Every lookup is a constant time bilinear interpolation so large batches of points can be checked each cycle.
+    """
+    def __init__(self, obstacles:np.ndarray, cellSize:float):
+        """
+            Creates a distance field from a 2d boolean array indexed [y][x] where true marks an obstacle and each cell covers cellSize meters on each side.
+            The distances and their gradient are computed once here, in meters.
+        """
+        self.cellSize=cellSize
+        self.distances = euclideanDistanceTransform(obstacles)*cellSize
+        self.gradientY, self.gradientX = np.gradient(self.distances, cellSize)
+
+
+    def __interpolate(self, grid:np.ndarray, xy:np.ndarray)->np.ndarray:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Bilinearly interpolates grid at every field coordinate in xy. Points outside of the grid use the closest edge value.
+        """
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        rows, cols = grid.shape
+        x = np.clip(xy[:, 0]/self.cellSize-0.5, 0, cols-1)
+        y = np.clip(xy[:, 1]/self.cellSize-0.5, 0, rows-1)
+
+        x0, y0 = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+        x1, y1 = np.minimum(x0+1, cols-1), np.minimum(y0+1, rows-1)
+        xWeight, yWeight = x-x0, y-y0
+
+        top = grid[y0, x0]*(1-xWeight) + grid[y0, x1]*xWeight
+        bottom = grid[y1, x0]*(1-xWeight) + grid[y1, x1]*xWeight
+        return top*(1-yWeight) + bottom*yWeight
+
+
+    def getDistances(self, xy:np.ndarray)->np.ndarray:
+        """Returns the distance in meters from every point in xy (a (n, 2) array of field coordinates) to the closest obstacle"""
+        return self.__interpolate(self.distances, xy)
+
+
+    def getGradients(self, xy:np.ndarray)->np.ndarray:
+        """
+            Returns the gradient of the distance field at every point in xy as a (n, 2) array of x, y values.
+            The gradient points away from the closest obstacle and has a length close to 1 everywhere except right next to obstacles.
+        """
+        return np.column_stack((self.__interpolate(self.gradientX, xy), self.__interpolate(self.gradientY, xy)))
+
+
+    def getDistance(self, x:float, y:float)->float:
+        """Returns the distance in meters from a single point to the closest obstacle"""
+        return float(self.getDistances(np.array([[x, y]]))[0])
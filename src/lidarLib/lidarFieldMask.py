@@ -0,0 +1,99 @@
+import json
+import math
+import numpy as np
+
+from lidarLib.constants import constants
+
+
+class lidarFieldMask:
+    """
+        Class to handle a precomputed mask of the static parts of the field (walls and other fixed elements).
+        Points that land on the mask are known field structure and can be dropped before any other processing is done on them.
+    """
+    def __init__(self, mask:np.ndarray, cellSize:float, dropOutsideField:bool=True):
+        """
+            Creates a field mask from a 2d boolean array where true marks static field structure.
+            The array is indexed [y][x] with each cell covering cellSize meters on each side, the same layout used by constants.map.
+            If dropOutsideField is true points that land outside of the mask are treated as static as well.
+        """
+        self.mask=np.asarray(mask, dtype=bool)
+        self.cellSize=cellSize
+        self.dropOutsideField=dropOutsideField
+
+
+    @classmethod
+    def fromConstants(cls, resolution:float=constants.fieldMaskResolutionMeters, dropOutsideField:bool=True)->"lidarFieldMask":
+        """
+            Creates a field mask from the hand made layout in constants.map, resampled to cells of resolution meters.
+            Each new cell takes the value of the constants.map cell under its center.
+        """
+        seed = np.array(constants.map, dtype=bool)
+        rows = math.ceil(constants.mapWidthMeters/resolution)
+        cols = math.ceil(constants.mapHeightMeters/resolution)
+
+        seedRows = np.minimum(((np.arange(rows)+0.5)*resolution/constants.mapNodeSizeMeters).astype(np.int64), seed.shape[0]-1)
+        seedCols = np.minimum(((np.arange(cols)+0.5)*resolution/constants.mapNodeSizeMeters).astype(np.int64), seed.shape[1]-1)
+        return cls(seed[np.ix_(seedRows, seedCols)], resolution, dropOutsideField)
+
+
+    @classmethod
+    def fromJson(cls, path:str)->"lidarFieldMask":
+        """
+            Loads a field mask from a json file written by writeToJson.
+            The file must include "type" : "fieldMask", the cell size in meters as "cellSize" and the mask as a list of lists of booleans under "mask".
+        """
+        with open(path, 'r') as file:
+            data:dict = json.load(file)
+
+        if data.get("type", "") != "fieldMask":
+            raise Warning(
+                "the file given does not include the correct type tag.",
+                "Please make sure to include \"type\" : \"fieldMask\" in all field mask files so that the library can easily differentiate them."
+            )
+
+        return cls(np.array(data["mask"], dtype=bool), data["cellSize"], data.get("dropOutsideField", True))
+
+
+    @classmethod
+    def load(cls, source:str)->"lidarFieldMask":
+        """
+            Creates a field mask from the fieldMask value of a lidar config.
+            None will return None (no masking), "default" will build the mask from constants.map and any other string is treated as the path to a json mask file.
+        """
+        if source==None:
+            return None
+        if source=="default":
+            return cls.fromConstants()
+        return cls.fromJson(source)
+
+
+    def writeToJson(self, path:str)->None:
+        """Writes the mask to a json file that can be loaded with fromJson"""
+        with open(path, 'w') as file:
+            json.dump({
+                "cellSize" : self.cellSize,
+                "dropOutsideField" : self.dropOutsideField,
+                "mask" : self.mask.tolist(),
+                "type" : "fieldMask"
+            }, file)
+
+
+    def isStatic(self, xy:np.ndarray)->np.ndarray:
+        """
+            Returns a boolean array that is true for every point that lands on static field structure.
+            xy should be a (n, 2) array of field coordinates in meters. All points are checked with a single array lookup.
+        """
+        xy = np.asarray(xy).reshape(-1, 2)
+        cols = np.floor(xy[:, 0]/self.cellSize).astype(np.int64)
+        rows = np.floor(xy[:, 1]/self.cellSize).astype(np.int64)
+        inside = (rows>=0) & (rows<self.mask.shape[0]) & (cols>=0) & (cols<self.mask.shape[1])
+
+        static = np.full(len(xy), self.dropOutsideField)
+        static[inside] = self.mask[rows[inside], cols[inside]]
+        return static
+
+
+    def filterPoints(self, xy:np.ndarray)->np.ndarray:
+        """Returns only the points in xy that do not land on static field structure"""
+        xy = np.asarray(xy).reshape(-1, 2)
+        return xy[~self.isStatic(xy)]
@@ -0,0 +1,213 @@
+import math
+from multiprocessing import Event, Process
+import time
+import numpy as np
+
+from lidarLib.constants import constants
+from lidarLib.lidarObstacleFitting import clusterScanPoints
+from lidarLib.lidarPipeline import lidarPipeline
+from lidarLib.lidarSharedMemory import sharedRingBuffer, sharedScanBuffer, sharedSlot
+
+
+class fusedCloudBuffer(sharedRingBuffer):
+    """
+        Shared ring buffer laid out to hold the merged field frame point cloud of every lidar.
+        Each slot holds the x, y and source (index of the lidar the point came from) of every point along with the fusion id, the end time of the newest scan in the cloud and the number of sources.
+    """
+
+    cloudFields = ["fusionID", "newestEndTime", "sources"]
+
+    def __init__(self, maxPoints:int, slots:int=4, name:str=None):
+        super().__init__(
+            {
+                "x" : (np.float32, maxPoints),
+                "y" : (np.float32, maxPoints),
+                "source" : (np.uint8, maxPoints)
+            },
+            fusedCloudBuffer.cloudFields, slots, name
+        )
+        self.maxPoints=maxPoints
+
+    def __getstate__(self):
+        return {"maxPoints" : self.maxPoints, "slots" : self.slots, "name" : self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxPoints"], state["slots"], state["name"])
+
+
+class fusedGridBuffer(sharedRingBuffer):
+    """
+        Shared ring buffer laid out to hold a occupancy grid built from the merged cloud.
+        The grid is stored flattened, the rows and cols of the grid are kept so it can be reshaped. The fusion id matches the cloud the grid was built from.
+    """
+
+    gridFields = ["fusionID", "rows", "cols"]
+
+    def __init__(self, rows:int, cols:int, slots:int=4, name:str=None):
+        super().__init__({"occupancy" : (np.uint8, rows*cols)}, fusedGridBuffer.gridFields, slots, name)
+        self.rows=rows
+        self.cols=cols
+
+    def __getstate__(self):
+        return {"rows" : self.rows, "cols" : self.cols, "slots" : self.slots, "name" : self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["rows"], state["cols"], state["slots"], state["name"])
+
+
+def lidarFusionLoop(scanBuffers:list[sharedScanBuffer], cloudBuffer:fusedCloudBuffer, gridBuffer:fusedGridBuffer, stopEvent:Event, cellSize:float, staticMask:np.ndarray, pollInterval:float)->None:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Body of the fusion process. Whenever any lidar writes a new scan the newest scan of every lidar is copied into one preallocated cloud,
+        a occupancy grid is built from it and both are written to shared memory. Nothing is allocated per scan other than the index arrays of the grid update.
+    """
+    sequences = [0]*len(scanBuffers)
+    x = np.empty(cloudBuffer.maxPoints, dtype=np.float32)
+    y = np.empty(cloudBuffer.maxPoints, dtype=np.float32)
+    source = np.empty(cloudBuffer.maxPoints, dtype=np.uint8)
+    rows, cols = staticMask.shape
+    occupancy = np.zeros(rows*cols, dtype=np.uint8)
+    free = ~staticMask.ravel()
+    fusionID = 0
+
+    while not stopEvent.is_set():
+        if all(buffer.getSequence()==sequence for buffer, sequence in zip(scanBuffers, sequences)):
+            stopEvent.wait(pollInterval)
+            continue
+
+        count = 0
+        newestEndTime = 0
+        for index, buffer in enumerate(scanBuffers):
+            slot = buffer.readLatest()
+            if slot==None:
+                continue
+            length = min(slot.count, cloudBuffer.maxPoints-count)
+            x[count:count+length] = slot["x"][:length]
+            y[count:count+length] = slot["y"][:length]
+            source[count:count+length] = index
+            #if the lidar lapped the ring while copying, the slot is read again on the next pass
+            sequences[index] = slot.sequence if slot.isValid() else -1
+            newestEndTime = max(newestEndTime, slot.meta["endTime"])
+            count += length
+
+        cellCols = np.floor(x[:count]/cellSize).astype(np.int64)
+        cellRows = np.floor(y[:count]/cellSize).astype(np.int64)
+        inside = (cellRows>=0) & (cellRows<rows) & (cellCols>=0) & (cellCols<cols)
+        occupancy.fill(0)
+        occupancy[cellRows[inside]*cols+cellCols[inside]] = 1
+        occupancy &= free
+
+        fusionID += 1
+        #the grid is written first so a reader that sees a cloud can always find the grid made with it
+        gridBuffer.write(rows*cols, {"fusionID" : fusionID, "rows" : rows, "cols" : cols}, {"occupancy" : occupancy})
+        cloudBuffer.write(count, {"fusionID" : fusionID, "newestEndTime" : newestEndTime, "sources" : len(scanBuffers)}, {"x" : x, "y" : y, "source" : source})
+
+    cloudBuffer.close()
+    gridBuffer.close()
+    for buffer in scanBuffers:
+        buffer.close()
+
+
+class lidarFusion:
+    """
+        Class to handle a separate process that merges the scans of several piped lidars into one field frame point cloud and occupancy grid.
+        Scans are read straight from each lidar's shared scan buffer and the results are written to shared memory, so nothing goes through a pipe
+        and the work done per scan only grows with the number of points.
+    """
+    def __init__(self, lidars:list[lidarPipeline], seed:list[list[bool]]=constants.map, xHeight:float=constants.mapHeightMeters, yWidth:float=constants.mapWidthMeters, cellSize:float=constants.mapNodeSizeMeters, pollInterval:float=constants.fusionPollInterval):
+        """
+            Starts a fusion process for the given piped lidars (made with makePipedLidar).
+            The grid is laid out like a lidarHitboxMap ([y][x] with cellSize meter cells) and cells on the seed are never marked.
+            pollInterval is how long in seconds the process sleeps between checks for new scans.
+        """
+        scanBuffers = [lidar.scanBuffer for lidar in lidars]
+        if any(buffer==None for buffer in scanBuffers):
+            raise ValueError("lidar fusion can only be used with piped lidars that have a shared scan buffer")
+
+        self.cellSize=cellSize
+        rows, cols = math.ceil(yWidth/cellSize), math.ceil(xHeight/cellSize)
+        staticMask = np.zeros((rows, cols), dtype=bool)
+        if seed:
+            seed = np.array(seed, dtype=bool)[:rows, :cols]
+            staticMask[:seed.shape[0], :seed.shape[1]] = seed
+
+        self.cloudBuffer = fusedCloudBuffer(sum(buffer.maxPoints for buffer in scanBuffers))
+        self.gridBuffer = fusedGridBuffer(rows, cols)
+        self.stopEvent = Event()
+        self.process = Process(
+            target=lidarFusionLoop,
+            args=(scanBuffers, self.cloudBuffer, self.gridBuffer, self.stopEvent, cellSize, staticMask, pollInterval),
+            daemon=True
+        )
+        self.process.start()
+
+
+    def getFusionID(self)->int:
+        """Returns the id of the newest fused cloud, this goes up by one every time a new cloud is made and is 0 until the first one"""
+        slot = self.cloudBuffer.readLatest()
+        return int(slot.meta["fusionID"]) if slot else 0
+
+    def waitForNext(self, lastFusionID:int, timeout:float=None)->int:
+        """
+            Blocks until a cloud newer than lastFusionID has been made and returns its id, or returns lastFusionID if timeout seconds pass first.
+            The wait checks shared memory every pollInterval so it does not need a pipe to the fusion process.
+        """
+        deadline = None if timeout==None else time.perf_counter()+timeout
+        while True:
+            fusionID = self.getFusionID()
+            if fusionID!=lastFusionID or (deadline!=None and time.perf_counter()>=deadline) or not self.process.is_alive():
+                return fusionID
+            time.sleep(constants.fusionPollInterval)
+
+    def getLatestCloud(self)->sharedSlot:
+        """
+            Returns a read only zero copy view of the newest fused cloud (x, y and source arrays with fusionID, newestEndTime and sources metadata) or None if there is none yet.
+            See sharedSlot for how long the view stays valid.
+        """
+        return self.cloudBuffer.readLatest()
+
+    def getCloud(self)->tuple[np.ndarray, np.ndarray, dict]:
+        """
+            Returns a copy of the newest fused cloud as a (n, 2) array of field coordinates, a array of the index of the lidar each point came from and the cloud's metadata.
+            Returns a empty cloud if nothing has been fused yet.
+        """
+        slot = self.cloudBuffer.readLatest()
+        if slot==None:
+            return np.empty((0, 2)), np.empty(0, dtype=np.uint8), {field : 0 for field in fusedCloudBuffer.cloudFields}
+        return np.column_stack((slot["x"], slot["y"])).astype(np.float64), slot["source"].copy(), slot.meta
+
+    def getGrid(self, fusionID:int=None)->np.ndarray:
+        """
+            Returns a copy of the newest occupancy grid as a 2d boolean array indexed [y][x], or None if nothing has been fused yet.
+            If fusionID is given None is also returned unless the newest grid was built from that cloud, pass the id from getCloud to get a matching cloud and grid.
+        """
+        slot = self.gridBuffer.readLatest()
+        if slot==None or (fusionID!=None and int(slot.meta["fusionID"])!=fusionID):
+            return None
+        grid = slot["occupancy"].reshape(int(slot.meta["rows"]), int(slot.meta["cols"])).astype(bool)
+        if not slot.isValid():
+            return None
+        return grid
+
+    def stop(self)->None:
+        """Stops the fusion process and releases the shared memory this side holds"""
+        self.stopEvent.set()
+        self.process.join(1)
+        self.cloudBuffer.close()
+        self.gridBuffer.close()
+
+
+def clusterFusedCloud(xy:np.ndarray, source:np.ndarray, maxGap:float=0.15, minPoints:int=3)->np.ndarray:
+    """
+        Clusters a fused cloud one lidar at a time (so clusters never join points from two different scans) and returns a label for each point.
+        Labels are unique across the whole cloud and points that are not in a large enough cluster are labeled -1, the same as clusterScanPoints.
+    """
+    labels = np.full(len(xy), -1, dtype=np.int64)
+    nextLabel = 0
+    for index in np.unique(source):
+        points = source==index
+        sourceLabels = clusterScanPoints(xy[points], maxGap, minPoints)
+        sourceLabels[sourceLabels>=0] += nextLabel
+        labels[points] = sourceLabels
+        nextLabel = max(nextLabel, int(sourceLabels.max())+1) if len(sourceLabels) else nextLabel
+    return labels
@@ -13,16 +13,12 @@ class lidarHitboxNode:
         self.hasBeenTouched=False
 
     
-#     """Takes the measurment to add to this node. Will return false if the measurment is outside the nodes scope and was theirfor not added, true otherwise"""
-#     def addReading(self, reading:lidarMeasurement)->bool:
-            
-#         #if (reading.getX()>self.x and reading.getX()<self.x+self.sideLen) and (reading.getY()>self.y and reading.getY()<self.y+self.sideLen):
-#         self.readings.append(reading)
-#         self.isOpen=False
-#         return True
-#         print("lidarHiboxNode append failure")
-#         return False
+    def addReading(self, reading:lidarMeasurement)->bool:
+        """Adds the measurement to this node and marks the node as closed. The caller is responsible for making sure the measurement is actually inside the node"""
+        self.readings.append(reading)
+        self.isOpen=False
+        return True
     
 
-#     def setLegality(self, isLegal:bool):
-#         self.isLegal=isLegal
\ No newline at end of file
+    def setLegality(self, isLegal:bool):
+        self.isLegal=isLegal
@@ -4,6 +4,9 @@ from lidarLib.constants import constants
 from lidarLib.lidarHitboxNode import lidarHitboxNode
 from lidarLib.lidarMeasurement import lidarMeasurement
 from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarObstacleFitting import fitObstacles, lidarObstacle
+from lidarLib.lidarDistanceField import lidarDistanceField
+import numpy as np
 from wpimath.geometry import Pose2d
 class lidarHitboxMap:
     
@@ -22,16 +25,32 @@ class lidarHitboxMap:
                 self.nodeMap[-1].append(lidarHitboxNode(x*nodeSideLen, y*nodeSideLen, sideLen=self.nodeSideLen))
 
 
-#         self.seed=seed
-#         for y in range(0, len(seed)):
-#             for x in range(0, len(seed[y])):
-                
-#                 self.nodeMap[y][x].setLegality(seed[y][x])
+        #seed marks static field structure as true, nodes on it can never hold a reading
+        self.seed=seed
+        if seed:
+            for y in range(min(len(seed), len(self.nodeMap))):
+                for x in range(min(len(seed[y]), len(self.nodeMap[y]))):
+                    
+                    self.nodeMap[y][x].setLegality(not seed[y][x])
+
+        #array copies of the node states so whole grid operations do not have to walk every node
+        self.occupancy = np.zeros((len(self.nodeMap), len(self.nodeMap[0])), dtype=bool)
+        self.staticMask = np.array([[not node.isLegal for node in row] for row in self.nodeMap], dtype=bool)
+        self.generation=0
+        self.__distanceField:lidarDistanceField=None
+        self.__distanceFieldGeneration=-1
         
 
+    def getIndexAtMeters(self, x:float, y:float)->tuple[int, int]:
+        """Returns the (row, column) of the node that holds the given field coordinates or None if the coordinates are outside of the map"""
+        if x>0 and x<self.xHeight and y>0 and y<self.yWidth:
+            return math.floor(y/self.nodeSideLen), math.floor(x/self.nodeSideLen)
+        return None
+
     def getAtMeters(self, x:int, y:int)->lidarHitboxNode:
-        if x>0 and x<constants.mapHeightMeters and y>0 and y<constants.mapWidthMeters:
-            return self.nodeMap[math.floor(y/constants.mapNodeSizeMeters)][math.floor(x/constants.mapNodeSizeMeters)]
+        index = self.getIndexAtMeters(x, y)
+        if index:
+            return self.nodeMap[index[0]][index[1]]
         else:
             return None
 
@@ -44,115 +63,113 @@ class lidarHitboxMap:
 
 
     def addVal(self, reading:lidarMeasurement)->bool:
-        if self.getAtMeters(reading.getX(), reading.getY()):
-            self.getAtMeters(reading.getX(), reading.getY()).addReading(reading)
-            return True
-        return False
+        index = self.getIndexAtMeters(reading.getX(), reading.getY())
+        if not index:
+            return False
 
-#     def addMap(self, map:lidarMap):
-#         for reading in map.getPoints():
-#             self.addVal(reading)
-
-
-#     def clumpify(self):
-#         self.clumps=[]
-#         for row in self.nodeMap:
-#             for node in row:
-#                 node.hasBeenTouched=False
+        node = self.nodeMap[index[0]][index[1]]
+        if not node.isLegal:
+            return False
+        
+        if node.isOpen:
+            self.occupancy[index]=True
+            self.generation+=1
+        node.addReading(reading)
+        return True
+
+    def addMap(self, map:lidarMap):
+        for reading in map.getPoints():
+            self.addVal(reading)
+
+
+    def addOccupancy(self, occupancy:np.ndarray)->int:
+        """
+            Closes every legal node that is true in occupancy, a [y][x] boolean array with the same layout as self.occupancy (such as the grid made by lidarFusion).
+            Nodes closed this way have no readings so they are used by the distance field and path planning but not by findObstacles. Returns the number of nodes closed.
+        """
+        occupancy = np.asarray(occupancy, dtype=bool)
+        if occupancy.shape!=self.occupancy.shape:
+            raise ValueError("attempted to add a occupancy grid of shape", occupancy.shape, "to a hitbox map of shape", self.occupancy.shape)
+
+        newlyClosed = occupancy & ~self.occupancy & ~self.staticMask
+        for row, col in zip(*np.nonzero(newlyClosed)):
+            self.nodeMap[row][col].isOpen=False
+        closed = int(newlyClosed.sum())
+        if closed:
+            self.occupancy |= newlyClosed
+            self.generation+=1
+        return closed
+
+
+    def getDistanceField(self)->lidarDistanceField:
+        """
+            Returns a distance field to the closest closed or static node, see lidarDistanceField for the batched queries it supports.
+            The field is only recomputed when a node has been closed since the last call, otherwise the cached field is returned.
+        """
+        if self.__distanceFieldGeneration!=self.generation:
+            self.__distanceField = lidarDistanceField(self.occupancy | self.staticMask, self.nodeSideLen)
+            self.__distanceFieldGeneration=self.generation
+        return self.__distanceField
+
+
+    def clumpify(self)->list[list[lidarHitboxNode]]:
+        """
+            Groups all closed nodes into clumps of nodes that touch each other (not counting diagonals).
+            The clumps are saved to self.clumps and returned as a list of lists of nodes.
+        """
+        self.clumps=[]
+        for row in self.nodeMap:
+            for node in row:
+                node.hasBeenTouched=False
+
+        for row in range(len(self.nodeMap)):
+            for col in range(len(self.nodeMap[row])):
+                node = self.nodeMap[row][col]
+                if node.hasBeenTouched or node.isOpen:
+                    continue
+
+                self.clumps.append([])
+                node.hasBeenTouched=True
+                que=[(row, col)]
+                while len(que)!=0:
+                    currentRow, currentCol = que.pop()
+                    self.clumps[-1].append(self.nodeMap[currentRow][currentCol])
+                    for side in self.adjecencyList:
+                        newRow, newCol = currentRow+side[0], currentCol+side[1]
+                        if newRow<0 or newRow>=len(self.nodeMap) or newCol<0 or newCol>=len(self.nodeMap[newRow]):
+                            continue
+
+                        new:lidarHitboxNode = self.nodeMap[newRow][newCol]
+                        if not new.isOpen and not new.hasBeenTouched:
+                            new.hasBeenTouched=True
+                            que.append((newRow, newCol))
+
+        return self.clumps
+    
 
-#         for row in self.nodeMap:
-#             for node in row:
-#                 if not node.hasBeenTouched and not node.isOpen:
-                    
-#                     self.clumps.append([])
-                    
+    def findObstacles(self)->list[lidarObstacle]:
+        """
+            Clumps the closed nodes of the map and fits a oriented rectangle to the readings of every clump.
+            All clumps are fitted in one batch, see lidarObstacleFitting.fitObstacles for more information.
+        """
+        points=[]
+        labels=[]
+        for label, clump in enumerate(self.clumpify()):
+            for node in clump:
+                for reading in node.readings:
+                    points.append(reading.getCart())
+                    labels.append(label)
 
-                    que=[node]
-                    while que.len!=0:
-                        current = que[0]
-                        self.clumps[-1].append(current)
-                        for side in self.adjecencyList:
-                            try:
-                                new:lidarHitboxNode = self.nodeMap[current.y+side[0]][current.x+side[1]]
-                                new.hasBeenTouched=True
-                            except IndexError:
-                                continue
+        return fitObstacles(np.array(points).reshape(-1, 2), np.array(labels, dtype=np.int64))
 
-                            if not new.isOpen:
-                                que.append(node)
 
     @staticmethod
     def findCenter(clump:list[lidarMeasurement])->Pose2d:
-        topHigh:lidarMeasurement=list[0]
-        bottomHigh:lidarMeasurement=list[0]
-        leftHigh:lidarMeasurement=list[0]
-        rightHigh:lidarMeasurement=list[0]
-        for measurment in list:
-            topHigh = lidarHitboxMap.findExtreme(topHigh, measurment)
-            bottomHigh= lidarHitboxMap.findExtreme(bottomHigh, measurment)
-            leftHigh = lidarHitboxMap.findExtreme(leftHigh, measurment)
-            rightHigh = lidarHitboxMap.findExtreme(rightHigh, measurment)
-
-        if ((topHigh.x-bottomHigh.x)**2+(topHigh.y-bottomHigh.y)**2)>((leftHigh.x-rightHigh.x)**2+(leftHigh.y-rightHigh.y)**2):
-            pass
-        else:
-            pass
-
-        
-#     @staticmethod
-#     def findExtreme(first:lidarMeasurement, second:lidarMeasurement, isGreater:bool, isX:bool)->lidarMeasurement:
-#         firstX, firstY = first.getX(), first.getY()
-#         secondX, secondY = second.getX(), second.getY()
-#         if isX:
-#             if isGreater:
-#                 if firstX>secondX:
-#                     return first
-#                 elif firstX<secondX:
-#                     return second
-#                 else:
-#                     if (firstY>secondY):
-#                         return first
-#                     else:
-#                         return second
-            
-#             else:
-#                 if firstX>secondX:
-#                     return second
-#                 elif firstX<secondX:
-#                     return first
-#                 else:
-#                     if (firstY<secondY):
-#                         return second
-#                     else:
-#                         return first
-                    
-#         else:
-#             if isGreater:
-#                 if firstY>secondY:
-#                     return first
-#                 elif firstY<secondY:
-#                     return second
-#                 else:
-#                     if (firstX>secondX):
-#                         return first
-#                     else:
-#                         return second
-            
-#             else:
-#                 if firstY>secondY:
-#                     return second
-#                 elif firstY<secondY:
-#                     return first
-#                 else:
-#                     if (firstX<secondX):
-#                         return second
-#                     else:
-#                         return first
-                    
-            
-
-
-
-
-
-
+        """
+            Estimates the center of a single clump of readings (normally another robot) by fitting a minimum area rectangle around it.
+            The rotation of the returned pose points along the long side of the rectangle. Returns None if the clump is empty.
+        """
+        obstacles = fitObstacles(np.array([reading.getCart() for reading in clump]).reshape(-1, 2), np.zeros(len(clump), dtype=np.int64))
+        if len(obstacles)==0:
+            return None
+        return obstacles[0].pose
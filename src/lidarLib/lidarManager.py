@@ -1,18 +1,32 @@
 import signal
 from lidarLib.LidarConfigs import lidarConfigs
 from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
 from lidarLib import *
+from lidarLib.constants import constants
 from lidarLib.Lidar import Lidar
 from lidarLib.lidarMap import lidarMap
-from lidarLib.lidarPipeline import dataPacket, dataPacketType, lidarPipeline
+from lidarLib.lidarPipeline import commandType, dataPacket, dataPacketType, lidarPipeline
+from lidarLib.lidarProcessingStages import lidarProcessingStage
+from lidarLib.lidarScheduling import applyProcessScheduling
+from lidarLib.lidarSharedMemory import sharedScanBuffer
 import time
-import tests.stop as stop
 from lidarLib.translation import translation
 
-def lidarManager(pipeline:"lidarPipeline", lidarConfig:lidarConfigs):
+def lidarManager(pipeline:"lidarPipeline", lidarConfig:lidarConfigs, stages:list[lidarProcessingStage]=None, deviceMetadata:dict=None):
+    """
+        Body of a piped lidar's process. Connects to the lidar, runs commands sent through the pipeline and publishes every finished scan until a quit request is received or the pipe is closed.
+        deviceMetadata is passed to the lidar so a restarted manager does not have to ask the lidar for its info and scan modes again, see Lidar.getDeviceMetadata.
+    """
     print("Manager start")
+    stages = stages or []
     pipeline:"lidarPipeline"=pipeline
-    lidar:Lidar = Lidar(lidarConfig)
+
+    #applied before the lidar (and so the reader thread) is created so every thread in the process inherits it
+    managerScheduling = applyProcessScheduling(lidarConfig.cpuAffinity, lidarConfig.niceness)
+    for error in managerScheduling["errors"]:
+        print("lidar manager scheduling:", error)
+    lidar:Lidar = Lidar(lidarConfig, deviceMetadata)
 
     if (not lidarConfig.autoConnect):
         raise ValueError("piped lidars must be created with auto connect on but lidar", lidarConfig.port, "was created as piped with it off")
@@ -27,33 +41,54 @@ def lidarManager(pipeline:"lidarPipeline", lidarConfig:lidarConfigs):
 
     quitCount=0
     timesReset=0
+    lastWrittenMapID=None
+    lastSentTrans=None
+    lastSentReaderScheduling=None
+    schedulingSent=False
+    
+    heartbeatLost=False
     
     start =time.perf_counter()
+    managerStart=start
 
     while pipeline.shouldLive:
         
         
 
-        if not pipeline.isConnected():
+        #only a closed pipe ends the process, a client that stops answering for a while may just be stalled and the lidar keeps scanning for it
+        if not pipeline.isPipeOpen():
             time.sleep(0.1)
             break
 
+        if isClientLost(pipeline, managerStart)!=heartbeatLost:
+            heartbeatLost = not heartbeatLost
+            if heartbeatLost and pipeline.getHeartbeatAge()==None:
+                print("lidar", lidarConfig.name, "has not heard from its client since it started, still scanning")
+            elif heartbeatLost:
+                print("lidar", lidarConfig.name, "has not heard from its client for", round(pipeline.getHeartbeatAge(), 2), "seconds, still scanning")
+            else:
+                print("lidar", lidarConfig.name, "heard from its client again")
+
 
         if not lidar.isRunning() and lidar.isConnected():
             lidar.startScan()
             time.sleep(5)
             quitCount+=100
             if quitCount>10000:
+                #the lidar has not managed to scan for a long time, reconnect to it without asking for its metadata again and keep the translation it had
+                deviceMetadata = lidar.getDeviceMetadata()
+                localTranslation = lidar.localTranslation
                 lidar.disconnect()
 
                 timesReset+= 1
-                pipeline._sendData(dataPacket(dataPacketType.quitWarning), timesReset)
+                pipeline._sendData(dataPacket(dataPacketType.quitWarning, timesReset))
                 time.sleep(0.001)
 
-                lidar:Lidar = Lidar(lidarConfigs)
-                lidar.connect()
+                lidar:Lidar = Lidar(lidarConfig, deviceMetadata)
+                lidar.setCurrentLocalTranslation(localTranslation)
                 lidar.setMotorPwm(500)
                 lidar.startScan()
+                quitCount=0
 
         else:
             quitCount-=1
@@ -64,37 +99,32 @@ def lidarManager(pipeline:"lidarPipeline", lidarConfig:lidarConfigs):
         
 
 
-        for action in pipeline._getActionQue():
-            if action.function==Lidar.startScan:
-                try:
-                    action.function(lidar, *action.args)
-                except:
-                    lidar.stop()
-                    
-                    time.sleep(1)
-                    lidar.lidarSerial.flush()
-                    # lidar:Lidar = Lidar(*lidarArgs)
-                    # lidar.setCurrentLocalTranslation(localTranslation)
-                    # lidar.connect(connectionArgs)
-                    
-                    lidar.startScan()
- 
-
-            
-            elif action.returnType==-1:
-                action.function(lidar, *action.args)
-            else:
-                pipeline._sendData(dataPacket(action.returnType, action.function(lidar, *action.args)))
+        runActions(pipeline, lidar)
 
-        if (lidar.getLastMap()):
-            pipeline._sendMap(lidar.getLastMap())
+        #maps only need to be written once, the client reads the newest one from shared memory whenever it wants it
+        lastMap = lidar.getLastMap()
+        if lastMap and lastMap.endTime and lastMap.mapID!=lastWrittenMapID:
+            runStages(pipeline, stages, lastMap)
+            pipeline._writeScan(lastMap, lidar.getCombinedTrans())
+            lastWrittenMapID=lastMap.mapID
         
-        pipeline._sendTrans(lidar.getCombinedTrans())
+        #the reader thread applies its own scheduling when a scan starts so the report is sent again whenever that changes
+        if not schedulingSent or lastSentReaderScheduling is not lidar.readerScheduling:
+            pipeline._sendData(dataPacket(dataPacketType.scheduling, {"manager" : managerScheduling, "reader" : lidar.readerScheduling}))
+            lastSentReaderScheduling=lidar.readerScheduling
+            schedulingSent=True
+
+        combinedTrans = lidar.getCombinedTrans()
+        if (combinedTrans.x, combinedTrans.y, combinedTrans.rotation)!=lastSentTrans:
+            pipeline._sendTrans(combinedTrans)
+            lastSentTrans=(combinedTrans.x, combinedTrans.y, combinedTrans.rotation)
 
         
 
-        if (start+0.02-time.perf_counter())>0:
-            time.sleep(start+0.02-time.perf_counter())
+        #actions are still handled every 20ms but a finished scan wakes the loop straight away so it is sent without waiting for the next tick
+        remaining = start+0.02-time.perf_counter()
+        if remaining>0 and lidar.waitForNextMap(remaining):
+            continue
 
         
         start+=0.02
@@ -105,24 +135,91 @@ def lidarManager(pipeline:"lidarPipeline", lidarConfig:lidarConfigs):
 
 
 
-def makePipedLidar(lidarConfig:lidarConfigs)-> "lidarPipeline":
+def isClientLost(pipeline:lidarPipeline, startTime:float)->bool:
+    """
+        Returns wether or not the client of a manager started at startTime (a time.perf_counter time) should be reported as not heard from.
+        Until the client has been heard from once it is only reported after constants.pipelineStartupGrace seconds, so a client that is still starting up is not reported.
+    """
+    if pipeline.getHeartbeatAge()==None:
+        return time.perf_counter()-startTime>constants.pipelineStartupGrace
+    return not pipeline.isConnected()
+
+
+def runActions(pipeline:lidarPipeline, lidar:Lidar)->int:
+    """
+        Runs every command waiting in the pipeline on the lidar in the order they were sent and sends back their responses. Returns the number of commands run.
+        A failed scan start is retried once after clearing the serial buffer. A response that can not be sent is only reported, the command is never run again because of it.
+    """
+    actions = pipeline._getActionQue()
+    for action in actions:
+        result, error = None, None
+        try:
+            result = action.run(lidar)
+        except Exception as e:
+            error = e
+            #a failed scan start is normally a out of sync serial buffer, clear it and try once more before reporting the error
+            if action.command==commandType.startScan:
+                try:
+                    lidar.stop()
+                    time.sleep(1)
+                    lidar.lidarSerial.flush()
+                    result, error = lidar.startScan(), None
+                except Exception as retryError:
+                    error = retryError
+
+        #the command has already run, a response that can not be sent is only reported and never causes the command to be run again
+        try:
+            pipeline._sendResponse(action, result, error)
+        except Exception as sendError:
+            print("could not send the response to lidar command", action.command, ":", repr(sendError))
+    return len(actions)
+
+
+def runStages(pipeline:lidarPipeline, stages:list[lidarProcessingStage], map:lidarMap)->dict[str, object]:
+    """
+        Runs every processing stage in order on a finished map and publishes their results. 
+        A stage that throws is reported and skipped for this scan without stopping the stages after it. Returns the results keyed by stage name.
+    """
+    results = {}
+    for stage in stages:
+        try:
+            results[stage.name] = stage.process(map, results)
+        except Exception as e:
+            print("lidar processing stage", stage.name, "failed on map", map.mapID, ":", repr(e))
+            results[stage.name] = None
+            continue
+
+        if results[stage.name] is not None:
+            pipeline._sendStageResult(stage.name, map.mapID, results[stage.name])
+    return results
+
+
+def makePipedLidar(lidarConfig:lidarConfigs, stages:list[lidarProcessingStage]=None)-> "lidarPipeline":
     """
         Creates a separate process that handles all rendering and can be updated via a pipe(connection)
         returns a tuple with the first argument being the process, this can be use cancel the process but the primary use is to be saved so the renderer doesn't get garbage collected
         the second argument is one end of a pipe that is used to update the render engine. This pipe should be passed new lidar maps periodically so they can be rendered. 
+        stages is a list of lidarProcessingStage objects that are run in the lidar's process on every finished scan, their results are read with lidarPipeline.getStageResult.
     """
 
 
     print("manager")
-    returnPipe, lidarPipe = Pipe(duplex=True)
-    returnPipe=lidarPipeline(returnPipe)
-    lidarPipe=lidarPipeline(lidarPipe)
-    process= Process(target=lidarManager, args=(lidarPipe, lidarConfig), daemon=True)
-    returnPipe.host=process
-
-    process.start()
+    scanBuffer = sharedScanBuffer()
+    returnPipe, process = startManager(lidarConfig, scanBuffer, stages)
+    return lidarPipeline(returnPipe, process, scanBuffer=scanBuffer)
 
 
-    return returnPipe
+def startManager(lidarConfig:lidarConfigs, scanBuffer:sharedScanBuffer, stages:list[lidarProcessingStage]=None, deviceMetadata:dict=None)->tuple[Connection, Process]:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Starts a lidar manager process that writes its scans into scanBuffer and returns the client end of its pipe along with the process.
+        Used by makePipedLidar and by lidarSupervisor to replace a manager that has died.
+    """
+    returnPipe, managerPipe = Pipe(duplex=True)
+    process= Process(target=lidarManager, args=(lidarPipeline(managerPipe, scanBuffer=scanBuffer), lidarConfig, stages, deviceMetadata), daemon=True)
+    process.start()
+    #the manager has its own copy of its end, closing this one lets the client see the pipe close if the manager dies
+    managerPipe.close()
+    return returnPipe, process
 
     
\ No newline at end of file
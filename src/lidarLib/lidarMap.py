@@ -1,5 +1,9 @@
+import math
 from lidarLib import lidarMeasurement
+import numpy as np
 from lidarLib.translation import translation
+from lidarLib import lidarWireFormat
+from lidarLib import lidarFieldMask
 
 class lidarMap:
     """
@@ -14,6 +18,7 @@ class lidarMap:
             Deadband is a range of angles that should be dropped. the proper format is a list of 2 integers in which the first value is the start of the deadband and the second value is the end
             sensorThetaOffset will be added to the point angle before the deadband is calculated however it is not permanently applied to the point. This should instead be done by the translation argument to addVal
         """
+        self._arrays:tuple[np.ndarray, np.ndarray, np.ndarray]=None
         self.points={}
         self.deadband=deadband
         self.deadbandRaps= deadband != None and deadband[0]>deadband[1]
@@ -24,6 +29,7 @@ class lidarMap:
         self.len=0
         self.startTime=None
         self.endTime=None
+        self.sensorPose:translation=None
         
 
     def __array__(self):
@@ -43,6 +49,69 @@ class lidarMap:
         self.__dict__.update(state)
         self.hostLidar=None
 
+    def __reduce__(self):
+        return (lidarMap.fromBytes, (self.toBytes(),))
+
+
+    @property
+    def points(self)->dict:
+        """
+            Dict of every point in the map keyed by angle.
+            Maps decoded from bytes only hold arrays, the lidarMeasurement objects are built the first time this is accessed.
+            Points of a array backed map can share a angle (once translated and rounded to the wire resolution), those points are keyed by the next float above the angle so none are lost.
+        """
+        if self._points==None:
+            angles, distances, qualities = self._arrays
+            self._points={}
+            for angle, distance, quality in zip(angles.tolist(), distances.tolist(), qualities.tolist()):
+                key = angle
+                while key in self._points:
+                    key = math.nextafter(key, math.inf)
+                self._points[key]=lidarMeasurement.lidarMeasurement.default(False, quality, angle, distance, isInMM=False)
+        return self._points
+
+    @points.setter
+    def points(self, points:dict)->None:
+        self._points=points
+        self._arrays=None
+
+
+    @classmethod
+    def fromArrays(cls, angles:np.ndarray, distances:np.ndarray, qualities:np.ndarray, mapID:int=0, startTime:float=None, endTime:float=None, sensorPose:translation=None)->"lidarMap":
+        """
+            Creates a finished map straight from arrays of angles (degrees), distances (meters) and qualities without building any lidarMeasurement objects.
+            The objects are only built if the points are accessed, getArrays and getCartArray work directly on the arrays.
+        """
+        map = cls(None, mapID=mapID)
+        map._arrays=(np.asarray(angles, dtype=np.float64), np.asarray(distances, dtype=np.float64), np.asarray(qualities, dtype=np.uint8))
+        map._points=None
+        map.len=len(angles)
+        map.startTime=startTime
+        map.endTime=endTime
+        map.sensorPose=sensorPose
+        map.isFinished=True
+        return map
+
+    @classmethod
+    def fromBytes(cls, data:bytes)->"lidarMap":
+        """Creates a finished map from bytes made by toBytes, see lidarWireFormat for the layout"""
+        scan = lidarWireFormat.decodeScan(data)
+        return cls.fromArrays(
+            scan["angles"], scan["distances"], scan["qualities"],
+            scan["mapID"], scan["startTime"], scan["endTime"],
+            translation.fromCart(*scan["pose"]) if scan["pose"] else None
+        )
+
+    def toBytes(self)->bytes:
+        """
+            Packs the map into the versioned binary scan format from lidarWireFormat. This is what is sent when a map is pickled.
+            Angles are kept to 1/64 of a degree and distances to the millimeter, the same resolution the lidar reports. 
+            The deadband, sensor offset and per point time stamps are not kept.
+        """
+        angles, distances, qualities = self.getArrays()
+        pose = (self.sensorPose.x, self.sensorPose.y, self.sensorPose.rotation) if self.sensorPose else None
+        return lidarWireFormat.encodeScan(angles, distances, qualities, self.mapID, self.startTime, self.endTime, pose)
+
 
     def addVal(self, point:lidarMeasurement, translation: translation, printFlag=False)->None:
         """
@@ -82,8 +151,8 @@ class lidarMap:
              
 
         
-        self.len+=1
         self.points[point.angle]=point
+        self.len=len(self.points)
 
         
     
@@ -114,6 +183,54 @@ class lidarMap:
         """Returns a list of all the points within the map"""
         return list(self.points.values())
     
+    def getArrays(self)->tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Returns the angle (degrees), distance (meters) and quality of every point in the map as 3 numpy arrays.
+            Points are in the same order as getPoints (the order they were measured in).
+        """
+        if self._points==None:
+            return self._arrays
+        points = self.getPoints()
+        angles = np.fromiter((point.angle for point in points), dtype=np.float64, count=len(points))
+        distances = np.fromiter((point.distance for point in points), dtype=np.float64, count=len(points))
+        qualities = np.fromiter((point.quality for point in points), dtype=np.uint8, count=len(points))
+        return angles, distances, qualities
+
+    def getCartArray(self)->np.ndarray:
+        """
+            Returns the x and y of every point in the map as a (n, 2) numpy array in meters.
+            Points are in the same order as getPoints (the order they were measured in).
+        """
+        angles, distances, _ = self.getArrays()
+        angles = np.radians(angles)
+        return np.column_stack((distances*np.cos(angles), distances*np.sin(angles)))
+
+
+    def filterPoints(self, keep:np.ndarray)->int:
+        """
+            Drops every point whose value in keep is false. keep should be a boolean array in the same order as getPoints.
+            Maps that are still array backed are filtered without building any lidarMeasurement objects. Returns the number of points dropped.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        dropped = len(keep)-int(keep.sum())
+        if dropped==0:
+            return 0
+        if self._points==None:
+            self._arrays = tuple(array[keep] for array in self._arrays)
+        else:
+            self.points = {angle : point for (angle, point), isKept in zip(self.points.items(), keep) if isKept}
+        self.len = int(keep.sum())
+        return dropped
+
+    def applyFieldMask(self, fieldMask:"lidarFieldMask.lidarFieldMask")->int:
+        """
+            Drops every point in the map that lands on known static field structure. Points must already be translated into field coordinates.
+            The whole map is checked in one vectorized lookup. Returns the number of points dropped.
+        """
+        if self.len==0:
+            return 0
+        return self.filterPoints(~fieldMask.isStatic(self.getCartArray()))
+
 
     def printMap(self)->None:
         """prints the map"""
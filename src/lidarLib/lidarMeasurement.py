@@ -1,6 +1,6 @@
 import cmath
 import time
-from lidarLib.util import polarToX, polarToY
+from lidarLib.util import polarToCart, polarToX, polarToY
 
 class lidarMeasurement:
     """Class to handle a single lidar measurement, coordinates are normally stored in polar but may be gotten in cartesian form using the getX, getY, and getCat methods"""
@@ -9,7 +9,8 @@ class lidarMeasurement:
             initializes a lidar measurement using a package from the lidar
             while measurement_hq objects are accepted by this function the class is currently deprecated and should not be used
         """
-        self.timeStamp=time.time()
+        #monotonic so times from every process on the machine can be compared and robot poses can be matched to readings, see lidarPoseBuffer
+        self.timeStamp=time.monotonic()
 
         if raw_bytes is not None:
             self.start_flag = bool(raw_bytes[0] & 0x1)
@@ -66,4 +67,4 @@ class lidarMeasurement:
     
     def getCart(self)->tuple[float, float]:
         """returns the x and y of the measurement as a tuple. This value is not directly stored and is instead calculated whenever the function is called """
-        return self.polarToCart(self.distance, self.angle)
+        return polarToCart(self.distance, self.angle)
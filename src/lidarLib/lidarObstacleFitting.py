@@ -0,0 +1,151 @@
+import math
+import numpy as np
+from wpimath.geometry import Pose2d, Rotation2d
+
+
+class lidarObstacle:
+    """Class to handle a single obstacle (normally another robot) fitted from a cluster of lidar points"""
+    def __init__(self, pose:Pose2d, length:float, width:float, confidence:float, pointCount:int):
+        """
+            Creates a obstacle. pose is the center of the fitted rectangle with its rotation pointing along the long side.
+            length and width are the size of the fitted rectangle in meters, length is always greater than or equal to width.
+            confidence is a value from 0 to 1 that estimates how much the points in the cluster look like the outline of a rectangle.
+        """
+        self.pose=pose
+        self.length=length
+        self.width=width
+        self.confidence=confidence
+        self.pointCount=pointCount
+
+    def __reduce__(self):
+        #Pose2d can not be pickled so the obstacle is sent as plain values
+        return (lidarObstacle._fromValues, (self.pose.X(), self.pose.Y(), self.pose.rotation().radians(), self.length, self.width, self.confidence, self.pointCount))
+
+    @classmethod
+    def _fromValues(cls, x:float, y:float, rotation:float, length:float, width:float, confidence:float, pointCount:int)->"lidarObstacle":
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Rebuilds a pickled obstacle, rotation is in radians
+        """
+        return cls(Pose2d(x, y, Rotation2d(rotation)), length, width, confidence, pointCount)
+
+    def __str__(self):
+        data = {
+            "x" : self.pose.X(),
+            "y" : self.pose.Y(),
+            "rotation" : self.pose.rotation().degrees(),
+            "length" : self.length,
+            "width" : self.width,
+            "confidence" : self.confidence,
+            "pointCount" : self.pointCount
+        }
+        return str(data)
+
+
+def clusterScanPoints(xy:np.ndarray, maxGap:float=0.15, minPoints:int=3)->np.ndarray:
+    """
+        Splits a single scan into clusters of points that are close together and returns a label for each point.
+        xy should be a (n, 2) array of points in the order they were measured by the lidar (the order returned by lidarMap.getCartArray).
+        A new cluster is started whenever two neighboring points are more than maxGap meters apart.
+        Clusters with less than minPoints points are treated as noise and given the label -1.
+    """
+    if len(xy)==0:
+        return np.zeros(0, dtype=np.int64)
+
+    gaps = np.hypot(*np.diff(xy, axis=0).T)
+    labels = np.concatenate(([0], np.cumsum(gaps>maxGap)))
+
+    #the scan loops around so the last cluster may really be the start of the first one
+    if labels[-1]!=0 and np.hypot(*(xy[-1]-xy[0]))<=maxGap:
+        labels[labels==labels[-1]]=0
+
+    counts = np.bincount(labels)
+    labels[counts[labels]<minPoints]=-1
+    return labels
+
+
+def _fitAngles(xy:np.ndarray, starts:np.ndarray, clusterOfPoint:np.ndarray, cos:np.ndarray, sin:np.ndarray)->tuple:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Projects every point onto each of the given axes and returns the cost of every cluster at every angle along with the rectangle bounds.
+        The cost is the total distance from each point to the closest side of the rectangle, so angles where the points line up with the rectangle outline score best.
+        cos and sin may ether be a (a,) array that is shared by all points or a (n, a) array with different angles for each point.
+        Returns a tuple of (cost, uMin, uMax, vMin, vMax) where every value is a (clusters, a) array.
+    """
+    u = xy[:, 0, None]*cos + xy[:, 1, None]*sin
+    v = xy[:, 1, None]*cos - xy[:, 0, None]*sin
+    uMin, uMax = np.minimum.reduceat(u, starts, axis=0), np.maximum.reduceat(u, starts, axis=0)
+    vMin, vMax = np.minimum.reduceat(v, starts, axis=0), np.maximum.reduceat(v, starts, axis=0)
+
+    edgeDistance = np.minimum(
+        np.minimum(u-uMin[clusterOfPoint], uMax[clusterOfPoint]-u),
+        np.minimum(v-vMin[clusterOfPoint], vMax[clusterOfPoint]-v)
+    )
+    cost = np.add.reduceat(edgeDistance, starts, axis=0)
+    return cost, uMin, uMax, vMin, vMax
+
+
+def fitObstacles(xy:np.ndarray, labels:np.ndarray, coarseStep:float=5, fineStep:float=0.5, edgeTolerance:float=0.05, fullConfidencePoints:int=10)->list[lidarObstacle]:
+    """
+        Fits a oriented rectangle to every cluster of points at once and returns a lidarObstacle for each cluster.
+        Since a lidar only sees one or two sides of a robot the fit picks the angle where the points sit closest to the rectangle outline (a L-shape fit) instead of the angle with the smallest area.
+        xy should be a (n, 2) array of field coordinates in meters and labels a (n,) array with the cluster of each point. Points with a label of -1 are ignored.
+        The rectangle angle is found with a coarse sweep of coarseStep degrees followed by a fine sweep of fineStep degrees around the best coarse angle.
+        All clusters are handled in the same numpy operations so the cost grows with the number of points, not the number of clusters.
+        Confidence is the fraction of points within edgeTolerance meters of the rectangle outline,
+        scaled down for clusters with less than fullConfidencePoints points.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    labels = np.asarray(labels)
+    keep = labels>=0
+    xy, labels = xy[keep], labels[keep]
+    if len(xy)==0:
+        return []
+
+    order = np.argsort(labels, kind="stable")
+    xy, labels = xy[order], labels[order]
+    clusterIDs, starts, counts = np.unique(labels, return_index=True, return_counts=True)
+    clusterOfPoint = np.repeat(np.arange(len(clusterIDs)), counts)
+    clusters = np.arange(len(clusterIDs))
+
+    #all rectangles repeat every 90 degrees so only angles in [0, 90) need to be checked
+    coarse = np.radians(np.arange(0, 90, coarseStep))
+    cost, uMin, uMax, vMin, vMax = _fitAngles(xy, starts, clusterOfPoint, np.cos(coarse), np.sin(coarse))
+    bestCoarse = coarse[np.argmin(cost, axis=1)]
+
+    fine = bestCoarse[:, None] + np.radians(np.arange(-coarseStep, coarseStep+fineStep, fineStep))
+    pointAngles = fine[clusterOfPoint]
+    cost, uMin, uMax, vMin, vMax = _fitAngles(xy, starts, clusterOfPoint, np.cos(pointAngles), np.sin(pointAngles))
+    bestIndex = np.argmin(cost, axis=1)
+    angle = fine[clusters, bestIndex]
+    uMin, uMax = uMin[clusters, bestIndex], uMax[clusters, bestIndex]
+    vMin, vMax = vMin[clusters, bestIndex], vMax[clusters, bestIndex]
+
+    cos, sin = np.cos(angle), np.sin(angle)
+    centerU, centerV = (uMin+uMax)/2, (vMin+vMax)/2
+    centerX = centerU*cos - centerV*sin
+    centerY = centerU*sin + centerV*cos
+
+    length, width = uMax-uMin, vMax-vMin
+    swap = width>length
+    length, width = np.where(swap, width, length), np.where(swap, length, width)
+    angle = np.where(swap, angle+math.pi/2, angle)
+
+    #distance from every point to the closest side of its clusters rectangle
+    pointCos, pointSin = cos[clusterOfPoint], sin[clusterOfPoint]
+    u = xy[:, 0]*pointCos + xy[:, 1]*pointSin
+    v = xy[:, 1]*pointCos - xy[:, 0]*pointSin
+    edgeDistance = np.minimum(
+        np.minimum(u-uMin[clusterOfPoint], uMax[clusterOfPoint]-u),
+        np.minimum(v-vMin[clusterOfPoint], vMax[clusterOfPoint]-v)
+    )
+    edgeFraction = np.add.reduceat((edgeDistance<=edgeTolerance).astype(np.float64), starts)/counts
+    confidence = edgeFraction*np.minimum(1, counts/fullConfidencePoints)
+
+    return [
+        lidarObstacle(
+            Pose2d(float(centerX[i]), float(centerY[i]), Rotation2d(float(angle[i]))),
+            float(length[i]), float(width[i]), float(confidence[i]), int(counts[i])
+        )
+        for i in clusters
+    ]
@@ -0,0 +1,237 @@
+import numpy as np
+from wpimath.geometry import Pose2d, Rotation2d
+
+from lidarLib.lidarObstacleFitting import lidarObstacle
+
+
+class lidarTrack:
+    """Class to handle a single tracked obstacle, includes a id that stays the same between scans as well as a velocity estimate"""
+    def __init__(self, id:int, pose:Pose2d, vx:float, vy:float, covariance:np.ndarray, length:float, width:float, hits:int):
+        """
+            Creates a track. vx and vy are the estimated velocity of the obstacle in meters per second.
+            covariance is the 4x4 covariance of the [x, y, vx, vy] state of the track.
+            hits is the number of scans the track has been matched to a obstacle in.
+        """
+        self.id=id
+        self.pose=pose
+        self.vx=vx
+        self.vy=vy
+        self.covariance=covariance
+        self.length=length
+        self.width=width
+        self.hits=hits
+
+    def __str__(self):
+        data = {
+            "id" : self.id,
+            "x" : self.pose.X(),
+            "y" : self.pose.Y(),
+            "rotation" : self.pose.rotation().degrees(),
+            "vx" : self.vx,
+            "vy" : self.vy,
+            "hits" : self.hits
+        }
+        return str(data)
+
+
+class lidarObstacleTracker:
+    """
+        Class to follow obstacles between scans and estimate their velocity.
+        Every track runs a constant velocity kalman filter with the state [x, y, vx, vy]. All tracks are stored in shared numpy arrays so predictions and corrections are done for every track at once.
+        Obstacles are matched to tracks with a gated global nearest neighbor search over the mahalanobis distance between every track and every obstacle.
+    """
+
+    measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.float64)
+
+    def __init__(self, positionNoise:float=0.05, accelerationNoise:float=3, initialVelocityNoise:float=2, gate:float=9.21, maxMisses:int=5, confirmHits:int=3):
+        """
+            Creates a tracker with no tracks.
+            positionNoise is the standard deviation in meters of a obstacle position measurement.
+            accelerationNoise is the standard deviation in meters per second squared of the (unknown) acceleration of a tracked obstacle.
+            initialVelocityNoise is the standard deviation in meters per second of the velocity of a new track.
+            gate is the largest squared mahalanobis distance at which a obstacle may be matched to a track (9.21 keeps 99% of correct matches).
+            Tracks that go maxMisses updates in a row without a match are dropped and tracks are only returned by getTracks once they have been matched confirmHits times.
+        """
+        self.positionNoise=positionNoise
+        self.accelerationNoise=accelerationNoise
+        self.initialVelocityNoise=initialVelocityNoise
+        self.gate=gate
+        self.maxMisses=maxMisses
+        self.confirmHits=confirmHits
+
+        self.measurementNoise = np.eye(2)*positionNoise**2
+        self.nextID=0
+        self.lastTime=None
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.states = np.zeros((0, 4))
+        self.covariances = np.zeros((0, 4, 4))
+        self.rotations = np.zeros(0)
+        self.sizes = np.zeros((0, 2))
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+
+
+    def predict(self, timeStamp:float)->None:
+        """
+            Moves every track forward to the given time (in seconds) using its current velocity.
+            Times older than the last update (for example a late scan from a second lidar) are treated as happening at the last update time.
+        """
+        if self.lastTime==None:
+            self.lastTime=timeStamp
+            return
+
+        dt = max(timeStamp-self.lastTime, 0)
+        self.lastTime=max(timeStamp, self.lastTime)
+        if dt==0 or len(self.ids)==0:
+            return
+
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = dt
+
+        #white noise acceleration model
+        q = self.accelerationNoise**2
+        processNoise = np.array([
+            [dt**4/4, 0, dt**3/2, 0],
+            [0, dt**4/4, 0, dt**3/2],
+            [dt**3/2, 0, dt**2, 0],
+            [0, dt**3/2, 0, dt**2]
+        ])*q
+
+        self.states = self.states@transition.T
+        self.covariances = transition@self.covariances@transition.T + processNoise
+
+
+    def update(self, obstacles:list[lidarObstacle], timeStamp:float)->list[lidarTrack]:
+        """
+            Predicts every track forward to timeStamp (in seconds) and then corrects them with the given obstacles.
+            Obstacles that do not match any track start new tracks. Returns the confirmed tracks after the update.
+        """
+        self.predict(timeStamp)
+
+        measurements = np.array([(obstacle.pose.X(), obstacle.pose.Y()) for obstacle in obstacles]).reshape(-1, 2)
+        trackMatches, obstacleMatches = self.__associate(measurements)
+
+        if len(trackMatches)>0:
+            self.__correct(trackMatches, measurements[obstacleMatches])
+            for track, obstacle in zip(trackMatches, obstacleMatches):
+                self.rotations[track] = obstacles[obstacle].pose.rotation().radians()
+                self.sizes[track] = (obstacles[obstacle].length, obstacles[obstacle].width)
+
+        matched = np.zeros(len(self.ids), dtype=bool)
+        matched[trackMatches] = True
+        self.hits[matched]+=1
+        self.misses[matched]=0
+        self.misses[~matched]+=1
+
+        unmatched = np.ones(len(obstacles), dtype=bool)
+        unmatched[obstacleMatches] = False
+        self.__createTracks([obstacle for obstacle, isNew in zip(obstacles, unmatched) if isNew])
+
+        self.__removeTracks(self.misses>self.maxMisses)
+
+        return self.getTracks()
+
+
+    def __associate(self, measurements:np.ndarray)->tuple[np.ndarray, np.ndarray]:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Matches measurements to tracks and returns a tuple of (track indexes, measurement indexes) for every match.
+            Every pair closer than the gate is sorted by mahalanobis distance and accepted greedily, so each track and each measurement is used at most once.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if len(self.ids)==0 or len(measurements)==0:
+            return empty, empty
+
+        innovation = measurements[None, :, :] - self.states[:, None, :2]
+        innovationCovariance = self.covariances[:, :2, :2] + self.measurementNoise
+        distances = np.einsum("tmi,tij,tmj->tm", innovation, np.linalg.inv(innovationCovariance), innovation)
+
+        tracks, candidates = np.nonzero(distances<self.gate)
+        order = np.argsort(distances[tracks, candidates], kind="stable")
+        usedTracks, usedMeasurements = set(), set()
+        trackMatches, measurementMatches = [], []
+        for track, measurement in zip(tracks[order], candidates[order]):
+            if track in usedTracks or measurement in usedMeasurements:
+                continue
+            usedTracks.add(track)
+            usedMeasurements.add(measurement)
+            trackMatches.append(track)
+            measurementMatches.append(measurement)
+
+        return np.array(trackMatches, dtype=np.int64), np.array(measurementMatches, dtype=np.int64)
+
+
+    def __correct(self, tracks:np.ndarray, measurements:np.ndarray)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Runs the kalman correction step on the given tracks using one measurement per track. All tracks are corrected at once.
+        """
+        h = lidarObstacleTracker.measurementMatrix
+        covariances = self.covariances[tracks]
+        innovation = measurements - self.states[tracks, :2]
+        innovationCovariance = covariances[:, :2, :2] + self.measurementNoise
+        gain = covariances@h.T@np.linalg.inv(innovationCovariance)
+
+        self.states[tracks] += np.einsum("tij,tj->ti", gain, innovation)
+        self.covariances[tracks] = (np.eye(4) - gain@h)@covariances
+
+
+    def __createTracks(self, obstacles:list[lidarObstacle])->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Starts a new track for every obstacle given with no velocity.
+        """
+        if len(obstacles)==0:
+            return
+        count = len(obstacles)
+
+        states = np.zeros((count, 4))
+        states[:, 0] = [obstacle.pose.X() for obstacle in obstacles]
+        states[:, 1] = [obstacle.pose.Y() for obstacle in obstacles]
+        covariances = np.zeros((count, 4, 4))
+        covariances[:] = np.diag([self.positionNoise**2, self.positionNoise**2, self.initialVelocityNoise**2, self.initialVelocityNoise**2])
+
+        self.ids = np.concatenate((self.ids, np.arange(self.nextID, self.nextID+count)))
+        self.nextID+=count
+        self.states = np.concatenate((self.states, states))
+        self.covariances = np.concatenate((self.covariances, covariances))
+        self.rotations = np.concatenate((self.rotations, [obstacle.pose.rotation().radians() for obstacle in obstacles]))
+        self.sizes = np.concatenate((self.sizes, [(obstacle.length, obstacle.width) for obstacle in obstacles]))
+        self.hits = np.concatenate((self.hits, np.ones(count, dtype=np.int64)))
+        self.misses = np.concatenate((self.misses, np.zeros(count, dtype=np.int64)))
+
+
+    def __removeTracks(self, toRemove:np.ndarray)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Drops every track where toRemove is true.
+        """
+        keep = ~toRemove
+        self.ids = self.ids[keep]
+        self.states = self.states[keep]
+        self.covariances = self.covariances[keep]
+        self.rotations = self.rotations[keep]
+        self.sizes = self.sizes[keep]
+        self.hits = self.hits[keep]
+        self.misses = self.misses[keep]
+
+
+    def getTracks(self, confirmedOnly:bool=True)->list[lidarTrack]:
+        """
+            Returns every track as a lidarTrack object.
+            If confirmedOnly is true tracks that have been matched less than confirmHits times are left out.
+        """
+        tracks = []
+        for i in range(len(self.ids)):
+            if confirmedOnly and self.hits[i]<self.confirmHits:
+                continue
+            tracks.append(lidarTrack(
+                int(self.ids[i]),
+                Pose2d(float(self.states[i, 0]), float(self.states[i, 1]), Rotation2d(float(self.rotations[i]))),
+                float(self.states[i, 2]), float(self.states[i, 3]),
+                self.covariances[i].copy(),
+                float(self.sizes[i, 0]), float(self.sizes[i, 1]),
+                int(self.hits[i])
+            ))
+        return tracks
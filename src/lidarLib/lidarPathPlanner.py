@@ -0,0 +1,185 @@
+import heapq
+import math
+import numpy as np
+from wpimath.geometry import Pose2d, Rotation2d
+
+from lidarLib.constants import constants
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+
+
+class lidarPathPlanner:
+    """
+        Class to plan obstacle aware paths over a lidarHitboxMap.
+        Obstacles (including static field structure) are inflated by the robot radius using the maps distance field, an A* search is run over the inflated grid
+        and the resulting path is shortened with line of sight checks so it is not locked to grid angles.
+        The last path is kept and reused for as long as it stays clear, so most calls only cost a check of the cells along the old path.
+    """
+
+    neighbors = [
+        (0, 1, 1), (0, -1, 1), (1, 0, 1), (-1, 0, 1),
+        (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2))
+    ]
+
+    def __init__(self, robotRadius:float=constants.robotRadiusMeters):
+        """Creates a path planner for a robot that fits inside a circle of robotRadius meters"""
+        self.robotRadius=robotRadius
+
+        self.__heuristic:np.ndarray=None
+        self.__heuristicGoal=None
+        self.__lastGoal=None
+        self.__lastPath:list[tuple[int, int]]=None
+
+
+    def plan(self, map:lidarHitboxMap, start:Pose2d, goal:Pose2d)->list[Pose2d]:
+        """
+            Returns a list of poses from start to goal that stay at least robotRadius away from every obstacle in the map.
+            Every pose but the last faces the next pose in the path, the last pose uses the rotation of goal.
+            Returns a empty list if the goal is blocked, outside the map or can not be reached.
+        """
+        startCell = map.getIndexAtMeters(start.X(), start.Y())
+        goalCell = map.getIndexAtMeters(goal.X(), goal.Y())
+        if not startCell or not goalCell:
+            return []
+
+        blocked = map.getDistanceField().distances<self.robotRadius
+        if blocked[goalCell]:
+            self.__lastPath=None
+            return []
+
+        cells = self.__reusePath(blocked, startCell, goalCell)
+        if cells==None:
+            cells = self.__search(blocked, startCell, goalCell)
+            self.__lastGoal=goalCell
+            self.__lastPath=cells
+            if cells==None:
+                return []
+
+        return self.__toPoses(self.__shorten(blocked, cells), start, goal, map.nodeSideLen)
+
+
+    def __reusePath(self, blocked:np.ndarray, startCell:tuple[int, int], goalCell:tuple[int, int])->list[tuple[int, int]]:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the part of the last path from the cell closest to the start onward if the goal has not changed,
+            the start is still next to the path and every cell left on the path is still clear. Otherwise returns None.
+        """
+        if self.__lastPath==None or self.__lastGoal!=goalCell:
+            return None
+
+        path = np.array(self.__lastPath)
+        offsets = np.abs(path-np.array(startCell)).max(axis=1)
+        closest = int(np.argmin(offsets))
+        if offsets[closest]>1:
+            return None
+
+        remaining = path[closest:]
+        if blocked[remaining[:, 0], remaining[:, 1]].any():
+            return None
+
+        self.__lastPath=self.__lastPath[closest:]
+        if self.__lastPath[0]!=startCell:
+            self.__lastPath.insert(0, startCell)
+        return self.__lastPath
+
+
+    def __getHeuristic(self, goalCell:tuple[int, int], shape:tuple[int, int])->np.ndarray:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the octile distance (in cells) from every cell to the goal. The array is only rebuilt when the goal or grid size changes.
+        """
+        if self.__heuristicGoal!=(goalCell, shape):
+            rows, cols = np.indices(shape)
+            dRow, dCol = np.abs(rows-goalCell[0]), np.abs(cols-goalCell[1])
+            self.__heuristic = np.maximum(dRow, dCol) + (math.sqrt(2)-1)*np.minimum(dRow, dCol)
+            self.__heuristicGoal=(goalCell, shape)
+        return self.__heuristic
+
+
+    def __search(self, blocked:np.ndarray, startCell:tuple[int, int], goalCell:tuple[int, int])->list[tuple[int, int]]:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Runs an 8 connected A* search from startCell to goalCell and returns the list of cells in the path or None if there is no path.
+            The start cell is always allowed so a robot that is already too close to a wall can still drive away from it. Diagonal moves may not cut corners.
+        """
+        rows, cols = blocked.shape
+        heuristic = self.__getHeuristic(goalCell, blocked.shape)
+        cost = np.full(blocked.shape, np.inf)
+        parent = np.full(blocked.shape + (2,), -1, dtype=np.int64)
+        closed = np.zeros(blocked.shape, dtype=bool)
+
+        cost[startCell]=0
+        que = [(heuristic[startCell], 0.0, startCell)]
+        while len(que)!=0:
+            _, currentCost, current = heapq.heappop(que)
+            if closed[current]:
+                continue
+            closed[current]=True
+            if current==goalCell:
+                break
+
+            for dRow, dCol, stepCost in lidarPathPlanner.neighbors:
+                row, col = current[0]+dRow, current[1]+dCol
+                if row<0 or row>=rows or col<0 or col>=cols or blocked[row, col] or closed[row, col]:
+                    continue
+                if dRow!=0 and dCol!=0 and (blocked[current[0], col] or blocked[row, current[1]]):
+                    continue
+
+                newCost = currentCost+stepCost
+                if newCost<cost[row, col]:
+                    cost[row, col]=newCost
+                    parent[row, col]=current
+                    heapq.heappush(que, (newCost+heuristic[row, col], newCost, (row, col)))
+
+        if not closed[goalCell]:
+            return None
+
+        cells = [goalCell]
+        while cells[-1]!=startCell:
+            cells.append(tuple(int(value) for value in parent[cells[-1]]))
+        cells.reverse()
+        return cells
+
+
+    def __hasLineOfSight(self, blocked:np.ndarray, first:tuple[int, int], second:tuple[int, int])->bool:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns wether or not the straight line between the centers of two cells only crosses clear cells. The line is sampled every quarter cell.
+        """
+        steps = int(max(abs(second[0]-first[0]), abs(second[1]-first[1]))*4)+1
+        samples = np.linspace(0, 1, steps+1)
+        rows = np.rint(first[0]+(second[0]-first[0])*samples).astype(np.int64)
+        cols = np.rint(first[1]+(second[1]-first[1])*samples).astype(np.int64)
+        return not blocked[rows, cols][1:].any()
+
+
+    def __shorten(self, blocked:np.ndarray, cells:list[tuple[int, int]])->list[tuple[int, int]]:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Removes every cell from the path that can be skipped with a straight line, keeping only the corners.
+        """
+        shortened = [cells[0]]
+        index = 0
+        while index<len(cells)-1:
+            furthest = len(cells)-1
+            while furthest>index+1 and not self.__hasLineOfSight(blocked, cells[index], cells[furthest]):
+                furthest-=1
+            shortened.append(cells[furthest])
+            index=furthest
+        return shortened
+
+
+    def __toPoses(self, cells:list[tuple[int, int]], start:Pose2d, goal:Pose2d, cellSize:float)->list[Pose2d]:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Turns a list of cells into field poses. The first and last cells are replaced with the exact start and goal positions.
+        """
+        points = [(start.X(), start.Y())]
+        points.extend(((col+0.5)*cellSize, (row+0.5)*cellSize) for row, col in cells[1:-1])
+        points.append((goal.X(), goal.Y()))
+
+        poses = []
+        for index in range(len(points)-1):
+            heading = math.atan2(points[index+1][1]-points[index][1], points[index+1][0]-points[index][0])
+            poses.append(Pose2d(points[index][0], points[index][1], Rotation2d(heading)))
+        poses.append(goal)
+        return poses
@@ -1,12 +1,19 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
 from multiprocessing import Pipe, Process
 from multiprocessing.connection import Connection
-from time import time
+import os
+import pickle
+import threading
+from time import perf_counter, monotonic
 
+from lidarLib.constants import constants
 from lidarLib.lidarMap import lidarMap
 from lidarLib.Lidar import Lidar
 from enum import Enum
 
 from lidarLib.lidarProtocol import RPlidarDeviceInfo, RPlidarHealth, RPlidarSampleRate, RPlidarScanMode
+from lidarLib.lidarSharedMemory import sharedScanBuffer, sharedSlot
 from lidarLib.translation import translation
 
 
@@ -15,12 +22,24 @@ class lidarPipeline:
         Class that encapsulates pipe connections between a user and a lidar manager
         This class has all of the user side functions present in a standard lidar object and can therefore be used mostly interchangeably.
         However be aware that due to the very different internals of the two classes they may behave differently in certain circumstances. 
+        Every command sent to the lidar returns a commandFuture that is resolved with the return value (or exception) of the command once the lidar side has run it.
+        Each end of the pipeline has a reader and a writer thread (started the first time the pipeline is used in a process). 
+        The reader handles everything sent to it as it arrives, so reading data, isConnected and isRunning only look at what has already been received and never touch the pipe.
+        Data packets are sent through latest value channels, sending one only overwrites the last unsent value of its type and never blocks, even if the other side has stopped reading.
+        Commands, responses and quit requests are sent in order and never dropped. The writer sends heartbeats when nothing else has been sent for a while.
     """
-    def __init__(self, pipe:Connection, host:Process=None):
-        """Creates a render pipe cap surrounding the pipe input"""
+    def __init__(self, pipe:Connection, host:Process=None, scanBuffer:sharedScanBuffer=None):
+        """
+            Creates a lidar pipeline surrounding the pipe input.
+            If scanBuffer is given finished scans are passed through it (shared memory) instead of being pickled through the pipe. Both ends of the pipeline must be given the same buffer.
+        """
         self.__pipe=pipe
         self.__dataPackets = []
         self.host=host
+        self.scanBuffer=scanBuffer
+        self.__lastMap:lidarMap=None
+        self.__lastMapSequence=0
+        self.__scanNotifications=0
 
 
         for type in dataPacketType.options:
@@ -28,39 +47,235 @@ class lidarPipeline:
             self.__dataPackets.append(None)
 
         self.shouldLive=True
+        self.quitRequested=False
 
         self.__commandQue:list[commandPacket] = []
+        self.__pendingRequests:dict[int, commandFuture] = {}
+        self.__nextRequestID=0
+        self.__batch:list[commandPacket]=None
+
+        self.__lastWaitedScan=0
+        self.__lastScanTime:float=None
+        self.__scanInterval=1.0
+        self.__lastReceived:float=None
+        self.__closed=False
+        self.__readThread:threading.Thread=None
+        self.__writeThread:threading.Thread=None
+        self.__ioPid:int=None
+        self.__ioGeneration=0
+        self.__condition=threading.Condition()
+        self.__statefulCommands:dict[object, commandPacket]={}
+
+        self.__outbox:list=[None for _ in dataPacketType.options]
+        self.__orderedOutbox:list=[]
+        self.__overwrites:list[int]=[0 for _ in dataPacketType.options]
+        self.__stageOutbox:dict[str, stagePacket]={}
+        self.__stageOverwrites:dict[str, int]={}
+        self.__stageResults:dict[str, stagePacket]={}
+        self.__inFlight=0
+        self.__outboxCondition=threading.Condition()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        #threads, locks and futures can not be sent to another process, the receiving process starts its own io threads
+        for key in ("_lidarPipeline__condition", "_lidarPipeline__outboxCondition"):
+            del state[key]
+        state["_lidarPipeline__readThread"]=None
+        state["_lidarPipeline__writeThread"]=None
+        state["_lidarPipeline__ioPid"]=None
+        state["_lidarPipeline__outbox"]=[None for _ in dataPacketType.options]
+        state["_lidarPipeline__orderedOutbox"]=[]
+        state["_lidarPipeline__stageOutbox"]={}
+        state["_lidarPipeline__inFlight"]=0
+        state["_lidarPipeline__pendingRequests"]={}
+        state["host"]=None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__condition=threading.Condition()
+        self.__outboxCondition=threading.Condition()
+
+    def __get(self)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Makes sure the io threads are running in this process. Everything sent over the pipe is read by the reader thread as it arrives so there is nothing else to do here.
+        """
+        if self.__ioPid==os.getpid():
+            return
+        with self.__condition:
+            if self.__ioPid==os.getpid():
+                return
+            self.__ioPid=os.getpid()
+            self.__readThread=threading.Thread(target=self.__readLoop, args=(self.__ioGeneration,), daemon=True)
+            self.__writeThread=threading.Thread(target=self.__writeLoop, args=(self.__ioGeneration,), daemon=True)
+            self.__readThread.start()
+            self.__writeThread.start()
+
+    def __isCurrent(self, generation:int)->bool:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns wether or not io threads started for the given generation should keep running. Threads of an old connection stop once _reconnect replaces it.
+        """
+        return not self.__closed and generation==self.__ioGeneration
 
-    def __get(self)->lidarMap:
+    def __readLoop(self, generation:int)->None:
         """
             INTERNAL FUNCTION, NOT FOR OUTSIDE USE
-            returns the most recent data sent over the pipe, since the render machine never sends data this function should never be used by the user
+            Body of the reader thread. Handles everything received from the pipe until it is closed.
+        """
+        pipe = self.__pipe
+        while self.__isCurrent(generation):
+            try:
+                if pipe.poll(constants.pipelineHeartbeatInterval):
+                    self.__receive(pipe.recv())
+            except ValueError as e:
+                print(e)
+            except (EOFError, OSError):
+                if generation==self.__ioGeneration:
+                    self.__setClosed()
+
+    def __writeLoop(self, generation:int)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Body of the writer thread. Sends everything in the ordered outbox and then the newest value of each data channel, 
+            or a heartbeat if nothing was sent for constants.pipelineHeartbeatInterval seconds.
+            If the other side stops reading only this thread blocks, the data channels keep being overwritten with the newest values.
+        """
+        pipe = self.__pipe
+        while self.__isCurrent(generation):
+            with self.__outboxCondition:
+                self.__outboxCondition.wait_for(lambda: self.__getQueueDepth()>0 or not self.__isCurrent(generation), constants.pipelineHeartbeatInterval)
+                if not self.__isCurrent(generation):
+                    break
+                #stage results go before data so they have arrived by the time the scan notification for the same scan wakes a client
+                outgoing = self.__orderedOutbox + list(self.__stageOutbox.values()) + [data for data in self.__outbox if data!=None]
+                self.__orderedOutbox=[]
+                self.__stageOutbox={}
+                self.__outbox=[None for _ in dataPacketType.options]
+                self.__inFlight=len(outgoing)
+
+            if len(outgoing)==0:
+                outgoing.append(ping(monotonic()))
+            try:
+                for value in outgoing:
+                    pipe.send(value)
+            except (EOFError, OSError):
+                if generation==self.__ioGeneration:
+                    self.__setClosed()
+
+            with self.__outboxCondition:
+                self.__inFlight=0
+                self.__outboxCondition.notify_all()
+
+    def __setClosed(self)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Marks the pipe as closed and wakes everything waiting on it.
+        """
+        if not self.__closed:
+            print("lidar pipeline missing connection")
+        with self.__condition:
+            self.__closed=True
+            self.__condition.notify_all()
+        with self.__outboxCondition:
+            self.__outboxCondition.notify_all()
+
+    def __receive(self, mostRecentVal)->None:
         """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Handles a single value received from the pipe and wakes anything waiting on the pipeline.
+        """
+        with self.__condition:
+            self.__lastReceived=perf_counter()
+            if (mostRecentVal.__class__ == dataPacket):
+                self.__dataPackets[mostRecentVal.type] = mostRecentVal.data
+                if mostRecentVal.type in (dataPacketType.lidarMap, dataPacketType.scanNotify):
+                    if self.__lastScanTime!=None:
+                        self.__scanInterval=self.__lastReceived-self.__lastScanTime
+                    self.__lastScanTime=self.__lastReceived
+                    self.__scanNotifications+=1
+
+            elif (mostRecentVal.__class__ == commandPacket):
+                self.__commandQue.append(mostRecentVal)
+
+            elif (mostRecentVal.__class__ == commandBatch):
+                self.__commandQue.extend(mostRecentVal.commands)
+
+            elif (mostRecentVal.__class__ == responsePacket):
+                self.__resolve(mostRecentVal)
+
+            elif (mostRecentVal.__class__ == stagePacket):
+                self.__stageResults[mostRecentVal.name]=mostRecentVal
+
+            elif(mostRecentVal.__class__ == quitPacket):
+                self.shouldLive=False
             
-        if self.isConnected():    
-            while self.__pipe.poll():
-                try:
-                    mostRecentVal = self.__pipe.recv()
-                    if (mostRecentVal.__class__ == dataPacket):
-                        self.__dataPackets[mostRecentVal.type] = mostRecentVal.data
-
-                    elif (mostRecentVal.__class__ == commandPacket):
-                        self.__commandQue.append(mostRecentVal)
-
-                    elif(mostRecentVal.__class__ == quitPacket):
-                        self.shouldLive=False
-                    
-                    elif(mostRecentVal.__class__ == ping):
-                        pass
-
-                    else:
-                        raise ValueError("attempted to send a value over the lidar pipeline that was not of type commandPacket or dataPacket")
-                
-                except EOFError:
-                    print("lidar pipeline missing connection")
-                    return
+            elif(mostRecentVal.__class__ == ping):
+                pass
+
+            else:
+                raise ValueError("attempted to send a value over the lidar pipeline that was not of type commandPacket or dataPacket")
+            self.__condition.notify_all()
+
+    def __send(self, value)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Queues a value to be sent in order by the writer thread. Data packets should go through _sendData so they are conflated instead.
+        """
+        self.__get()
+        with self.__outboxCondition:
+            self.__orderedOutbox.append(value)
+            self.__outboxCondition.notify()
+
+    def __getQueueDepth(self)->int:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the number of values waiting to be sent, the outbox condition must be held.
+        """
+        return len(self.__orderedOutbox)+len(self.__stageOutbox)+sum(data!=None for data in self.__outbox)
+
+    def getChannelStats(self)->dict:
+        """
+            Returns information on how well the other side is keeping up with what this side sends.
+            "queueDepth" is the number of values waiting to be sent (including ones the writer thread is sending right now) and "overwrites" is a list indexed by dataPacketType of how many values of that type were replaced by a newer one before they could be sent.
+            "stageOverwrites" is the same as overwrites but for processing stage results, keyed by stage name.
+            Overwrites that keep climbing mean the other side (or the pipe) is not keeping up and is only seeing the newest values.
+        """
+        with self.__outboxCondition:
+            return {"queueDepth" : self.__getQueueDepth()+self.__inFlight, "overwrites" : list(self.__overwrites), "stageOverwrites" : dict(self.__stageOverwrites)}
+
+    def flush(self, timeout:float=None)->bool:
+        """Blocks until everything queued has been handed to the pipe or timeout seconds pass. Returns wether or not everything was sent"""
+        self.__get()
+        with self.__outboxCondition:
+            return self.__outboxCondition.wait_for(lambda: self.__getQueueDepth()+self.__inFlight==0 or self.__closed, timeout) and not self.__closed
+
+
+    def __resolve(self, response:"responsePacket")->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Completes the future waiting on the response and caches the result if the command had a return type.
+        """
+        if response.error==None and response.returnType!=-1:
+            self.__dataPackets[response.returnType]=response.result
+
+        future = self.__pendingRequests.pop(response.requestID, None)
+        if future==None or future.done():
+            return
+        if response.error!=None:
+            future.set_exception(response.error)
         else:
-            print("lidar pipeline missing connection")
+            future.set_result(response.result)
+
+    def _waitForResponse(self, future:"commandFuture", timeout:float=None)->bool:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Waits until the future is done or timeout seconds have passed. Returns wether or not the future is done.
+        """
+        self.__get()
+        with self.__condition:
+            return self.__condition.wait_for(lambda: future.done() or self.__closed, timeout) and future.done()
 
 
     def close(self)->None:
@@ -68,9 +283,74 @@ class lidarPipeline:
             Closes the connecting pipe.
             WARNING. This function does not properly shut down anything. Please use sendQuitRequest instead.
         """
+        #marked closed first so a deliberate close is not reported as a lost connection
+        self.__closed=True
+        self.__setClosed()
         self.__pipe.close()
+        if self.scanBuffer:
+            self.scanBuffer.close()
 
 
+    def _reconnect(self, pipe:Connection, host:Process=None)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Moves this pipeline onto a new pipe to a new lidar side (see lidarSupervisor) without anyone using the pipeline having to do anything.
+            The old pipe is closed and its io threads stop, commands still waiting for a response from the old side fail with a ConnectionError 
+            and the newest stateful commands (translations, deadband, motor speed and scan mode) are sent again so the new side ends up in the same state.
+            Data already received (the last map, device info, stage results) is kept until the new side replaces it. Values queued but not yet sent go to the new side.
+        """
+        #replays from a earlier reconnect that never got sent are replaced by the ones sent below so the new side does not run them twice.
+        #this is done before the swap as another thread may start the new io threads (see __get) as soon as the swap happens
+        with self.__outboxCondition:
+            self.__orderedOutbox=[
+                value for value in self.__orderedOutbox
+                if not (isinstance(value, commandPacket) and value.requestID==None and value.command in commandType.stateful)
+            ]
+        oldPipe = self.__pipe
+        with self.__condition:
+            self.__ioGeneration+=1
+            self.__pipe=pipe
+            self.host=host
+            self.__closed=False
+            self.__lastReceived=None
+            self.__ioPid=None
+            pending = self.__pendingRequests
+            self.__pendingRequests={}
+            self.__condition.notify_all()
+        with self.__outboxCondition:
+            self.__outboxCondition.notify_all()
+        #the old threads stop within one poll, they are waited for so the old pipe is not closed while they are still using it
+        for thread in (self.__readThread, self.__writeThread):
+            if thread!=None and thread is not threading.current_thread() and thread.ident!=None and thread.is_alive():
+                thread.join(2*constants.pipelineHeartbeatInterval)
+        oldPipe.close()
+
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("the lidar side of the pipeline was restarted before the command was answered"))
+
+        for command in self.__statefulCommands.values():
+            #the manager starts normal scans on its own
+            if command.command!=commandType.startScan:
+                self._sendAction(commandPacket(command.command, command.args, command.returnType))
+        self.__get()
+
+    def _getDeviceMetadata(self)->dict:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the device metadata last sent by the lidar side in the format of Lidar.getDeviceMetadata, or None if any of it has not been received.
+        """
+        metadata = {
+            "lidarInfo" : self.getDataPacket(dataPacketType.lidarInfo),
+            "sampleRate" : self.getDataPacket(dataPacketType.sampleRate),
+            "scanModeCount" : self.getDataPacket(dataPacketType.scanModeCount),
+            "scanModes" : self.getDataPacket(dataPacketType.scanModes),
+            "typicalScanMode" : self.getDataPacket(dataPacketType.scanModeTypical)
+        }
+        if any(value==None for value in metadata.values()):
+            return None
+        return metadata
+
     def _getNextAction(self)->"commandPacket":
         """
             Returns the next action packet in the que sent by the other lidar pipe and removes said action from the que.
@@ -78,8 +358,9 @@ class lidarPipeline:
     
         """
         self.__get()
-        if (self.__commandQue.len>0):
-            return self.__commandQue.pop(0)
+        with self.__condition:
+            if (len(self.__commandQue)>0):
+                return self.__commandQue.pop(0)
         
         return None
     
@@ -90,7 +371,7 @@ class lidarPipeline:
         """
 
         self.__get()
-        if (self.__commandQue.len>0):
+        if (len(self.__commandQue)>0):
             return self.__commandQue[0]
         
         return None
@@ -102,8 +383,9 @@ class lidarPipeline:
             This function should only be called on the lidar side of the pipe as the lidar will never send actions through the que.
         """
         self.__get()
-        temp = self.__commandQue
-        self.__commandQue=[]
+        with self.__condition:
+            temp = self.__commandQue
+            self.__commandQue=[]
         return temp
     
     def _peakActionQue(self)->list["commandPacket"]:
@@ -133,6 +415,37 @@ class lidarPipeline:
 
         self._sendData(dataPacket(dataPacketType.lidarMap, map))
 
+    def _writeScan(self, map:lidarMap, combinedTranslation:translation)->None:
+        """
+            Writes the given map into the shared scan buffer, or sends it over the pipe if this pipeline has no buffer.
+            This function should only be called on the lidar side of the pipe and only once for each finished map.
+        """
+        if self.scanBuffer:
+            self.scanBuffer.writeMap(map, combinedTranslation)
+            self._sendScanNotify(map.mapID)
+        else:
+            self._sendMap(map)
+
+    def _sendStageResult(self, name:str, mapID:int, result)->None:
+        """
+            Sends the result of a processing stage to the other side of the pipe. Each stage has its own latest value channel so this never blocks.
+            This function should only be called on the lidar side of the pipe.
+        """
+        self.__get()
+        with self.__outboxCondition:
+            if name in self.__stageOutbox:
+                self.__stageOverwrites[name]=self.__stageOverwrites.get(name, 0)+1
+            self.__stageOutbox[name]=stagePacket(name, mapID, result)
+            self.__outboxCondition.notify()
+
+    def _sendScanNotify(self, mapID:int)->None:
+        """
+            Tells the other side of the pipe that a new scan has been written to the shared scan buffer so any waitForNextScan call can return.
+            This function should only be called on the lidar side of the pipe.
+        """
+
+        self._sendData(dataPacket(dataPacketType.scanNotify, mapID))
+
     def _sendTrans(self, translation:translation)->None:
         """
             Sends the given Translation to the other side of the pipe.
@@ -194,15 +507,97 @@ class lidarPipeline:
     def _sendData(self, data:"dataPacket")->None:
         """
             Sends the given data packet to the other side of the lidar.
+            Data packets are conflated, if a packet of the same type has not been sent yet it is replaced by this one. This never blocks.
         """
         if (data.__class__!= dataPacket or data.type not in dataPacketType.options):
             raise ValueError("Attempted to send data over a lidar pipeline with an invalid data type packet")
-        self.__pipe.send(data)
+        self.__get()
+        with self.__outboxCondition:
+            if self.__outbox[data.type]!=None:
+                self.__overwrites[data.type]+=1
+            self.__outbox[data.type]=data
+            self.__outboxCondition.notify()
 
     def _sendAction(self, action:"commandPacket")->None:
         if action.__class__ != commandPacket:
             raise ValueError("Attempted to send action through the lidar pipeline that wasn't an action")
-        self.__pipe.send(action)
+        if self.__batch!=None:
+            self.__batch.append(action)
+        else:
+            self.__send(action)
+
+    def _sendResponse(self, action:"commandPacket", result=None, error:BaseException=None)->None:
+        """
+            Sends the result of running a command back to the side that sent it. Commands sent without a request id do not get a response.
+            If the error can not be pickled it is replaced with a RuntimeError holding its description, and so is a result that can not be pickled
+            (it would otherwise only fail once the io thread tries to send it).
+            This function should only be called on the lidar side of the pipe.
+        """
+        if action.requestID==None:
+            return
+        if error==None:
+            try:
+                pickle.dumps(result)
+            except Exception as e:
+                result, error = None, RuntimeError("the result of the command could not be sent: " + repr(e))
+        if error!=None:
+            try:
+                pickle.dumps(error)
+            except Exception:
+                error = RuntimeError(repr(error))
+        self.__send(responsePacket(action.requestID, result, error, action.returnType))
+
+
+    def call(self, command:int, *args, returnType:int=-1)->"commandFuture":
+        """
+            Sends a command (one of the commandType opcodes) to the lidar side of the pipe and returns a future for its result.
+            The future's result and exception functions read from the pipe while they wait so they can be used without anything else polling the pipeline.
+            If the command raises an exception on the lidar side it is raised again by the future. 
+            If returnType is set to a dataPacketType the result is also cached as that packet type.
+        """
+        if command not in commandType.options:
+            raise ValueError("attempted to call a command that does not exist:", command)
+
+        requestID = self.__nextRequestID
+        self.__nextRequestID+=1
+        future = commandFuture(self)
+        self.__pendingRequests[requestID]=future
+        self.__rememberCommand(commandPacket(command, list(args), returnType))
+        self._sendAction(commandPacket(command, list(args), returnType, requestID))
+        return future
+
+    def __rememberCommand(self, command:"commandPacket")->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Keeps the newest command that changes lasting lidar state (translations, deadband, motor speed and scan mode) so it can be run again if the lidar side is replaced by _reconnect.
+        """
+        if command.command in commandType.scans:
+            self.__statefulCommands.pop("scan", None)
+            self.__statefulCommands["scan"]=command
+        elif command.command in commandType.stopsScan:
+            self.__statefulCommands.pop("scan", None)
+        elif command.command in commandType.stateful:
+            self.__statefulCommands.pop(command.command, None)
+            self.__statefulCommands[command.command]=command
+
+    @contextmanager
+    def batch(self):
+        """
+            Context manager that collects every command sent inside of it and sends them as a single message when it exits, they are run in order on the lidar side.
+            Used to turn sequences like connect, setMotorPwm, startScan into one round trip. The futures returned inside the batch resolve once the batch has been run.
+        """
+        if self.__batch!=None:
+            yield self
+            return
+
+        self.__batch=[]
+        try:
+            yield self
+        finally:
+            commands = self.__batch
+            self.__batch=None
+            if len(commands)!=0:
+                self.__send(commandBatch(commands))
     
 
 
@@ -211,94 +606,173 @@ class lidarPipeline:
             Sends a package that will kill the lidar remotely.
             If this package is sent to the side of the pipeline not managing any lidar it will not do anything.
         """
-        self.__pipe.send(quitPacket())
+        self.quitRequested=True
+        self.__send(quitPacket())
+        self.flush(1)
 
     def isConnected(self)->bool:
-        """Returns wether or not the other side of the pipe is still open. 
-            This function does not check if code is still working on the other side of the pipe. Just that the other side of the pipe is open.
         """
-        try:
-            self.__pipe.send(ping())
-        except EOFError as e:
-            print("pipe closure detected")
+            Returns wether or not the other side of the pipeline is still alive. 
+            This is true until the pipe is closed or nothing (data or heartbeat) has been received for constants.pipelineHeartbeatTimeout seconds.
+            Before anything has been received the other side is assumed to still be starting up and this returns true.
+            This only reads state kept by the io thread and does not send anything.
+        """
+        self.__get()
+        if self.__closed:
             return False
+        if self.__lastReceived==None:
+            return True
+        return perf_counter()-self.__lastReceived<constants.pipelineHeartbeatTimeout
 
-        return True
+    def isPipeOpen(self)->bool:
+        """
+            Returns wether or not the pipe to the other side is still open. Unlike isConnected this stays true while the other side is only stalled,
+            it is false once the pipe has been closed or broken.
+        """
+        self.__get()
+        return not self.__closed
+
+    def getScanCount(self)->int:
+        """Returns the number of finished scans received from the lidar side, this keeps counting across reconnects"""
+        return self.__scanNotifications
+
+    def getLastScanAge(self)->float:
+        """Returns the number of seconds since a finished scan was last received from the other side of the pipeline or None if no scan has been received yet"""
+        if self.__lastScanTime==None:
+            return None
+        return perf_counter()-self.__lastScanTime
+
+    def getHeartbeatAge(self)->float:
+        """Returns the number of seconds since anything was last received from the other side of the pipeline or None if nothing has been received yet"""
+        if self.__lastReceived==None:
+            return None
+        return perf_counter()-self.__lastReceived
 
 
     def isRunning(self)->bool:
         """
             Returns wether or not the lidar is currently scanning.
             Do to the nature of piped lidar this function will guess wether or not the lidar is currently scanning based on received data and therefor may have a small delay. 
+            The lidar is treated as running if the pipeline is connected and a scan has finished within 10 times the time between the last 2 scans.
             This function should only be called on the management side of the pipeline. 
             Because it tries to interact with a lidar object on the other side of the pipeline it will do nothing if called on the side with the lidar. 
-            
-            Due to the nature of piped lidar this information may be slightly out of date as data is only refreshed so often.
-            However it should normally be accurate to 20ms or less.
         """
+        return self.isConnected() and self.__lastScanTime!=None and perf_counter()-self.__lastScanTime<10*self.__scanInterval
 
-        return self.getLastMap().endTime + 10/self.getLastMap().getHz > time()
-
-    def disconnect(self, leaveRunning=False)->None:
+    def disconnect(self, leaveRunning=False)->"commandFuture":
         """
             Disconnects the lidar from a connected port
             Before disconnecting the function will stop the lidar motor and scan(if applicable) unless leaveRunning is set to true
         """
 
-        self._sendAction(commandPacket(Lidar.disconnect,[leaveRunning]))
+        return self.call(commandType.disconnect, leaveRunning)
 
-    def stop(self)->None:
+    def stop(self)->"commandFuture":
         """
             Stops the current scan cycle on the lidar but does not stop the motor.
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         """
 
-        self._sendAction(commandPacket(Lidar.stop,[]))
+        return self.call(commandType.stop)
     
-    def reset(self)->None:
+    def reset(self)->"commandFuture":
         """
             Restarts the lidar as if it was just powered on but does not effect the client side lidar lib at all. 
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         """
 
-        self._sendAction(commandPacket(Lidar.reset,[]))
+        return self.call(commandType.reset)
     
-    def setMotorPwm(self, pwm:int, overrideInternalValue=True)->None:
+    def setMotorPwm(self, pwm:int, overrideInternalValue=True)->"commandFuture":
         """
             Sets the lidar's motor to the specified pwm value. the speed must be a positive number or 0 and lower or equal to the specified max value(currently 1023).
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
             
         """
 
-        self._sendAction(commandPacket(Lidar.setMotorPwm,[pwm, overrideInternalValue]))
+        return self.call(commandType.setMotorPwm, pwm, overrideInternalValue)
 
-    def connect(self)->None:
+    def connect(self)->"commandFuture":
         """
             Connects to a lidar object with the information specified in the config file.
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         """
 
-        self._sendAction(commandPacket(Lidar.connect,[]))
+        return self.call(commandType.connect)
 
     def getLastMap(self)->lidarMap:
         """
             Returns the last full map measured by the lidar.
+            When the pipeline has a shared scan buffer the map is rebuilt from the buffer only when a new scan has been written, otherwise the same object is returned.
+            For large amounts of points getLastScanArrays is much faster as it does not build any lidarMeasurement objects.
             Due to the nature of piped lidar this information may be slightly out of date as data is only refreshed so often.
             However it should normally be accurate to 20ms or less.
         """
 
-        return self.getDataPacket(dataPacketType.lidarMap)
+        if not self.scanBuffer:
+            return self.getDataPacket(dataPacketType.lidarMap)
+
+        #a slot reused while it was being copied is read again, the same way readLatest retries a slot that is being written
+        for _ in range(self.scanBuffer.slots):
+            if self.scanBuffer.getSequence()==self.__lastMapSequence:
+                break
+            slot = self.scanBuffer.readLatest()
+            if slot==None:
+                break
+            map = sharedScanBuffer.slotToMap(slot)
+            if map!=None:
+                self.__lastMap = map
+                self.__lastMapSequence = slot.sequence
+                break
+        return self.__lastMap
+
+    def waitForNextScan(self, timeout:float=None)->lidarMap:
+        """
+            Blocks until the lidar finishes a scan that has not already been returned by this function and then returns it (the same map as getLastMap).
+            If a scan has finished since the last call this returns straight away.
+            Returns None if timeout seconds pass first or the pipe is closed, if timeout is None this will wait forever.
+        """
+        self.__get()
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__scanNotifications!=self.__lastWaitedScan or self.__closed, timeout) or self.__closed:
+                return None
+            self.__lastWaitedScan=self.__scanNotifications
+        return self.getLastMap()
+
+    def getStageResult(self, name:str):
+        """
+            Returns the newest result published by the processing stage with the given name or None if it has not published anything yet.
+            See lidarProcessingStages for the stages that can be given to makePipedLidar.
+        """
+        self.__get()
+        packet = self.__stageResults.get(name)
+        return packet.result if packet else None
+
+    def getStageResultMapID(self, name:str)->int:
+        """Returns the id of the map the newest result of the given stage was made from, or None if the stage has not published anything yet"""
+        self.__get()
+        packet = self.__stageResults.get(name)
+        return packet.mapID if packet else None
 
+    def getLastScanArrays(self)->sharedSlot:
+        """
+            Returns a read only, zero copy view of the last full scan as numpy arrays (angle, distance, quality, x and y) along with its metadata.
+            Returns None if the pipeline has no shared scan buffer or no scan has finished yet. See sharedSlot for how long the view stays valid.
+        """
+        if not self.scanBuffer:
+            return None
+        return self.scanBuffer.readLatest()
 
-    def startScan(self)->None:
+
+    def startScan(self)->"commandFuture":
         """
             Starts a standard scan on the lidar and starts the update cycle.
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         """
 
-        self._sendAction(commandPacket(Lidar.startScan, []))
+        return self.call(commandType.startScan)
 
-    def startScanExpress(self, mode:int="auto")->None:
+    def startScanExpress(self, mode:int="auto")->"commandFuture":
         """
             Starts a scan in express mode (using a compression format so that more samples may be handled per second).
             If a mode is specified then the lidar will attempt to start express in given mode. 
@@ -307,9 +781,9 @@ class lidarPipeline:
         
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         """
-        self._sendAction(commandPacket(Lidar.startScanExpress, [mode]))
+        return self.call(commandType.startScanExpress, mode)
 
-    def startForceScan(self)->None:
+    def startForceScan(self)->"commandFuture":
         """
             Initializes a force scan. This scan will always be run by the lidar no matter its current state. 
             Since force scans use the same return packets as normal scans it may appear that the lidarlib initialized a normal scan and not a force scan but all data will be handled properly.
@@ -317,33 +791,40 @@ class lidarPipeline:
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
 
         """
-        self._sendAction(commandPacket(Lidar.startForceScan, []))
+        return self.call(commandType.startForceScan)
         
-    def setCurrentLocalTranslation(self, translation:translation)->None:
+    def setCurrentLocalTranslation(self, translation:translation)->"commandFuture":
         """
             Sets the lidar's objects local translation. This translation should be used for the translation from the lidar to the center of the robot. 
             The translation will be added to all future points read by the lidar(until changed) but will not be added to old retroactively.
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less.             
         """
-        self._sendAction(commandPacket(Lidar.setCurrentLocalTranslation, [translation]))
+        return self.call(commandType.setCurrentLocalTranslation, translation)
 
-    def setCurrentGlobalTranslation(self, translation:translation):
+    def setCurrentGlobalTranslation(self, translation:translation)->"commandFuture":
         """
             Sets the lidar's objects global translation. This translation should be used for the translation between the robot and the 0,0 of the field 
             The translation will be added to all future points read by the lidar(until changed) but will not be added to old retroactively.
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         
         """
-        self._sendAction(commandPacket(Lidar.setCurrentGlobalTranslation, [translation]))
+        return self.call(commandType.setCurrentGlobalTranslation, translation)
 
-    def setDeadband(self, deadband:list[int])->None:
+    def setDeadband(self, deadband:list[int])->"commandFuture":
         """
             Sets a deadband of angles that will be dropped by the lidar. The dropped angle is calculated after the local translation but before the global translation. 
             The imputed argument should be a list of ints in which the first argument is the start of the deadband and the second is the end. 
             If the second argument is larger than the first the deadband will be assumed to wrap past 360 degrees. 
             Due to the nature of a piped lidar this action may take a small amount of time to execute as it is sent and processed however it should normally only take 20 ms or less. 
         """
-        self._sendAction(commandPacket(Lidar.setDeadband, [deadband]))
+        return self.call(commandType.setDeadband, deadband)
+
+    def sendPoses(self, batch)->None:
+        """
+            Sends a batch of timestamped robot poses (a (4, n) array from lidarPoseBuffer.getBatch) to the lidar's pose buffer, see Lidar.addPoses.
+            Batches are sent in order and never dropped but, unlike other commands, no response is sent back.
+        """
+        self._sendAction(commandPacket(commandType.addPoses, [batch]))
 
     def getCombinedTranslation(self)->translation:
         """
@@ -351,7 +832,7 @@ class lidarPipeline:
             Due to the nature of piped lidar this information may be slightly out of date as data is only refreshed so often.
             However it should normally be accurate to 20ms or less.
         """
-        return self.__dataPackets[dataPacketType.translation]           
+        return self.getDataPacket(dataPacketType.translation)
 
     def getInfo(self)->RPlidarDeviceInfo:
         """
@@ -362,6 +843,13 @@ class lidarPipeline:
 
         return self.getDataPacket(dataPacketType.lidarInfo)
 
+    def requestHealth(self)->"commandFuture":
+        """
+            Asks the lidar for its current health and returns a future for the RPlidarHealth object. 
+            Once the future is resolved getHealth will also return the new value.
+        """
+        return self.call(commandType.getHealth, returnType=dataPacketType.lidarHealth)
+
     def getHealth(self)->RPlidarHealth:
         """
             Returns the connected lidar's health in the form of a RPlidarDeviceHealth object.
@@ -398,6 +886,14 @@ class lidarPipeline:
 
         return self.getDataPacket(dataPacketType.scanModeCount)
     
+    def getScheduling(self)->dict:
+        """
+            Returns the scheduling the lidar's process is actually running with as a dict with the keys "manager" (the manager process) and "reader" (the serial reader thread, None until a scan is started).
+            Each is a report from lidarScheduling.getSchedulingReport, including the errors for any configured setting that could not be applied.
+            Returns None until the lidar side has sent its first report.
+        """
+        return self.getDataPacket(dataPacketType.scheduling)
+
     def getScanModes(self)->list[RPlidarScanMode]:
         """
             Returns a list of RPlidarScanMode objects for each scan mode supported by the current connected lidar.
@@ -410,14 +906,97 @@ class lidarPipeline:
         
 
 
+class commandType:
+    """Opcodes for every command that can be run on the lidar side of a pipeline. Only the opcode and arguments are sent over the pipe"""
+
+    connect = 0
+    disconnect = 1
+    stop = 2
+    reset = 3
+    setMotorPwm = 4
+    startScan = 5
+    startScanExpress = 6
+    startForceScan = 7
+    setCurrentLocalTranslation = 8
+    setCurrentGlobalTranslation = 9
+    setDeadband = 10
+    getHealth = 11
+    getInfo = 12
+    getSampleRate = 13
+    addPoses = 14
+    functions:dict[int, callable] = {
+        connect : Lidar.connect, disconnect : Lidar.disconnect, stop : Lidar.stop,
+        reset : Lidar.reset, setMotorPwm : Lidar.setMotorPwm, startScan : Lidar.startScan,
+        startScanExpress : Lidar.startScanExpress, startForceScan : Lidar.startForceScan,
+        setCurrentLocalTranslation : Lidar.setCurrentLocalTranslation, setCurrentGlobalTranslation : Lidar.setCurrentGlobalTranslation,
+        setDeadband : Lidar.setDeadband, getHealth : Lidar.getHealth, getInfo : Lidar.getInfo, getSampleRate : Lidar.getSampleRate,
+        addPoses : Lidar.addPoses
+    }
+    options:list[int] = list(functions)
+    #commands that change lasting state on the lidar, the newest of each is sent again when a pipeline reconnects
+    stateful:list[int] = [setMotorPwm, setCurrentLocalTranslation, setCurrentGlobalTranslation, setDeadband]
+    scans:list[int] = [startScan, startScanExpress, startForceScan]
+    stopsScan:list[int] = [stop, reset, disconnect]
+
+
 class commandPacket:
-    def __init__(self, function:callable, args:list, returnType:int=-1):
-        self.function = function
+    def __init__(self, command:int, args:list, returnType:int=-1, requestID:int=None):
+        if command not in commandType.options:
+            raise ValueError("attempted to make a command packet with a command that does not exist")
+        self.command = command
         self.args = args
         if returnType not in dataPacketType.options and returnType!=-1:
             raise ValueError("attempted to make a command packet with a return type that does not exist")
 
         self.returnType=returnType
+        self.requestID=requestID
+
+    def __reduce__(self):
+        return (commandPacket, (self.command, self.args, self.returnType, self.requestID))
+
+    def run(self, lidar:Lidar):
+        """Runs the command on the given lidar and returns the result"""
+        return commandType.functions[self.command](lidar, *self.args)
+
+
+class commandBatch:
+    """A list of commands sent as a single pipe message, see lidarPipeline.batch"""
+    def __init__(self, commands:list[commandPacket]):
+        self.commands=commands
+
+    def __reduce__(self):
+        return (commandBatch, (self.commands,))
+
+
+class responsePacket:
+    """The result of a command sent back to the side that sent it, matched to the command by requestID"""
+    def __init__(self, requestID:int, result=None, error:BaseException=None, returnType:int=-1):
+        self.requestID=requestID
+        self.result=result
+        self.error=error
+        self.returnType=returnType
+
+    def __reduce__(self):
+        return (responsePacket, (self.requestID, self.result, self.error, self.returnType))
+
+
+class commandFuture(Future):
+    """
+        Future for the result of a command sent through a lidarPipeline.
+        result and exception read from the pipeline while they wait so nothing else has to be polling it. 
+        For asyncio code the future can be awaited with asyncio.wrap_future, however something else must then be reading the pipeline.
+    """
+    def __init__(self, pipeline:lidarPipeline):
+        super().__init__()
+        self.pipeline=pipeline
+
+    def result(self, timeout:float=None):
+        self.pipeline._waitForResponse(self, timeout)
+        return super().result(0)
+
+    def exception(self, timeout:float=None)->BaseException:
+        self.pipeline._waitForResponse(self, timeout)
+        return super().exception(0)
 
 class dataPacketType:
 
@@ -430,10 +1009,13 @@ class dataPacketType:
     lidarHealth = 6
     scanModeTypical=7
     scanModeCount=8
+    scanNotify=9
+    scheduling=10
     options:list[int] = [
         lidarMap, translation, quitWarning,
         sampleRate, scanModes, lidarInfo,
-        lidarHealth, scanModeTypical, scanModeCount
+        lidarHealth, scanModeTypical, scanModeCount,
+        scanNotify, scheduling
     ]
     
 
@@ -445,8 +1027,26 @@ class dataPacket():
         self.type = type
         self.data=data
 
+    def __reduce__(self):
+        return (dataPacket, (self.type, self.data))
+
+class stagePacket:
+    """The result of a processing stage for a single scan"""
+    def __init__(self, name:str, mapID:int, result):
+        self.name=name
+        self.mapID=mapID
+        self.result=result
+
+    def __reduce__(self):
+        return (stagePacket, (self.name, self.mapID, self.result))
+
 class quitPacket:
     pass
 
 class ping:
-    pass
+    """Heartbeat sent by the io thread of a pipeline, time is the monotonic time it was sent at"""
+    def __init__(self, time:float=None):
+        self.time=time
+
+    def __reduce__(self):
+        return (ping, (self.time,))
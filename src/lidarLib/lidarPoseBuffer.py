@@ -0,0 +1,112 @@
+import numpy as np
+
+from lidarLib.constants import constants
+from lidarLib.translation import translation
+
+
+class lidarPoseBuffer:
+    """
+        Bounded ring of timestamped robot poses that can be queried for the pose at any time between the oldest and newest sample.
+        Times are in seconds on the lidar's clock (time.monotonic, the same clock as lidarMeasurement.timeStamp), positions in meters and rotations in degrees like a translation.
+        Each sample is stored twice, capacity apart, so the samples are always one contiguous time ordered window and lookups are a binary search with no copying.
+    """
+
+    TIME = 0
+    X = 1
+    Y = 2
+    ROTATION = 3
+
+    def __init__(self, capacity:int=constants.poseBufferCapacity):
+        """Creates a empty buffer that holds the newest capacity samples"""
+        self.capacity=capacity
+        self.__data=np.zeros((4, 2*capacity))
+        self.__start=0
+        self.__count=0
+
+    def __len__(self)->int:
+        return self.__count
+
+    def __getWindow(self)->np.ndarray:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns a (4, n) view of every sample from oldest to newest.
+        """
+        return self.__data[:, self.__start:self.__start+self.__count]
+
+    def add(self, timestamp:float, x:float, y:float, rotation:float)->bool:
+        """
+            Adds a sample to the buffer, dropping the oldest one if the buffer is full.
+            Samples must be added in time order, a sample that is not newer than the newest one already in the buffer is ignored. Returns wether or not the sample was added.
+        """
+        if self.__count and timestamp<=self.__data[lidarPoseBuffer.TIME, self.__start+self.__count-1]:
+            return False
+
+        index = (self.__start+self.__count)%self.capacity
+        self.__data[:, index] = self.__data[:, index+self.capacity] = (timestamp, x, y, rotation)
+        if self.__count<self.capacity:
+            self.__count+=1
+        else:
+            self.__start=(self.__start+1)%self.capacity
+        return True
+
+    def addBatch(self, batch:np.ndarray)->int:
+        """Adds every sample of a (4, n) array of time, x, y and rotation rows (such as one returned by getBatch) in order. Returns the number of samples added"""
+        return sum(self.add(*sample) for sample in np.asarray(batch, dtype=np.float64).T.tolist())
+
+    def getBatch(self, since:float=None)->np.ndarray:
+        """Returns a copy of every sample newer than since (or every sample if since is None) as a (4, n) array of time, x, y and rotation rows, ready to be forwarded with addBatch"""
+        window = self.__getWindow()
+        if since!=None:
+            window = window[:, np.searchsorted(window[lidarPoseBuffer.TIME], since, side="right"):]
+        return window.copy()
+
+    def getNewestTime(self)->float:
+        """Returns the time of the newest sample or None if the buffer is empty"""
+        if self.__count==0:
+            return None
+        return float(self.__data[lidarPoseBuffer.TIME, self.__start+self.__count-1])
+
+    def getLatest(self)->translation:
+        """Returns the newest pose as a translation or None if the buffer is empty"""
+        if self.__count==0:
+            return None
+        _, x, y, rotation = self.__data[:, self.__start+self.__count-1].tolist()
+        return translation.fromCart(x, y, rotation)
+
+    def getAt(self, timestamp:float)->translation:
+        """
+            Returns the pose at the given time as a translation, linearly interpolated between the samples on either side of it (rotations take the shortest way around).
+            Times before the oldest sample or after the newest one get that sample's pose. Returns None if the buffer is empty.
+        """
+        if self.__count==0:
+            return None
+        window = self.__getWindow()
+        index = int(np.searchsorted(window[lidarPoseBuffer.TIME], timestamp))
+        if index==0:
+            _, x, y, rotation = window[:, 0].tolist()
+        elif index==self.__count:
+            _, x, y, rotation = window[:, -1].tolist()
+        else:
+            time0, x0, y0, rotation0 = window[:, index-1].tolist()
+            time1, x1, y1, rotation1 = window[:, index].tolist()
+            fraction = (timestamp-time0)/(time1-time0)
+            x = x0+(x1-x0)*fraction
+            y = y0+(y1-y0)*fraction
+            rotation = (rotation0+((rotation1-rotation0+180)%360-180)*fraction)%360
+        return translation.fromCart(x, y, rotation)
+
+    def getArraysAt(self, timestamps:np.ndarray)->tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Vectorized getAt for many times at once. Returns the x, y and rotation arrays of the pose at each time, times outside of the buffer are clamped the same way as getAt.
+            Throws a ValueError if the buffer is empty.
+        """
+        if self.__count==0:
+            raise ValueError("attempted to read poses from a empty pose buffer")
+        window = self.__getWindow()
+        times = window[lidarPoseBuffer.TIME]
+        rotations = np.degrees(np.unwrap(np.radians(window[lidarPoseBuffer.ROTATION])))
+        return (
+            np.interp(timestamps, times, window[lidarPoseBuffer.X]),
+            np.interp(timestamps, times, window[lidarPoseBuffer.Y]),
+            np.interp(timestamps, times, rotations)%360
+        )
@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+import struct
+import time
+
+import serial
+from serial.tools import list_ports
+
+from lidarLib.constants import constants
+from lidarLib.LidarConfigs import lidarConfigs
+from lidarLib.lidarProtocol import RPLIDAR_CMD_GET_HEALTH, RPLIDAR_CMD_GET_INFO, RPLIDAR_CMD_GET_LIDAR_CONF, RPLIDAR_CMD_GET_SAMPLERATE, RPLIDAR_CMD_STOP, RPLIDAR_CONF_SCAN_MODE_ANS_TYPE, RPLIDAR_CONF_SCAN_MODE_COUNT, RPLIDAR_CONF_SCAN_MODE_MAX_DISTANCE, RPLIDAR_CONF_SCAN_MODE_NAME, RPLIDAR_CONF_SCAN_MODE_TYPICAL, RPLIDAR_CONF_SCAN_MODE_US_PER_SAMPLE, RPLIDAR_DESCRIPTOR_LEN, RPLIDAR_STATUS, RPLIDAR_SYNC_BYTE1, RPLIDAR_SYNC_BYTE2, RPlidarCommand, RPlidarDeviceInfo, RPlidarHealth, RPlidarResponse, RPlidarSampleRate, RPlidarScanMode
+
+
+def probePorts(ports:list[str]=None, vendorID:int=None, baudrates:list[int]=constants.probeBaudrates, timeout:float=constants.probeTimeout, workers:int=None)->list[dict]:
+    """
+        Looks for lidars on every port at once, each port is probed on its own thread so finding any number of lidars takes about as long as finding one.
+        ports is a list of port names to probe, if it is None every serial port is probed (only ones with the given vendor id if vendorID is set).
+        Returns a list with a dict (see probePort) for every port a lidar answered on, in the order of ports.
+    """
+    if ports==None:
+        ports = [bus.device for bus in list_ports.comports() if vendorID==None or bus.vid==vendorID]
+    if len(ports)==0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=workers or len(ports)) as executor:
+        results = executor.map(lambda port: probePort(port, baudrates, timeout), ports)
+        return [result for result in results if result!=None]
+
+
+def probePort(port:str, baudrates:list[int]=constants.probeBaudrates, timeout:float=constants.probeTimeout)->dict:
+    """
+        Tries to talk to a lidar on the given port at each of the given baud rates in turn (a port can only be opened once so they can not be tried at the same time).
+        Every request waits at most timeout seconds for an answer. Returns None if nothing answered, otherwise a dict with
+        "port", the usb "vendorID", "productID" and "serialNumber" of the port, the "baudrate" that worked, the lidar's "deviceSerialNumber", "model", "firmware", "hardware" and "health",
+        the names of its "scanModes" and "deviceMetadata", which can be given to Lidar.connect so it does not ask for the same information again.
+    """
+    bus = next((bus for bus in list_ports.comports() if bus.device==port), None)
+    try:
+        serialPort = serial.Serial(port, baudrates[0], timeout=timeout)
+    except serial.SerialException:
+        return None
+
+    try:
+        for baudrate in baudrates:
+            serialPort.baudrate = baudrate
+            #a lidar that is already scanning has to be stopped before it will answer anything else
+            serialPort.write(RPlidarCommand(RPLIDAR_CMD_STOP).raw_bytes)
+            time.sleep(constants.probeStopDelay)
+            serialPort.reset_input_buffer()
+
+            data = _request(serialPort, RPLIDAR_CMD_GET_HEALTH)
+            if data==None:
+                continue
+            health = RPlidarHealth(data)
+
+            try:
+                metadata = _fetchMetadata(serialPort)
+            except (RuntimeError, serial.SerialException) as e:
+                print("lidar on", port, "answered at", baudrate, "baud but could not be queried:", e)
+                continue
+
+            info:RPlidarDeviceInfo = metadata["lidarInfo"]
+            return {
+                "port" : port,
+                "vendorID" : bus.vid if bus else None,
+                "productID" : bus.pid if bus else None,
+                "serialNumber" : bus.serial_number if bus else None,
+                "baudrate" : baudrate,
+                "deviceSerialNumber" : info.serialNumber,
+                "model" : info.model,
+                "firmware" : str(info.firmware_major) + "." + str(info.firmware_minor),
+                "hardware" : info.hardware,
+                "health" : RPLIDAR_STATUS.get(health.status, health.status),
+                "scanModes" : [mode.name for mode in metadata["scanModes"]],
+                "deviceMetadata" : metadata
+            }
+        return None
+    except serial.SerialException:
+        return None
+    finally:
+        serialPort.close()
+
+
+def _request(serialPort:serial.Serial, cmd:bytes, payload:bytes=None)->bytes:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Sends a command and returns the data of its answer, or None if there was no answer before the port timed out or it did not start with the sync bytes.
+    """
+    serialPort.write(RPlidarCommand(cmd, payload).raw_bytes)
+    raw = serialPort.read(RPLIDAR_DESCRIPTOR_LEN)
+    if len(raw)<RPLIDAR_DESCRIPTOR_LEN or raw[0]!=RPLIDAR_SYNC_BYTE1[0] or raw[1]!=RPLIDAR_SYNC_BYTE2[0]:
+        return None
+    descriptor = RPlidarResponse(raw)
+    data = serialPort.read(descriptor.data_length)
+    if len(data)<descriptor.data_length:
+        return None
+    return data
+
+
+def _fetchMetadata(serialPort:serial.Serial)->dict:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Asks the lidar for everything Lidar.getDeviceMetadata returns and returns it in the same form. Throws a RuntimeError if the lidar stops answering.
+    """
+    def request(cmd:bytes, payload:bytes=None)->bytes:
+        data = _request(serialPort, cmd, payload)
+        if data==None:
+            raise RuntimeError("no answer to command " + cmd.hex())
+        return data
+
+    def getConf(key:int, mode:int=None)->bytes:
+        return request(RPLIDAR_CMD_GET_LIDAR_CONF, struct.pack("<I", key) if mode==None else struct.pack("<IH", key, mode))
+
+    scanModeCount = struct.unpack("<H", getConf(RPLIDAR_CONF_SCAN_MODE_COUNT)[4:6])[0]
+    return {
+        "lidarInfo" : RPlidarDeviceInfo(request(RPLIDAR_CMD_GET_INFO)),
+        "sampleRate" : RPlidarSampleRate(request(RPLIDAR_CMD_GET_SAMPLERATE)),
+        "scanModeCount" : scanModeCount,
+        "scanModes" : [
+            RPlidarScanMode(
+                getConf(RPLIDAR_CONF_SCAN_MODE_NAME, mode),
+                getConf(RPLIDAR_CONF_SCAN_MODE_MAX_DISTANCE, mode),
+                getConf(RPLIDAR_CONF_SCAN_MODE_US_PER_SAMPLE, mode),
+                getConf(RPLIDAR_CONF_SCAN_MODE_ANS_TYPE, mode)
+            )
+            for mode in range(scanModeCount)
+        ],
+        "typicalScanMode" : struct.unpack("<H", getConf(RPLIDAR_CONF_SCAN_MODE_TYPICAL)[4:6])[0]
+    }
+
+
+def formatProbeTable(devices:list[dict])->str:
+    """Returns the devices found by probePorts as a printable table with one row per lidar"""
+    columns = ["port", "deviceSerialNumber", "model", "firmware", "baudrate", "health", "scanModes"]
+    rows = [columns] + [[", ".join(device[column]) if column=="scanModes" else str(device[column]) for column in columns] for device in devices]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    return "\n".join("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    devices = probePorts(vendorID=lidarConfigs.defaultConfigs["vendorID"])
+    print(formatProbeTable(devices))
+    print(len(devices), "lidars found in", round(time.perf_counter()-start, 2), "seconds")
@@ -0,0 +1,126 @@
+import math
+import numpy as np
+
+from lidarLib.constants import constants
+from lidarLib.lidarFieldMask import lidarFieldMask
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarObstacleFitting import clusterScanPoints, fitObstacles, lidarObstacle
+
+
+def getSensorRelativeArray(map:lidarMap)->np.ndarray:
+    """
+        Returns the points of a map as a (n, 2) array of field aligned offsets in meters from the sensor that measured them.
+        The sensor is where the map's sensorPose puts the lidar's own origin, points are returned unchanged if the map has no sensorPose.
+    """
+    xy = map.getCartArray()
+    if map.sensorPose:
+        xy = xy-np.array(map.sensorPose.applyToCart(0, 0))
+    return xy
+
+
+class lidarProcessingStage:
+    """
+        Base class for processing that runs inside of the lidar manager process right after each scan finishes.
+        Stages are given to makePipedLidar as a list and are run in order on every new scan, each stage can change the map (filters) and read the results of the stages before it.
+        Anything a stage returns (other than None) is sent to the client on its own channel and can be read with lidarPipeline.getStageResult(name).
+        Stages are pickled when the manager process is started so they, and everything they return, must be picklable.
+    """
+    def __init__(self, name:str):
+        """Creates a stage, name is the channel the stage's results are published on and must be unique within a chain of stages"""
+        self.name=name
+
+    def process(self, map:lidarMap, results:dict[str, object])->object:
+        """
+            Runs the stage on a finished scan and returns the result to publish or None to publish nothing.
+            The points of map are in field coordinates and results holds the return values of every stage that has already run on this scan, keyed by name.
+        """
+        raise NotImplementedError("lidar processing stages must implement process")
+
+
+class rangeFilterStage(lidarProcessingStage):
+    """
+        Stage that drops points that are too close to or too far from the sensor or too low quality. Returns the number of points dropped.
+        Distances are measured from the sensor like sectorMinimaStage, not from the field origin the points are stored relative to.
+    """
+    def __init__(self, minDistance:float=0, maxDistance:float=math.inf, minQuality:int=0, name:str="rangeFilter"):
+        """Creates a range filter, distances are in meters and points are kept if minDistance <= distance from the sensor <= maxDistance and quality >= minQuality"""
+        super().__init__(name)
+        self.minDistance=minDistance
+        self.maxDistance=maxDistance
+        self.minQuality=minQuality
+
+    def process(self, map:lidarMap, results:dict[str, object])->int:
+        _, _, qualities = map.getArrays()
+        xy = getSensorRelativeArray(map)
+        distances = np.hypot(xy[:, 0], xy[:, 1])
+        return map.filterPoints((distances>=self.minDistance) & (distances<=self.maxDistance) & (qualities>=self.minQuality))
+
+
+class fieldMaskStage(lidarProcessingStage):
+    """Stage that drops points that land on static field structure. Returns the number of points dropped"""
+    def __init__(self, source:str="default", name:str="fieldMask"):
+        """Creates a field mask filter, source is any value accepted by lidarFieldMask.load"""
+        super().__init__(name)
+        self.fieldMask=lidarFieldMask.load(source)
+
+    def process(self, map:lidarMap, results:dict[str, object])->int:
+        return map.applyFieldMask(self.fieldMask)
+
+
+class sectorMinimaStage(lidarProcessingStage):
+    """
+        Stage that splits the scan into equal sectors around the sensor and returns the distance to the closest point in each as a numpy array.
+        Sectors are measured from the sensor in field coordinates, starting at 0 degrees. Sectors with no points are set to infinity.
+    """
+    def __init__(self, sectors:int=36, name:str="sectorMinima"):
+        super().__init__(name)
+        self.sectors=sectors
+
+    def process(self, map:lidarMap, results:dict[str, object])->np.ndarray:
+        xy = getSensorRelativeArray(map)
+        minima = np.full(self.sectors, np.inf)
+        if len(xy)==0:
+            return minima
+
+        angles = np.degrees(np.arctan2(xy[:, 1], xy[:, 0]))%360
+        sector = np.minimum((angles*self.sectors/360).astype(np.int64), self.sectors-1)
+        np.minimum.at(minima, sector, np.hypot(xy[:, 0], xy[:, 1]))
+        return minima
+
+
+class occupancyGridStage(lidarProcessingStage):
+    """
+        Stage that returns a 2d boolean array of every grid cell hit by the scan, laid out the same way as the occupancy of a lidarHitboxMap ([y][x] with cellSize meter cells).
+        Cells on static field structure (the seed) are never marked.
+    """
+    def __init__(self, seed:list[list[bool]]=constants.map, xHeight:float=constants.mapHeightMeters, yWidth:float=constants.mapWidthMeters, cellSize:float=constants.mapNodeSizeMeters, name:str="occupancyGrid"):
+        super().__init__(name)
+        self.cellSize=cellSize
+        self.shape=(math.ceil(yWidth/cellSize), math.ceil(xHeight/cellSize))
+        self.staticMask=np.zeros(self.shape, dtype=bool)
+        if seed:
+            seed = np.array(seed, dtype=bool)[:self.shape[0], :self.shape[1]]
+            self.staticMask[:seed.shape[0], :seed.shape[1]]=seed
+
+    def process(self, map:lidarMap, results:dict[str, object])->np.ndarray:
+        xy = map.getCartArray()
+        cols = np.floor(xy[:, 0]/self.cellSize).astype(np.int64)
+        rows = np.floor(xy[:, 1]/self.cellSize).astype(np.int64)
+        inside = (rows>=0) & (rows<self.shape[0]) & (cols>=0) & (cols<self.shape[1])
+
+        occupancy = np.zeros(self.shape, dtype=bool)
+        occupancy[rows[inside], cols[inside]]=True
+        occupancy &= ~self.staticMask
+        return occupancy
+
+
+class obstacleStage(lidarProcessingStage):
+    """Stage that clusters the scan and fits a rectangle to each cluster, returns a list of lidarObstacle. See lidarObstacleFitting for the arguments"""
+    def __init__(self, maxGap:float=0.15, minPoints:int=3, name:str="obstacles"):
+        super().__init__(name)
+        self.maxGap=maxGap
+        self.minPoints=minPoints
+
+    def process(self, map:lidarMap, results:dict[str, object])->list[lidarObstacle]:
+        xy = map.getCartArray()
+        return fitObstacles(xy, clusterScanPoints(xy, self.maxGap, self.minPoints))
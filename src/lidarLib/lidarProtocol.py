@@ -140,6 +140,7 @@ class RPlidarDeviceInfo:
     """Class to handle and store device information given by the lidar"""
     def __init__(self, rawBytes:bytes):
         """creates device info object from the raw bytes returned by the lidar"""
+        self.rawBytes = bytes(rawBytes)
         self.model = rawBytes[0]
         self.firmware_minor = rawBytes[1]
         self.firmware_major = rawBytes[2]
@@ -147,6 +148,9 @@ class RPlidarDeviceInfo:
         self.serialNumber = codecs.encode(rawBytes[4:], 'hex').upper()
         self.serialNumber = codecs.decode(self.serialNumber, 'ascii')
 
+    def __reduce__(self):
+        return (RPlidarDeviceInfo, (self.rawBytes,))
+
     def __str__(self):
         data = {
             "model" : self.model,
@@ -162,9 +166,13 @@ class RPlidarHealth:
     """class to handle and store health information given by the lidar"""
     def __init__(self, rawBytes:bytes):
         """creates a lidar health object from the raw byte package returned by the lidar"""
+        self.rawBytes = bytes(rawBytes)
         self.status = rawBytes[0]
         self.error_code = (rawBytes[1] << 8) + rawBytes[2]
 
+    def __reduce__(self):
+        return (RPlidarHealth, (self.rawBytes,))
+
     def __str__(self):
         data = {
             "status" : self.status,
@@ -177,9 +185,13 @@ class RPlidarSampleRate:
     """Class to handle and store sampleRate information given by the lidar"""
     def __init__(self, rawBytes:bytes):
         """creates a lidar sampleRate object from the raw byte package returned by the lidar"""
+        self.rawBytes = bytes(rawBytes)
         self.t_standard = rawBytes[0] + (rawBytes[1] << 8)
         self.t_express = rawBytes[2] + (rawBytes[3] << 8)
     
+    def __reduce__(self):
+        return (RPlidarSampleRate, (self.rawBytes,))
+
     def __str__(self):
         data = {
             "t_standard" : self.t_standard,
@@ -192,11 +204,15 @@ class RPlidarScanMode:
     """Class to handle and store a scan mode given by the lidar"""
     def __init__(self, dataName:bytes, dataMaxDistance:bytes, dataUsPerSample:bytes, dataAnsType:bytes):
         """Creates a scan mode using the byte packs returned by the lidar"""
+        self.rawBytes = (bytes(dataName), bytes(dataMaxDistance), bytes(dataUsPerSample), bytes(dataAnsType))
         self.usPerSample = struct.unpack("<I", dataUsPerSample[4:8])[0]
         self.maxDistance = struct.unpack("<I", dataMaxDistance[4:8])[0]
         self.ansType = struct.unpack("<B", dataAnsType[4:5])[0]
         self.name = codecs.decode(dataName[4:-1], 'ascii')
     
+    def __reduce__(self):
+        return (RPlidarScanMode, self.rawBytes)
+
     def __str__(self):
         data = {
             "name" : self.name,
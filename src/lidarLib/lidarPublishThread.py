@@ -0,0 +1,140 @@
+import hashlib
+import threading
+from time import perf_counter
+from typing import Callable
+import numpy as np
+
+from lidarLib.constants import constants
+
+
+class lidarPublishThread:
+    """
+        Class that publishes to network tables from a background thread so building and serializing values never slows down the thread that makes them.
+        Values are submitted to named channels, each channel only keeps its newest unpublished value and is published at most at the rate given for it in rates (in Hz).
+        A value is skipped if its key (normally a scan id, or a hash of its content if no key is given) is the same as the last value published on its channel.
+    """
+    def __init__(self, rates:dict[str, float]=constants.publishRates, defaultRate:float=constants.publishDefaultRate):
+        """Starts the publish thread, channels missing from rates are published at defaultRate"""
+        self.rates=dict(rates)
+        self.defaultRate=defaultRate
+        self.__pending:dict[str, tuple[Callable, tuple, object]]={}
+        self.__lastKeys:dict[str, object]={}
+        self.__lastPublished:dict[str, float]={}
+        self.__stats:dict[str, dict[str, int]]={}
+        self.__condition=threading.Condition()
+        self.__shouldLive=True
+        self.__thread=threading.Thread(target=self.__publishLoop, daemon=True)
+        self.__thread.start()
+
+    def submit(self, channel:str, function:Callable, *args, key=None)->None:
+        """
+            Queues function(*args) to be run on the publish thread, replacing anything not yet published on the same channel.
+            key is compared to the key of the last value published on the channel and the value is skipped if they match, if it is None a hash of args is used instead.
+            args must not be changed after they are submitted since they are read on the publish thread.
+        """
+        with self.__condition:
+            stats = self.__getStats(channel)
+            if channel in self.__pending:
+                stats["coalesced"]+=1
+            self.__pending[channel]=(function, args, key)
+            self.__condition.notify()
+
+    def __getStats(self, channel:str)->dict[str, int]:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the counters of a channel, creating them if needed. The condition must be held.
+        """
+        if channel not in self.__stats:
+            self.__stats[channel]={"published" : 0, "coalesced" : 0, "unchanged" : 0, "errors" : 0}
+        return self.__stats[channel]
+
+    def __getDueTime(self, channel:str)->float:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the earliest time the given channel can be published again.
+        """
+        return self.__lastPublished.get(channel, -np.inf)+1/self.rates.get(channel, self.defaultRate)
+
+    def __publishLoop(self)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Body of the publish thread. Sleeps until the pending channel that is due soonest can be published, then publishes it.
+        """
+        while True:
+            with self.__condition:
+                while True:
+                    if not self.__shouldLive:
+                        return
+                    now = perf_counter()
+                    due = {channel : self.__getDueTime(channel) for channel in self.__pending}
+                    ready = [channel for channel, time in due.items() if time<=now]
+                    if ready:
+                        break
+                    self.__condition.wait(min(due.values())-now if due else None)
+
+                channel = min(ready, key=due.get)
+                function, args, key = self.__pending.pop(channel)
+
+            if key==None:
+                key = contentHash(args)
+
+            if key==self.__lastKeys.get(channel):
+                with self.__condition:
+                    self.__getStats(channel)["unchanged"]+=1
+                continue
+
+            try:
+                function(*args)
+            except Exception as e:
+                print("lidar publish channel", channel, "failed:", repr(e))
+                with self.__condition:
+                    self.__getStats(channel)["errors"]+=1
+                continue
+
+            with self.__condition:
+                self.__lastKeys[channel]=key
+                self.__lastPublished[channel]=perf_counter()
+                self.__getStats(channel)["published"]+=1
+
+    def getStats(self)->dict[str, dict[str, int]]:
+        """
+            Returns counters for every channel keyed by channel name. "published" is the number of values published, "coalesced" the number replaced by a newer value before they were published,
+            "unchanged" the number skipped because their key matched the last published value and "errors" the number whose publish function threw.
+        """
+        with self.__condition:
+            return {channel : dict(stats) for channel, stats in self.__stats.items()}
+
+    def stop(self)->None:
+        """Stops the publish thread, anything not yet published is dropped"""
+        with self.__condition:
+            self.__shouldLive=False
+            self.__condition.notify()
+        self.__thread.join(1)
+
+
+def contentHash(value)->bytes:
+    """
+        Returns a hash of the content of value, used to tell if a value has changed since it was last published.
+        Numpy arrays and bytes are hashed by their data, lists and tuples by their items and everything else by its repr.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _addToHash(digest, value)
+    return digest.digest()
+
+
+def _addToHash(digest:"hashlib.blake2b", value)->None:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Adds value to a running hash for contentHash.
+    """
+    if isinstance(value, np.ndarray):
+        digest.update(str((value.dtype, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (bytes, bytearray)):
+        digest.update(value)
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[" + str(len(value)).encode())
+        for item in value:
+            _addToHash(digest, item)
+    else:
+        digest.update(repr(value).encode())
@@ -0,0 +1,84 @@
+import os
+
+
+realtimePolicies = {
+    "fifo" : getattr(os, "SCHED_FIFO", None),
+    "rr" : getattr(os, "SCHED_RR", None)
+}
+
+
+def applyProcessScheduling(cpuAffinity:list[int]=None, niceness:int=None)->dict:
+    """
+        Pins the calling thread to the cpus in cpuAffinity and changes its niceness (lower is higher priority, going below 0 normally needs root).
+        On linux both settings are per thread and are inherited by threads started afterwards, so calling this first thing in a process applies it to the whole process.
+        Settings that are None are left alone. Settings that are not supported on this platform or are not permitted are skipped and reported instead of raising.
+        Returns a report of the effective settings, see getSchedulingReport.
+    """
+    errors = []
+    if cpuAffinity!=None:
+        try:
+            os.sched_setaffinity(0, cpuAffinity)
+        except AttributeError:
+            errors.append("cpu affinity is not supported on this platform")
+        except (OSError, ValueError) as e:
+            errors.append("could not set cpu affinity to " + str(cpuAffinity) + ": " + str(e))
+
+    if niceness!=None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, niceness)
+        except AttributeError:
+            errors.append("niceness is not supported on this platform")
+        except OSError as e:
+            errors.append("could not set niceness to " + str(niceness) + ": " + str(e))
+
+    return getSchedulingReport(errors=errors)
+
+
+def applyRealtimeScheduling(policy:str=None, priority:int=10)->dict:
+    """
+        Switches the calling thread to a real time scheduling policy, "fifo" (SCHED_FIFO) or "rr" (SCHED_RR), at the given priority (1-99 on linux).
+        Real time threads always run before normal ones so this should only be used for short, latency critical loops like the lidar reader. It normally needs root or CAP_SYS_NICE.
+        If policy is None nothing is changed. If the policy can not be applied the thread keeps its old policy and the error is reported instead of raised.
+        Returns a report of the effective settings, see getSchedulingReport.
+    """
+    errors = []
+    if policy!=None:
+        if policy not in realtimePolicies:
+            errors.append("unknown real time policy " + str(policy) + ", expected one of " + str(list(realtimePolicies)))
+        elif realtimePolicies[policy]==None or not hasattr(os, "sched_setscheduler"):
+            errors.append("real time scheduling is not supported on this platform")
+        else:
+            try:
+                os.sched_setscheduler(0, realtimePolicies[policy], os.sched_param(priority))
+            except (OSError, ValueError) as e:
+                errors.append("could not set real time policy " + policy + " at priority " + str(priority) + ": " + str(e))
+
+    return getSchedulingReport(errors=errors)
+
+
+def getSchedulingReport(errors:list[str]=None)->dict:
+    """
+        Returns the effective scheduling of the calling thread as a dict with the keys cpuAffinity (sorted list of cpus), niceness, realtimePolicy ("fifo", "rr" or None),
+        realtimePriority and errors (a list of the settings that could not be applied). Values that can not be read on this platform are None.
+    """
+    report = {"cpuAffinity" : None, "niceness" : None, "realtimePolicy" : None, "realtimePriority" : None, "errors" : errors or []}
+    try:
+        report["cpuAffinity"] = sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        pass
+
+    try:
+        report["niceness"] = os.getpriority(os.PRIO_PROCESS, 0)
+    except (AttributeError, OSError):
+        pass
+
+    try:
+        policy = os.sched_getscheduler(0)
+        for name, value in realtimePolicies.items():
+            if value!=None and value==policy:
+                report["realtimePolicy"] = name
+                report["realtimePriority"] = os.sched_getparam(0).sched_priority
+    except (AttributeError, OSError):
+        pass
+
+    return report
@@ -0,0 +1,258 @@
+from multiprocessing import shared_memory
+import os
+import numpy as np
+
+from lidarLib.constants import constants
+from lidarLib.lidarMap import lidarMap
+from lidarLib.translation import translation
+
+
+class sharedSlot:
+    """Class to handle a read only view of one slot of a sharedRingBuffer"""
+    def __init__(self, buffer:"sharedRingBuffer", slot:int, slotSequence:int, sequence:int, count:int, meta:dict, arrays:dict[str, np.ndarray]):
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Slots should only be created by sharedRingBuffer.readLatest
+        """
+        self.buffer=buffer
+        self.slot=slot
+        self.slotSequence=slotSequence
+        self.sequence=sequence
+        self.count=count
+        self.meta=meta
+        self.arrays=arrays
+
+    def __getitem__(self, key:str)->np.ndarray:
+        return self.arrays[key]
+
+    def isValid(self)->bool:
+        """
+            Returns wether or not the slot still holds the data it held when it was read.
+            The arrays of a slot are views into shared memory so once the writer wraps around the ring they will start to change.
+            Check this after using the arrays (or copy them) if the reader may be slower than slots-1 writes.
+        """
+        return self.buffer._slotSequence(self.slot)==self.slotSequence
+
+
+class sharedRingBuffer:
+    """
+        Class to handle a fixed layout ring of slots in shared memory that one process writes and any number of processes read.
+        Each slot holds a set of numpy arrays and float metadata. A header holds the sequence number of the last complete write and the slot it went to.
+        Slot sequence numbers are odd while a slot is being written so readers never see a half written slot.
+        The buffer can be passed to other processes (it is pickled as its name and layout) and readers get views of the shared arrays without copying.
+    """
+    def __init__(self, fields:dict[str, tuple[type, int]], metaFields:list[str], slots:int=3, name:str=None):
+        """
+            Creates a new shared ring buffer, or attaches to a existing one if name is given.
+            fields maps each array name to a (dtype, max length) tuple and metaFields is a list of names for float values stored with every slot.
+            slots should be at least 3 so a reader always has a full write of time before the slot it is reading is reused.
+        """
+        self.fields=fields
+        self.metaFields=metaFields
+        self.slots=slots
+
+        self.__slotHeaderSize = 16
+        self.__metaSize = 8*len(metaFields)
+        self.__fieldOffsets = {}
+        offset = self.__slotHeaderSize+self.__metaSize
+        for field, (dtype, length) in fields.items():
+            offset = -(-offset//8)*8
+            self.__fieldOffsets[field]=offset
+            offset += np.dtype(dtype).itemsize*length
+        self.__slotSize = -(-offset//8)*8
+        size = 16+self.__slotSize*slots
+
+        #forked children inherit this object so ownership is tied to the creating process and not just the flag
+        self.isOwner = name==None
+        self.ownerPid = os.getpid()
+        self.memory = shared_memory.SharedMemory(name=name, create=self.isOwner, size=size)
+
+        self.__map()
+        if self.isOwner:
+            self.header[:]=0
+            for slotHeader in self.slotHeaders:
+                slotHeader[:]=0
+
+    def __map(self)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Creates the numpy views used to access the shared memory
+        """
+        buffer = self.memory.buf
+        self.header = np.ndarray((2,), dtype=np.int64, buffer=buffer, offset=0)
+        self.slotHeaders = []
+        self.slotMeta = []
+        self.slotArrays = []
+        for slot in range(self.slots):
+            start = 16+slot*self.__slotSize
+            self.slotHeaders.append(np.ndarray((2,), dtype=np.int64, buffer=buffer, offset=start))
+            self.slotMeta.append(np.ndarray((len(self.metaFields),), dtype=np.float64, buffer=buffer, offset=start+self.__slotHeaderSize))
+            self.slotArrays.append({
+                field : np.ndarray((length,), dtype=dtype, buffer=buffer, offset=start+self.__fieldOffsets[field])
+                for field, (dtype, length) in self.fields.items()
+            })
+
+    def __getstate__(self):
+        return {"fields" : self.fields, "metaFields" : self.metaFields, "slots" : self.slots, "name" : self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["fields"], state["metaFields"], state["slots"], state["name"])
+
+    def getName(self)->str:
+        """Returns the name of the shared memory block, this can be used to attach to the buffer from another process"""
+        return self.memory.name
+
+    def getSequence(self)->int:
+        """Returns the sequence number of the last complete write, 0 if nothing has been written yet"""
+        return int(self.header[0])
+
+    def _slotSequence(self, slot:int)->int:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns the current sequence number of a single slot
+        """
+        return int(self.slotHeaders[slot][0])
+
+
+    def write(self, count:int, meta:dict[str, float], arrays:dict[str, np.ndarray])->int:
+        """
+            Writes a new set of arrays into the next slot of the ring and returns the new sequence number.
+            Only the first count values of each array are written and any array longer than its field is cut down to fit.
+            Fields missing from arrays and metaFields missing from meta are left with whatever was in the slot before.
+            Only one process should ever write to a buffer.
+        """
+        slot = (int(self.header[1])+1)%self.slots if self.header[0]>0 else 0
+        slotHeader = self.slotHeaders[slot]
+        #a writer that died part way through a write leaves the slot odd, it is evened out first so it still reads as being written
+        slotHeader[0]+=1+slotHeader[0]%2
+
+        for field, values in arrays.items():
+            length = min(count, len(values), len(self.slotArrays[slot][field]))
+            self.slotArrays[slot][field][:length]=values[:length]
+        for index, field in enumerate(self.metaFields):
+            if field in meta:
+                self.slotMeta[slot][index]=meta[field]
+
+        slotHeader[1]=min(count, *(length for _, length in self.fields.values()))
+        slotHeader[0]+=1
+
+        self.header[1]=slot
+        self.header[0]+=1
+        return int(self.header[0])
+
+
+    def readLatest(self)->sharedSlot:
+        """
+            Returns a read only view of the last complete write or None if nothing has been written yet.
+            The arrays are not copied, see sharedSlot.isValid for how long they stay valid.
+        """
+        for _ in range(self.slots):
+            sequence = int(self.header[0])
+            if sequence==0:
+                return None
+            slot = int(self.header[1])
+            slotSequence = self._slotSequence(slot)
+            if slotSequence%2==1:
+                continue
+
+            count = int(self.slotHeaders[slot][1])
+            meta = dict(zip(self.metaFields, self.slotMeta[slot].tolist()))
+            arrays = {}
+            for field, array in self.slotArrays[slot].items():
+                view = array[:count]
+                view.flags.writeable=False
+                arrays[field]=view
+
+            if self._slotSequence(slot)==slotSequence:
+                return sharedSlot(self, slot, slotSequence, sequence, count, meta, arrays)
+        return None
+
+
+    def close(self)->None:
+        """Closes this processes access to the buffer. If this process created the buffer it will also be deleted"""
+        if self.memory==None:
+            return
+        self.header=None
+        self.slotHeaders=None
+        self.slotMeta=None
+        self.slotArrays=None
+        try:
+            self.memory.close()
+        except BufferError:
+            #views from readLatest are still alive somewhere, the memory will be released when they are
+            pass
+        if self.isOwner and self.ownerPid==os.getpid():
+            self.memory.unlink()
+        self.memory=None
+
+
+class sharedScanBuffer(sharedRingBuffer):
+    """
+        Shared ring buffer laid out to hold full lidar scans.
+        Each slot holds the angle, distance, quality, x and y of every point along with the map id, start and end time and the translation of the lidar when the scan finished.
+    """
+
+    scanFields = ["mapID", "startTime", "endTime", "poseX", "poseY", "poseRotation"]
+
+    def __init__(self, maxPoints:int=constants.sharedScanMaxPoints, slots:int=4, name:str=None):
+        """Creates or attaches to (if name is given) a shared scan buffer that can hold scans of up to maxPoints points"""
+        super().__init__(
+            {
+                "angle" : (np.float32, maxPoints),
+                "distance" : (np.float32, maxPoints),
+                "quality" : (np.uint8, maxPoints),
+                "x" : (np.float32, maxPoints),
+                "y" : (np.float32, maxPoints)
+            },
+            sharedScanBuffer.scanFields, slots, name
+        )
+        self.maxPoints=maxPoints
+
+    def __getstate__(self):
+        return {"maxPoints" : self.maxPoints, "slots" : self.slots, "name" : self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxPoints"], state["slots"], state["name"])
+
+
+    def writeMap(self, map:lidarMap, combinedTranslation:translation)->int:
+        """Writes a finished lidar map into the buffer and returns the new sequence number"""
+        angles, distances, qualities = map.getArrays()
+        count = len(angles)
+        radians = np.radians(angles)
+
+        return self.write(
+            count,
+            {
+                "mapID" : map.mapID,
+                "startTime" : map.startTime or 0,
+                "endTime" : map.endTime or 0,
+                "poseX" : combinedTranslation.x if combinedTranslation else 0,
+                "poseY" : combinedTranslation.y if combinedTranslation else 0,
+                "poseRotation" : combinedTranslation.rotation if combinedTranslation else 0
+            },
+            {
+                "angle" : angles,
+                "distance" : distances,
+                "quality" : qualities,
+                "x" : distances*np.cos(radians),
+                "y" : distances*np.sin(radians)
+            }
+        )
+
+
+    @staticmethod
+    def slotToMap(slot:sharedSlot)->lidarMap:
+        """
+            Builds a lidarMap from a slot of a scan buffer. The arrays are copied out of shared memory
+            but lidarMeasurement objects are only built if the points of the map are accessed.
+            Returns None if the writer reused the slot while it was being copied, read the buffer again to get the newer scan.
+        """
+        angles, distances, qualities = slot["angle"].copy(), slot["distance"].copy(), slot["quality"].copy()
+        if not slot.isValid():
+            return None
+        return lidarMap.fromArrays(
+            angles, distances, qualities, int(slot.meta["mapID"]),
+            slot.meta["startTime"] or None, slot.meta["endTime"] or None,
+            translation.fromCart(slot.meta["poseX"], slot.meta["poseY"], slot.meta["poseRotation"])
+        )
@@ -0,0 +1,177 @@
+import threading
+from time import perf_counter
+
+from lidarLib.constants import constants
+from lidarLib.LidarConfigs import lidarConfigs
+from lidarLib.lidarManager import makePipedLidar, startManager
+from lidarLib.lidarPipeline import lidarPipeline
+from lidarLib.lidarProcessingStages import lidarProcessingStage
+
+
+class lidarSupervisor:
+    """
+        Class that watches the manager process of a piped lidar and replaces it if it crashes or stalls.
+        A manager is treated as failed if its process exits, nothing (data or heartbeat) is received from it for heartbeatTimeout seconds
+        or no finished scan is received for scanDeadline seconds once it has had startupGrace seconds to connect and start scanning.
+        Failed managers are restarted with the device metadata of the last one so the lidar does not have to be queried again, and the same lidarPipeline is moved onto the new manager
+        so code using it does not have to do anything (see lidarPipeline._reconnect). Restarts that keep failing are spaced out with exponential backoff from minBackoff up to maxBackoff seconds.
+        The time from a failure being noticed to the first scan from the new manager is recorded for every recovery, see getRecoveryTimes.
+    """
+    def __init__(
+                    self,
+                    lidarConfig:lidarConfigs,
+                    stages:list[lidarProcessingStage]=None,
+                    heartbeatTimeout:float=constants.supervisorHeartbeatTimeout,
+                    scanDeadline:float=constants.supervisorScanDeadline,
+                    startupGrace:float=constants.supervisorStartupGrace,
+                    minBackoff:float=constants.supervisorMinBackoff,
+                    maxBackoff:float=constants.supervisorMaxBackoff,
+                    checkInterval:float=constants.supervisorCheckInterval
+            ):
+        """Starts a piped lidar (see makePipedLidar) and a thread in this process that watches it. The lidar is used through the pipeline attribute"""
+        self.lidarConfig=lidarConfig
+        self.stages=stages
+        self.heartbeatTimeout=heartbeatTimeout
+        self.scanDeadline=scanDeadline
+        self.startupGrace=startupGrace
+        self.minBackoff=minBackoff
+        self.maxBackoff=maxBackoff
+        self.checkInterval=checkInterval
+
+        self.restarts=0
+        self.lastFailure:str=None
+        self.__recoveryTimes:list[float]=[]
+        self.__failedAt:float=None
+        self.__consecutiveFailures=0
+        self.__nextRestart=0
+        self.__deviceMetadata:dict=None
+
+        self.pipeline:lidarPipeline = makePipedLidar(lidarConfig, stages)
+        self.__startedAt=perf_counter()
+        self.__scanCountAtStart=0
+
+        self.__stopEvent=threading.Event()
+        self.__thread=threading.Thread(target=self.__watchLoop, daemon=True)
+        self.__thread.start()
+
+    def __watchLoop(self)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Body of the supervisor thread. Checks the manager every checkInterval seconds and restarts it when it has failed and its backoff has passed.
+        """
+        while not self.__stopEvent.wait(self.checkInterval):
+            if self.pipeline.quitRequested:
+                return
+
+            now = perf_counter()
+            if self.__deviceMetadata==None:
+                self.__deviceMetadata=self.pipeline._getDeviceMetadata()
+
+            if self.__failedAt!=None and self.pipeline.getScanCount()>self.__scanCountAtStart:
+                self.__recoveryTimes.append(now-self.__failedAt)
+                print("lidar", self.lidarConfig.name or self.lidarConfig.port, "recovered in", round(now-self.__failedAt, 3), "seconds")
+                self.__failedAt=None
+                self.__consecutiveFailures=0
+
+            failure = self.__getFailure(now)
+            if failure==None:
+                continue
+
+            if self.__failedAt==None:
+                self.__failedAt=now
+                self.lastFailure=failure
+                print("lidar", self.lidarConfig.name or self.lidarConfig.port, "failed:", failure)
+
+            if now>=self.__nextRestart:
+                self.__restart()
+
+    def __getFailure(self, now:float)->str:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Returns a description of why the current manager has failed or None if it is healthy.
+        """
+        process = self.pipeline.host
+        if process!=None and not process.is_alive():
+            return "manager process exited with code " + str(process.exitcode)
+
+        sinceStart = now-self.__startedAt
+        heartbeatAge = self.pipeline.getHeartbeatAge()
+        if heartbeatAge==None:
+            if sinceStart>self.startupGrace:
+                return "nothing received from the manager " + str(round(sinceStart, 3)) + " seconds after it was started"
+            return None
+        if heartbeatAge>self.heartbeatTimeout:
+            return "no heartbeat from the manager for " + str(round(heartbeatAge, 3)) + " seconds"
+
+        if sinceStart<=self.startupGrace:
+            return None
+        if self.pipeline.getScanCount()==self.__scanCountAtStart:
+            return "no scan from the manager " + str(round(sinceStart, 3)) + " seconds after it was started"
+        scanAge = self.pipeline.getLastScanAge()
+        if scanAge>self.scanDeadline:
+            return "no scan from the manager for " + str(round(scanAge, 3)) + " seconds"
+        return None
+
+    def __restart(self)->None:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Kills the current manager, starts a new one and moves the pipeline onto it. Sets when the next restart is allowed using the backoff.
+        """
+        self.restarts+=1
+        self.__consecutiveFailures+=1
+        self.__nextRestart=perf_counter()+min(self.maxBackoff, self.minBackoff*2**(self.__consecutiveFailures-1))
+
+        process = self.pipeline.host
+        if process!=None and process.is_alive():
+            process.terminate()
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+                process.join(1)
+
+        try:
+            pipe, process = startManager(self.lidarConfig, self.pipeline.scanBuffer, self.stages, self.__deviceMetadata)
+        except Exception as e:
+            print("lidar", self.lidarConfig.name or self.lidarConfig.port, "could not be restarted:", repr(e))
+            return
+
+        self.pipeline._reconnect(pipe, process)
+        self.__startedAt=perf_counter()
+        self.__scanCountAtStart=self.pipeline.getScanCount()
+
+    def getRestartCount(self)->int:
+        """Returns the number of times the manager has been restarted"""
+        return self.restarts
+
+    def getRecoveryTimes(self)->list[float]:
+        """Returns the time to recovery of every recovery so far, in seconds from the failure being noticed to the first scan from the new manager"""
+        return list(self.__recoveryTimes)
+
+    def getLastRecoveryTime(self)->float:
+        """Returns the time to recovery of the most recent recovery in seconds or None if the manager has never had to recover"""
+        return self.__recoveryTimes[-1] if self.__recoveryTimes else None
+
+    def isRecovering(self)->bool:
+        """Returns wether or not the manager has failed and has not yet sent a scan since being restarted"""
+        return self.__failedAt!=None
+
+    def getStatus(self)->dict:
+        """
+            Returns the state of the supervisor as a dict with the keys "restarts", "recovering", "lastFailure" (a description of the most recent failure),
+            "downtime" (seconds since the current failure was noticed, None if not recovering), "lastRecoveryTime" and "recoveryTimes".
+        """
+        failedAt = self.__failedAt
+        return {
+            "restarts" : self.restarts,
+            "recovering" : failedAt!=None,
+            "lastFailure" : self.lastFailure,
+            "downtime" : perf_counter()-failedAt if failedAt!=None else None,
+            "lastRecoveryTime" : self.getLastRecoveryTime(),
+            "recoveryTimes" : self.getRecoveryTimes()
+        }
+
+    def stop(self)->None:
+        """Stops watching the manager and tells it to shut down"""
+        self.__stopEvent.set()
+        self.__thread.join(1)
+        self.pipeline.sendQuitRequest()
@@ -0,0 +1,199 @@
+import struct
+import numpy as np
+
+
+SCAN_MAGIC = b'LS'
+SCAN_FORMAT_VERSION = 2
+
+#magic, version, flags, map id, point count, start time, end time, sensor x, sensor y, sensor rotation
+SCAN_HEADER = struct.Struct("<2sBBIIddfff")
+
+#set in the scan flags when the sensor pose is present, a scan without one decodes with a pose of None
+SCAN_HAS_POSE = 0x01
+
+MAX_DISTANCE_MM = 0xFFFF
+
+POINTS_MAGIC = b'LP'
+POINTS_FORMAT_VERSION = 1
+
+#magic, version, scan id, point count, timestamp
+POINTS_HEADER = struct.Struct("<2sBxIId")
+
+#header values at the start of a point array, scan id, timestamp and point count
+POINTS_ARRAY_HEADER_LENGTH = 3
+
+POINT_RESOLUTION_METERS = 0.01
+
+GRID_MAGIC = b'LG'
+GRID_FORMAT_VERSION = 1
+GRID_KEYFRAME = 0
+GRID_DELTA = 1
+
+#magic, version, kind (keyframe or delta), generation, base generation (the keyframe a delta applies to), rows, cols, cell size, payload length
+GRID_HEADER = struct.Struct("<2sBBIIHHfI")
+
+
+def encodeScan(angles:np.ndarray, distances:np.ndarray, qualities:np.ndarray, mapID:int=0, startTime:float=None, endTime:float=None, pose:tuple[float, float, float]=None)->bytes:
+    """
+        Packs a scan into the binary scan format and returns the bytes.
+        angles are in degrees and distances in meters, both are quantized the same way the lidar sends them (angles to 1/64 of a degree as a uint16 and distances to whole millimeters as a uint16).
+        Distances over 65.535 meters are clipped. pose is a (x, y, rotation) tuple of the sensor when the scan was taken or None if it is not known.
+        The layout is a SCAN_HEADER followed by the angle column, the distance column and the quality column.
+    """
+    count = len(angles)
+    x, y, rotation = pose if pose else (0, 0, 0)
+    flags = SCAN_HAS_POSE if pose else 0
+    header = SCAN_HEADER.pack(SCAN_MAGIC, SCAN_FORMAT_VERSION, flags, mapID, count, startTime or 0, endTime or 0, x, y, rotation)
+
+    angleQ6 = np.rint(np.asarray(angles, dtype=np.float64)%360*64).astype("<u2")
+    distanceMM = np.clip(np.rint(np.asarray(distances, dtype=np.float64)*1000), 0, MAX_DISTANCE_MM).astype("<u2")
+    quality = np.asarray(qualities).astype(np.uint8)
+    return b"".join((header, angleQ6.tobytes(), distanceMM.tobytes(), quality.tobytes()))
+
+
+def decodeScan(data:bytes)->dict:
+    """
+        Unpacks bytes made by encodeScan. Returns a dict with the keys mapID, startTime, endTime, pose, angles, distances and qualities.
+        angles and distances are converted back to degrees and meters, times and a pose that were never set are returned as None.
+        Throws a ValueError if the data is not a scan or was written with a different format version.
+    """
+    magic, version, flags, mapID, count, startTime, endTime, x, y, rotation = SCAN_HEADER.unpack_from(data, 0)
+    if magic!=SCAN_MAGIC:
+        raise ValueError("attempted to decode data that is not a packed lidar scan")
+    if version!=SCAN_FORMAT_VERSION:
+        raise ValueError("packed lidar scan has format version", version, "but this version of the library only reads version", SCAN_FORMAT_VERSION)
+
+    offset = SCAN_HEADER.size
+    angleQ6 = np.frombuffer(data, dtype="<u2", count=count, offset=offset)
+    distanceMM = np.frombuffer(data, dtype="<u2", count=count, offset=offset+2*count)
+    qualities = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset+4*count)
+
+    return {
+        "mapID" : mapID,
+        "startTime" : startTime or None,
+        "endTime" : endTime or None,
+        "pose" : (x, y, rotation) if flags&SCAN_HAS_POSE else None,
+        "angles" : angleQ6/64.0,
+        "distances" : distanceMM/1000.0,
+        "qualities" : qualities
+    }
+
+
+def encodePoints(xy:np.ndarray, scanID:int=0, timestamp:float=None)->bytes:
+    """
+        Packs a (n, 2) array of field coordinates in meters into the binary point format and returns the bytes, used for the packed point topic.
+        Coordinates are quantized to whole centimeters as int16 so anything further than 327.67 meters from the origin is clipped.
+        The layout is a POINTS_HEADER followed by the x, y pairs interleaved (x0, y0, x1, y1...), all little endian.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    header = POINTS_HEADER.pack(POINTS_MAGIC, POINTS_FORMAT_VERSION, scanID, len(xy), timestamp or 0)
+    centimeters = np.clip(np.rint(xy/POINT_RESOLUTION_METERS), -0x8000, 0x7FFF).astype("<i2")
+    return header+centimeters.tobytes()
+
+
+def decodePoints(data:bytes)->dict:
+    """
+        Unpacks bytes made by encodePoints. Returns a dict with the keys scanID, timestamp (None if it was never set) and points (a (n, 2) array of field coordinates in meters).
+        Throws a ValueError if the data is not packed points or was written with a different format version.
+    """
+    magic, version, scanID, count, timestamp = POINTS_HEADER.unpack_from(data, 0)
+    if magic!=POINTS_MAGIC:
+        raise ValueError("attempted to decode data that is not packed lidar points")
+    if version!=POINTS_FORMAT_VERSION:
+        raise ValueError("packed lidar points have format version", version, "but this version of the library only reads version", POINTS_FORMAT_VERSION)
+
+    centimeters = np.frombuffer(data, dtype="<i2", count=2*count, offset=POINTS_HEADER.size)
+    return {
+        "scanID" : scanID,
+        "timestamp" : timestamp or None,
+        "points" : centimeters.reshape(-1, 2)*POINT_RESOLUTION_METERS
+    }
+
+
+def encodePointsArray(xy:np.ndarray, scanID:int=0, timestamp:float=None)->np.ndarray:
+    """
+        Lays out a (n, 2) array of field coordinates in meters as a flat float64 array for a double array topic, without any loss of precision.
+        The first POINTS_ARRAY_HEADER_LENGTH values are the scan id, the timestamp (0 if not set) and the point count, followed by the x, y pairs interleaved.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    values = np.empty(POINTS_ARRAY_HEADER_LENGTH+2*len(xy), dtype=np.float64)
+    values[:POINTS_ARRAY_HEADER_LENGTH] = (scanID, timestamp or 0, len(xy))
+    values[POINTS_ARRAY_HEADER_LENGTH:] = xy.ravel()
+    return values
+
+
+def decodePointsArray(values:list[float])->dict:
+    """Unpacks a array made by encodePointsArray into the same dict as decodePoints. Throws a ValueError if the array is shorter than its header says"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values)<POINTS_ARRAY_HEADER_LENGTH or len(values)!=POINTS_ARRAY_HEADER_LENGTH+2*int(values[2]):
+        raise ValueError("attempted to decode a lidar point array with the wrong length")
+
+    return {
+        "scanID" : int(values[0]),
+        "timestamp" : float(values[1]) or None,
+        "points" : values[POINTS_ARRAY_HEADER_LENGTH:].reshape(-1, 2)
+    }
+
+
+def encodeGridKeyframe(occupancy:np.ndarray, cellSize:float, generation:int)->bytes:
+    """
+        Packs a [y][x] boolean occupancy grid into a keyframe of the binary grid format and returns the bytes.
+        The payload is the grid flattened row by row as a bitset, 8 cells to a byte with the first cell in the lowest bit.
+    """
+    occupancy = np.asarray(occupancy, dtype=bool)
+    rows, cols = occupancy.shape
+    bits = np.packbits(occupancy.ravel(), bitorder="little")
+    return GRID_HEADER.pack(GRID_MAGIC, GRID_FORMAT_VERSION, GRID_KEYFRAME, generation, generation, rows, cols, cellSize, len(bits))+bits.tobytes()
+
+
+def encodeGridDelta(keyframe:np.ndarray, occupancy:np.ndarray, cellSize:float, generation:int, baseGeneration:int)->bytes:
+    """
+        Packs the cells of occupancy that differ from keyframe (the grid of the keyframe with generation baseGeneration) into a delta of the binary grid format and returns the bytes.
+        Deltas always hold every change since their keyframe, not since the last delta, so a reader only needs the newest keyframe and the newest delta.
+        The payload is the flattened index (row*cols+col) of every changed cell as a uint32.
+    """
+    occupancy = np.asarray(occupancy, dtype=bool)
+    rows, cols = occupancy.shape
+    changed = np.flatnonzero(occupancy.ravel()!=np.asarray(keyframe, dtype=bool).ravel()).astype("<u4")
+    return GRID_HEADER.pack(GRID_MAGIC, GRID_FORMAT_VERSION, GRID_DELTA, generation, baseGeneration, rows, cols, cellSize, len(changed))+changed.tobytes()
+
+
+def decodeGrid(keyframeData:bytes, deltaData:bytes=None)->dict:
+    """
+        Unpacks a keyframe made by encodeGridKeyframe, and the delta made by encodeGridDelta on top of it if given.
+        Returns a dict with the keys generation, cellSize and occupancy (a [y][x] boolean array).
+        A delta for a different keyframe (normally one made just before a new keyframe arrived) is ignored and the keyframe is returned on its own.
+        Throws a ValueError if the data is not a packed grid or was written with a different format version.
+    """
+    kind, generation, _, rows, cols, cellSize, length = _unpackGridHeader(keyframeData)
+    if kind!=GRID_KEYFRAME:
+        raise ValueError("attempted to decode a occupancy grid delta as a keyframe")
+    bits = np.frombuffer(keyframeData, dtype=np.uint8, count=length, offset=GRID_HEADER.size)
+    occupancy = np.unpackbits(bits, count=rows*cols, bitorder="little").astype(bool)
+
+    if deltaData:
+        deltaKind, deltaGeneration, baseGeneration, _, _, _, deltaLength = _unpackGridHeader(deltaData)
+        if deltaKind!=GRID_DELTA:
+            raise ValueError("attempted to decode a occupancy grid keyframe as a delta")
+        if baseGeneration==generation:
+            occupancy[np.frombuffer(deltaData, dtype="<u4", count=deltaLength, offset=GRID_HEADER.size)] ^= True
+            generation = deltaGeneration
+
+    return {
+        "generation" : generation,
+        "cellSize" : cellSize,
+        "occupancy" : occupancy.reshape(rows, cols)
+    }
+
+
+def _unpackGridHeader(data:bytes)->tuple:
+    """
+        INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+        Checks and unpacks the header of a packed grid. Returns the kind, generation, base generation, rows, cols, cell size and payload length.
+    """
+    magic, version, kind, generation, baseGeneration, rows, cols, cellSize, length = GRID_HEADER.unpack_from(data, 0)
+    if magic!=GRID_MAGIC:
+        raise ValueError("attempted to decode data that is not a packed occupancy grid")
+    if version!=GRID_FORMAT_VERSION:
+        raise ValueError("packed occupancy grid has format version", version, "but this version of the library only reads version", GRID_FORMAT_VERSION)
+    return kind, generation, baseGeneration, rows, cols, cellSize, length
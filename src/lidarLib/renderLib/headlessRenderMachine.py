@@ -0,0 +1,203 @@
+import math
+import os
+import subprocess
+import sys
+from multiprocessing import Pipe, Process
+from time import perf_counter, sleep
+import numpy as np
+from PIL import Image
+
+from lidarLib.constants import constants
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarMap import lidarMap
+from lidarLib.renderLib.renderFeed import renderFeed
+from lidarLib.renderLib.renderPipeCap import renderPipeCap
+
+
+#rgb colors of free cells, static field structure, closed nodes and points
+PALETTE = np.array([[255, 255, 255], [170, 170, 170], [30, 30, 30]], dtype=np.uint8)
+POINT_COLOR = np.array([220, 30, 30], dtype=np.uint8)
+
+FORMATS = ["png", "mjpeg", "mp4"]
+
+
+class frameRasterizer:
+    """
+        Draws hitbox maps and points straight into a preallocated numpy rgb buffer without matplotlib, each grid cell becomes a scale by scale block of pixels.
+        The image is laid out like the image render machine, x to the right and y up, and the same buffer is reused for every frame.
+    """
+    def __init__(self, scale:int=constants.headlessRenderScale, xHeight:float=constants.mapHeightMeters, yWidth:float=constants.mapWidthMeters, cellSize:float=constants.mapNodeSizeMeters):
+        self.scale=scale
+        self.cellSize=cellSize
+        self.rows=math.ceil(yWidth/cellSize)
+        self.cols=math.ceil(xHeight/cellSize)
+        self.height=self.rows*scale
+        self.width=self.cols*scale
+        self.frame=np.empty((self.height, self.width, 3), dtype=np.uint8)
+        #cell of every pixel, rows are flipped so y goes up
+        self.__pixelRows=(self.rows-1-np.arange(self.height)//scale)[:, None]
+        self.__pixelCols=(np.arange(self.width)//scale)[None, :]
+        self.__cells=np.zeros((self.rows, self.cols), dtype=np.uint8)
+
+    def draw(self, hitboxMap:lidarHitboxMap=None, points:np.ndarray=None)->np.ndarray:
+        """
+            Draws a frame and returns the buffer, a (height, width, 3) uint8 array that is overwritten by the next call.
+            hitboxMap must be the size of the rasterizer's grid, points is a (n, 2) array of field coordinates in meters. Either can be None.
+        """
+        self.__cells.fill(0)
+        if hitboxMap!=None:
+            self.__cells[hitboxMap.staticMask] = 1
+            self.__cells[hitboxMap.occupancy] = 2
+        np.take(PALETTE, self.__cells[self.__pixelRows, self.__pixelCols], axis=0, out=self.frame)
+
+        if points is not None and len(points):
+            pixelX = np.floor(points[:, 0]/self.cellSize*self.scale).astype(np.int64)
+            pixelY = self.height-1-np.floor(points[:, 1]/self.cellSize*self.scale).astype(np.int64)
+            inside = (pixelX>=0) & (pixelX<self.width) & (pixelY>=0) & (pixelY<self.height)
+            self.frame[pixelY[inside], pixelX[inside]] = POINT_COLOR
+        return self.frame
+
+
+class frameWriter:
+    """
+        Writes rgb frames to disk as a numbered png per frame ("png", path is a directory), a motion jpeg stream ("mjpeg", a single file of back to back jpegs)
+        or a h264 mp4 ("mp4", needs ffmpeg on the path).
+    """
+    def __init__(self, path:str, format:str, width:int, height:int, fps:float, quality:int=constants.headlessJpegQuality):
+        if format not in FORMATS:
+            raise ValueError("unknown headless render format", format, "expected one of", FORMATS)
+        self.path=path
+        self.format=format
+        self.quality=quality
+        self.frames=0
+        self.file=None
+        self.process=None
+
+        if format=="png":
+            os.makedirs(path, exist_ok=True)
+        elif format=="mjpeg":
+            self.file=open(path, "wb")
+        else:
+            try:
+                self.process=subprocess.Popen(
+                    ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", str(width)+"x"+str(height), "-r", str(fps),
+                    "-i", "-", "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path],
+                    stdin=subprocess.PIPE
+                )
+            except FileNotFoundError:
+                raise ValueError("mp4 headless rendering needs ffmpeg to be installed, use png or mjpeg instead")
+
+    def write(self, frame:np.ndarray)->None:
+        """Writes one frame"""
+        if self.format=="png":
+            Image.fromarray(frame).save(os.path.join(self.path, "frame"+str(self.frames).zfill(6)+".png"), compress_level=1)
+        elif self.format=="mjpeg":
+            Image.fromarray(frame).save(self.file, "JPEG", quality=self.quality)
+        else:
+            self.process.stdin.write(frame.tobytes())
+        self.frames+=1
+
+    def close(self)->None:
+        """Finishes the output, the file is not complete until this is called"""
+        if self.file:
+            self.file.close()
+        if self.process:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+def headlessRenderMachine(pipeCap:renderPipeCap, path:str, format:str, fps:float, scale:int, showPoints:bool, userPipe:renderPipeCap=None)->None:
+    """
+        Body of the headless render process. Every 1/fps seconds the newest lidarHitboxMap and points (a lidarMap or (n, 2) array of field coordinates) sent over the pipe are drawn and written.
+        png output only writes a frame when something new has arrived, the video formats write a frame every tick so they play back in real time.
+        If drawing and writing falls behind, the missed ticks are skipped instead of being caught up on. Runs until the other end of the pipe is closed.
+        userPipe is the copy of the user's end inherited by this process, its pipe is closed so the pipe can be seen closing.
+    """
+    if userPipe!=None:
+        userPipe.pipe.close()
+    rasterizer = frameRasterizer(scale)
+    writer = frameWriter(path, format, rasterizer.width, rasterizer.height, fps)
+    period = 1/fps
+    nextFrame = perf_counter()
+    lastDrawn = None
+    skipped = 0
+
+    while True:
+        sleep(max(0, nextFrame-perf_counter()))
+        try:
+            hitboxMap = pipeCap._getLatest(lidarHitboxMap)
+        except (EOFError, OSError):
+            break
+
+        points = pipeCap._getLatestPoints() if showPoints else None
+
+        if lastDrawn==None or hitboxMap is not lastDrawn[0] or points is not lastDrawn[1]:
+            lastDrawn = (hitboxMap, points)
+            xy = points.getCartArray() if isinstance(points, lidarMap) else points
+            frame = rasterizer.draw(hitboxMap, None if xy is None else np.asarray(xy).reshape(-1, 2))
+            writer.write(frame)
+        elif format!="png":
+            writer.write(rasterizer.frame)
+
+        nextFrame += period
+        behind = perf_counter()-nextFrame
+        if behind>period:
+            skipped += int(behind/period)
+            nextFrame += int(behind/period)*period
+
+    writer.close()
+    print("headless render wrote", writer.frames, "frames to", path, "and skipped", skipped)
+
+
+def initHeadlessMachine(path:str, format:str="mjpeg", fps:float=constants.headlessRenderFps, scale:int=constants.headlessRenderScale, showPoints:bool=True, sharedFeed:bool=constants.renderSharedFeed)->tuple[Process, renderPipeCap]:
+    """
+        Creates a separate process that draws everything sent to it into image files or a video without needing a display, for logging on the robot.
+        Send it lidarHitboxMaps and lidarMaps (or (n, 2) numpy arrays of field coordinates in meters) the same way as initMachine, only the newest of each is drawn.
+        format is "png" (path is a directory of numbered frames), "mjpeg" or "mp4" (needs ffmpeg). Frames are written at fps frames per second and each grid cell is scale pixels wide.
+        If sharedFeed is true maps are passed through shared memory (see renderFeed) instead of being pickled over the pipe.
+        Closing the returned pipe finishes the output and stops the process. Returns the process and the pipe.
+    """
+    if format not in FORMATS:
+        raise ValueError("unknown headless render format", format, "expected one of", FORMATS)
+    returnPipe, machinePipe = Pipe(duplex=True)
+    feed = renderFeed() if sharedFeed else None
+    returnPipe=renderPipeCap(returnPipe, feed)
+    machinePipe=renderPipeCap(machinePipe, feed)
+    process=Process(target=headlessRenderMachine, args=(machinePipe, path, format, fps, scale, showPoints, returnPipe), daemon=True)
+    process.start()
+    #the machine has its own copy of its end, closing this one lets it see the pipe close when the caller closes theirs. The feed stays open, it belongs to the caller's end
+    machinePipe.pipe.close()
+    return process, returnPipe
+
+
+def benchmark(frames:int=200, format:str="mjpeg", scale:int=constants.headlessRenderScale, points:int=4000, path:str=None)->dict:
+    """
+        Measures how fast frames can be drawn and written with random maps and points. Returns a dict with the sustained frames per second
+        of drawing alone ("drawFps") and of drawing and writing ("writeFps") along with the frame size. Output goes to a temporary file or directory unless path is given.
+    """
+    import tempfile
+    rasterizer = frameRasterizer(scale)
+    random = np.random.default_rng(0)
+    hitboxMap = lidarHitboxMap()
+    hitboxMap.occupancy |= random.random(hitboxMap.occupancy.shape)<0.1
+    clouds = [random.uniform(0, (constants.mapHeightMeters, constants.mapWidthMeters), (points, 2)) for _ in range(8)]
+
+    start = perf_counter()
+    for index in range(frames):
+        rasterizer.draw(hitboxMap, clouds[index%len(clouds)])
+    drawTime = perf_counter()-start
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = frameWriter(path or os.path.join(directory, "benchmark" + ("" if format=="png" else "."+format)), format, rasterizer.width, rasterizer.height, 30)
+        start = perf_counter()
+        for index in range(frames):
+            writer.write(rasterizer.draw(hitboxMap, clouds[index%len(clouds)]))
+        writer.close()
+        writeTime = perf_counter()-start
+
+    return {"drawFps" : frames/drawTime, "writeFps" : frames/writeTime, "width" : rasterizer.width, "height" : rasterizer.height, "format" : format, "points" : points}
+
+
+if __name__ == '__main__':
+    for format in (sys.argv[1:] or ["png", "mjpeg"]):
+        print(benchmark(format=format))
@@ -0,0 +1,144 @@
+import math
+import numpy as np
+
+from lidarLib.constants import constants
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarSharedMemory import sharedRingBuffer, sharedScanBuffer, sharedSlot
+
+
+class renderPointsBuffer(sharedRingBuffer):
+    """Shared ring buffer laid out to hold a (n, 2) array of field coordinates sent to a render machine"""
+
+    def __init__(self, maxPoints:int, slots:int=3, name:str=None):
+        super().__init__({"x" : (np.float64, maxPoints), "y" : (np.float64, maxPoints)}, [], slots, name)
+        self.maxPoints=maxPoints
+
+    def __getstate__(self):
+        return {"maxPoints" : self.maxPoints, "slots" : self.slots, "name" : self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxPoints"], state["slots"], state["name"])
+
+
+class renderGridBuffer(sharedRingBuffer):
+    """
+        Shared ring buffer laid out to hold the occupancy and static structure of a lidarHitboxMap sent to a render machine.
+        Both grids are stored flattened, the rows and cols are kept so they can be reshaped.
+    """
+
+    gridFields = ["rows", "cols", "nodeSideLen"]
+
+    def __init__(self, rows:int, cols:int, slots:int=3, name:str=None):
+        super().__init__({"occupancy" : (np.uint8, rows*cols), "staticMask" : (np.uint8, rows*cols)}, renderGridBuffer.gridFields, slots, name)
+        self.rows=rows
+        self.cols=cols
+
+    def __getstate__(self):
+        return {"rows" : self.rows, "cols" : self.cols, "slots" : self.slots, "name" : self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["rows"], state["cols"], state["slots"], state["name"])
+
+
+class renderGrid:
+    """
+        Copy of the grids of a lidarHitboxMap read back out of a renderGridBuffer.
+        It has the occupancy, staticMask and nodeSideLen of the map it was made from so the render machines draw it in place of the map without the node objects being rebuilt.
+    """
+    def __init__(self, occupancy:np.ndarray, staticMask:np.ndarray, nodeSideLen:float):
+        self.occupancy=occupancy
+        self.staticMask=staticMask
+        self.nodeSideLen=nodeSideLen
+
+
+class renderFeed:
+    """
+        Class that passes the newest scan, point array and hitbox map from a user to a render machine through shared memory instead of pickling them over a pipe.
+        The writer never waits on the reader and the reader only copies out the newest value of each kind, anything written over before it was read is never touched.
+        The feed is created by the user's process and passed to the render machine's process with its renderPipeCap, the user's process deletes the shared memory when it closes the feed.
+    """
+    def __init__(self, maxPoints:int=constants.sharedScanMaxPoints, xHeight:float=constants.mapHeightMeters, yWidth:float=constants.mapWidthMeters, nodeSideLen:float=constants.mapNodeSizeMeters):
+        """Creates a feed for scans and point arrays of up to maxPoints points and hitbox maps the size of the given field"""
+        self.scans=sharedScanBuffer(maxPoints, slots=3)
+        self.points=renderPointsBuffer(maxPoints)
+        self.grids=renderGridBuffer(math.ceil(yWidth/nodeSideLen), math.ceil(xHeight/nodeSideLen))
+        self.__lastSequences:dict[type, int]={}
+
+    def write(self, value)->bool:
+        """
+            Writes a lidarMap, lidarHitboxMap or (n, 2) numpy array of field coordinates into the feed.
+            Returns false without writing anything if the value is some other type or is too big for the feed, it should be sent some other way.
+        """
+        if isinstance(value, lidarMap):
+            if value.len>self.scans.maxPoints:
+                return False
+            self.scans.writeMap(value, value.sensorPose)
+            return True
+
+        if isinstance(value, lidarHitboxMap):
+            if value.occupancy.shape!=(self.grids.rows, self.grids.cols):
+                return False
+            self.grids.write(
+                value.occupancy.size,
+                {"rows" : self.grids.rows, "cols" : self.grids.cols, "nodeSideLen" : value.nodeSideLen},
+                {"occupancy" : value.occupancy.reshape(-1), "staticMask" : value.staticMask.reshape(-1)}
+            )
+            return True
+
+        if isinstance(value, np.ndarray):
+            if value.size%2!=0 or value.size//2>self.points.maxPoints:
+                return False
+            xy = value.reshape(-1, 2)
+            self.points.write(len(xy), {}, {"x" : xy[:, 0], "y" : xy[:, 1]})
+            return True
+
+        return False
+
+    def readNew(self)->list[tuple[type, object]]:
+        """
+            Returns a (type, value) tuple for each kind of value that has been written since the last call, with the value copied out of shared memory.
+            Scans come back as lidarMaps, point arrays as (n, 2) numpy arrays and hitbox maps as renderGrids with the type lidarHitboxMap.
+            A value that was written over while it was being copied is left for the next call.
+        """
+        updates = []
+        for valueType, buffer, convert in (
+            (lidarHitboxMap, self.grids, renderFeed.__slotToGrid),
+            (lidarMap, self.scans, sharedScanBuffer.slotToMap),
+            (np.ndarray, self.points, renderFeed.__slotToPoints)
+        ):
+            sequence = buffer.getSequence()
+            if sequence==0 or sequence==self.__lastSequences.get(valueType):
+                continue
+            slot = buffer.readLatest()
+            if slot==None:
+                continue
+            value = convert(slot)
+            if not slot.isValid():
+                continue
+            self.__lastSequences[valueType]=slot.sequence
+            updates.append((valueType, value))
+        return updates
+
+    @staticmethod
+    def __slotToGrid(slot:sharedSlot)->renderGrid:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Copies a slot of the grid buffer into a renderGrid
+        """
+        shape = (int(slot.meta["rows"]), int(slot.meta["cols"]))
+        return renderGrid(slot["occupancy"].astype(bool).reshape(shape), slot["staticMask"].astype(bool).reshape(shape), slot.meta["nodeSideLen"])
+
+    @staticmethod
+    def __slotToPoints(slot:sharedSlot)->np.ndarray:
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            Copies a slot of the points buffer into a (n, 2) array
+        """
+        return np.column_stack((slot["x"], slot["y"]))
+
+    def close(self)->None:
+        """Closes this process's access to the feed, if this process created the feed the shared memory is also deleted"""
+        self.scans.close()
+        self.points.close()
+        self.grids.close()
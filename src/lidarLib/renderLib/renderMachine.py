@@ -1,41 +1,36 @@
 import math
 from multiprocessing.connection import Connection
 import matplotlib.pyplot as plot
-from matplotlib.axis import Axis
 import matplotlib.animation as animation
+from matplotlib.collections import PathCollection
 import numpy as np
 from multiprocessing import Process, Pipe
-import lidarLib.lidarHitboxNode as lidarHitboxNode
 from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarMap import lidarMap
+from lidarLib.renderLib.renderFeed import renderFeed
 from lidarLib.renderLib.renderPipeCap import renderPipeCap
 from lidarLib.constants import constants
 
-DMAX=4000
+#distance in meters at the edge of the polar render, the axes are not rescaled per frame so blitting only has to redraw the points
+DMAX=12
 
-def updateLinePolar(num, pipe:renderPipeCap, subplot:plot.Figure)->Axis:
+
+def updateLinePolar(num, pipe:renderPipeCap, scatter:PathCollection, lastRendered:list)->tuple[PathCollection]:
     """
-        updates the subplot using data gained from the pipe
+        updates the scatter plot using data gained from the pipe
         pipe should be the read end of a renderPipe cap thats partner is consistently supplied with up to date lidar maps
-        subplot should be a axis value that is tied to a plot being updated by an animation(with this or a extension of this as its active function)
+        scatter should be the artist made by polarRenderMachine, it is moved to the new points instead of a new one being made every frame
+        lastRendered holds the id and end time of the last map drawn, if the newest map matches it (the same map was sent again) nothing is changed
         num is an placeholder argument that is automatically supplied by animation but never used
     """
+    scan:lidarMap = pipe._get()
+    if scan == None or (scan.mapID, scan.endTime) == lastRendered[0]:
+        return scatter,
+    lastRendered[0] = (scan.mapID, scan.endTime)
 
-    subplot.clear()
-    scan = pipe._get()
-    #print(scan.mapID)
-    if scan == None:
-        return
-    scan=scan.getPoints()
-    angles=np.array([point.angle for point in scan])
-    distances=np.array([point.distance for point in scan])
-    #offsets = np.array([[point.angle, point.distance] for point in scan])
-    #offsets=[scan[0].angle, scan[0].distance]
-    #subplot.set_offsets(offsets)pass
-
-    intens = np.array([1 for point in scan])
-    #subplot.set_array(intens)
-    #print("render cycle", len(intens))
-    return subplot.scatter(angles*3.14/180, distances, s=10, c=intens, cmap=plot.cm.Greys_r, lw=0),
+    angles, distances, _ = scan.getArrays()
+    scatter.set_offsets(np.column_stack((np.radians(angles), distances)))
+    return scatter,
 
 
 def polarRenderMachine(pipeCap:renderPipeCap)->None:
@@ -48,16 +43,16 @@ def polarRenderMachine(pipeCap:renderPipeCap)->None:
     subplot = plot.subplot(111, projection='polar')
     subplot.set_rmax(DMAX)
     subplot.grid(True)
+    scatter = subplot.scatter(np.empty(0), np.empty(0), s=10, c="k", lw=0)
     
-    anim=animation.FuncAnimation(fig, updateLinePolar, blit=False,
-    fargs=(pipeCap, subplot), interval=50, save_count=50)
+    #the figure holds the animation, matplotlib stops any animation that is garbage collected
+    fig.animation=animation.FuncAnimation(fig, updateLinePolar, init_func=lambda: (scatter,), blit=True,
+    fargs=(pipeCap, scatter, [None]), interval=50, cache_frame_data=False)
     
     plot.show()
 
 
 def cartRenderMachine(pipeCap:renderPipeCap)->None:
-    global updateLineCartHeartBeat
-    updateLineCartHeartBeat=0
     fig = plot.figure()
     subplot = plot.subplot(
                             # math.ceil(constants.mapWidthMeters/constants.mapNodeSizeMeters/100),
@@ -66,60 +61,112 @@ def cartRenderMachine(pipeCap:renderPipeCap)->None:
                             projection='rectilinear',
         )
     subplot.grid(True)
+    #the axes are fixed to the size of the field so blitting only has to redraw the nodes
+    subplot.set_xlim(-1, math.ceil(constants.mapHeightMeters/constants.mapNodeSizeMeters))
+    subplot.set_ylim(-1, math.ceil(constants.mapWidthMeters/constants.mapNodeSizeMeters))
+    scatter = subplot.scatter(np.empty(0), np.empty(0), s=10, c="k", lw=0)
     
 
-    anim=animation.FuncAnimation(fig, updateLineCart, blit=False,
-    fargs=(pipeCap, subplot), interval=50, save_count=50)
+    fig.animation=animation.FuncAnimation(fig, updateLineCart, init_func=lambda: (scatter,), blit=True,
+    fargs=(pipeCap, scatter, [None]), interval=50, cache_frame_data=False)
     
     plot.show()
 
 
 
-def updateLineCart(num, pipeCap:renderPipeCap, subplot:plot.Figure):
-    global updateLineCartHeartBeat
-    subplot.clear()
+def updateLineCart(num, pipeCap:renderPipeCap, scatter:PathCollection, lastRendered:list)->tuple[PathCollection]:
+    """
+        updates the scatter plot with the closed nodes of the newest hitbox map from the pipe, each node is drawn at its (column, row) index.
+        lastRendered holds the occupancy of the last map drawn, if the newest map's occupancy matches it nothing is changed
+    """
     scan:lidarHitboxMap = pipeCap._get()
-    #print(scan.mapID)
-    if scan == None:
-        return
-    scan=scan.getAs1DList()
-    xVals:list[lidarHitboxNode]=[]
-    yVals:list[lidarHitboxNode] = []
-    intens:list[float] = []
-    
-    updateLineCartHeartBeat+=1
-    #print( updateLineCartHeartBeat)
-    for point in scan:
-        if (not point.isOpen):
-            xVals.append(point.x/constants.mapNodeSizeMeters)
-            yVals.append(point.y/constants.mapNodeSizeMeters)
-            intens.append(1)
-    #offsets = np.array([[point.angle, point.distance] for point in scan])
-    #offsets=[scan[0].angle, scan[0].distance]
-    #subplot.set_offsets(offsets)
-    
-    #subplot.set_array(intens)
-    #print("render cycle", len(intens))
-    return subplot.scatter(np.array(xVals), np.array(yVals), s=10, c=np.array(intens), cmap=plot.cm.Greys_r, lw=0),
+    if scan == None or (lastRendered[0] is not None and np.array_equal(scan.occupancy, lastRendered[0])):
+        return scatter,
+    lastRendered[0] = scan.occupancy.copy()
+
+    rows, cols = np.nonzero(scan.occupancy)
+    scatter.set_offsets(np.column_stack((cols, rows)))
+    return scatter,
    
     
     
 
 
-def initMachine(type:int = 0)->tuple[Process, Connection]:
+#values of the occupancy image, static field structure is drawn lighter than closed nodes
+IMAGE_FREE=0
+IMAGE_STATIC=1
+IMAGE_CLOSED=2
+
+
+def imageRenderMachine(pipeCap:renderPipeCap, showPoints:bool=True)->None:
+    """
+        Initializes a render that draws the occupancy of the newest lidarHitboxMap sent over the pipe as a single image and displays it.
+        The image is one numpy array that is written over each frame so the cost of a frame does not depend on how many nodes are closed.
+        If showPoints is true the points of the newest lidarMap (or (n, 2) numpy array of field coordinates in meters) sent over the same pipe are drawn on top.
+        Like the other render machines this should be run on its own process, see initMachine.
+    """
+    rows = math.ceil(constants.mapWidthMeters/constants.mapNodeSizeMeters)
+    cols = math.ceil(constants.mapHeightMeters/constants.mapNodeSizeMeters)
+    fig = plot.figure()
+    subplot = plot.subplot(projection='rectilinear')
+    #cells are centered on their (column, row) index the same way as the cart render
+    image = subplot.imshow(
+        np.zeros((rows, cols), dtype=np.uint8), cmap=plot.cm.Greys, vmin=IMAGE_FREE, vmax=IMAGE_CLOSED,
+        origin="lower", extent=(-0.5, cols-0.5, -0.5, rows-0.5), interpolation="nearest", animated=True
+    )
+    artists = [image]
+    if showPoints:
+        artists.append(subplot.scatter(np.empty(0), np.empty(0), s=4, c="tab:red", lw=0, animated=True))
+
+    fig.animation=animation.FuncAnimation(fig, updateImage, init_func=lambda: artists, blit=True,
+    fargs=(pipeCap, artists, [None, None]), interval=50, cache_frame_data=False)
+
+    plot.show()
+
+
+def updateImage(num, pipeCap:renderPipeCap, artists:list, lastRendered:list)->list:
+    """
+        updates the occupancy image (and point overlay if there is one) made by imageRenderMachine with the newest values from the pipe.
+        lastRendered holds the last hitbox map and points drawn, anything that has not been replaced since is not redrawn
+    """
+    hitboxMap:lidarHitboxMap = pipeCap._getLatest(lidarHitboxMap)
+    if hitboxMap != None and hitboxMap is not lastRendered[0]:
+        lastRendered[0] = hitboxMap
+        pixels = hitboxMap.staticMask*np.uint8(IMAGE_STATIC)
+        pixels[hitboxMap.occupancy] = IMAGE_CLOSED
+        artists[0].set_data(pixels)
+        artists[0].set_extent((-0.5, pixels.shape[1]-0.5, -0.5, pixels.shape[0]-0.5))
+
+    if len(artists)>1:
+        points = pipeCap._getLatestPoints()
+        if points is not None and points is not lastRendered[1]:
+            lastRendered[1] = points
+            xy = points.getCartArray() if isinstance(points, lidarMap) else np.asarray(points).reshape(-1, 2)
+            #cells are centered on their index so a point is shifted back half a cell to land inside the cell it falls in
+            artists[1].set_offsets(xy/constants.mapNodeSizeMeters-0.5)
+
+    return artists
+
+
+def initMachine(type:int = 0, showPoints:bool=True, sharedFeed:bool=constants.renderSharedFeed)->tuple[Process, Connection]:
     """
         Creates a separate proses that handles all rendering and can be updated via a pipe(connection)
         returns a tuple with the first argument being the process, this can be use cancel the process but the primary use is to be saved so the renderer doesn't get collected
         the second argument is one end of a pipe that is used to update the render engine. this pipe should be passed new lidar maps periodically so they can be rendered. 
+        type 0 is a polar render of lidar maps, type 1 a scatter of the closed nodes of lidar hitbox maps and type 2 a image of the occupancy of lidar hitbox maps (with the points of lidar maps on top if showPoints is true).
+        If sharedFeed is true maps are passed through shared memory (see renderFeed) so sending never waits on the render and it only reads the newest map, otherwise they are pickled over the pipe.
         WARNING all code that deals with the pipe should be surrounded by a try except block as the pipe will start to throw errors whenever the user closes the render machine.
     """
     returnPipe, machinePipe = Pipe(duplex=True)
-    returnPipe=renderPipeCap(returnPipe)
-    machinePipe=renderPipeCap(machinePipe)
+    feed = renderFeed() if sharedFeed else None
+    returnPipe=renderPipeCap(returnPipe, feed)
+    machinePipe=renderPipeCap(machinePipe, feed)
     if type==0:
         process= Process(target=polarRenderMachine, args=(machinePipe,))
     elif type==1:
         process=Process(target=cartRenderMachine, args=(machinePipe,))
+    elif type==2:
+        process=Process(target=imageRenderMachine, args=(machinePipe, showPoints))
     else:
         raise ValueError("tried to create a render machine with type value ", type, ". This type does not exist")
     process.start()
@@ -1,13 +1,23 @@
 from multiprocessing.connection import Connection
+from time import perf_counter
+import numpy as np
 
 from lidarLib import lidarMap
+from lidarLib.constants import constants
+from lidarLib.renderLib.renderFeed import renderFeed
 
 class renderPipeCap:
-    """class that encapsulates pipe connections between a user and the render engine"""
-    def __init__(self, pipe:Connection):
-        """Creates a render pipe cap surrounding the pipe input"""
+    """
+        class that encapsulates pipe connections between a user and the render engine
+        If both ends share a renderFeed, scans, point arrays and hitbox maps are passed through its shared memory and only everything else goes over the pipe.
+    """
+    def __init__(self, pipe:Connection, feed:renderFeed=None):
+        """Creates a render pipe cap surrounding the pipe input, feed should be the same renderFeed for both ends or None to send everything over the pipe"""
         self.pipe=pipe
+        self.feed=feed
         self.mostRecentVal=None
+        self.mostRecentByType:dict[type, object]={}
+        self.lastSent=0
 
 
     def _get(self)->lidarMap:
@@ -22,24 +32,65 @@ class renderPipeCap:
                 
             if temp.__class__ !=ping:    
                 self.mostRecentVal = temp
+                #moved to the end so the dict stays ordered from oldest to newest
+                self.mostRecentByType.pop(temp.__class__, None)
+                self.mostRecentByType[temp.__class__] = temp
+
+        if self.feed!=None:
+            for valueType, value in self.feed.readNew():
+                self.mostRecentVal = value
+                self.mostRecentByType.pop(valueType, None)
+                self.mostRecentByType[valueType] = value
         #print("data updated", self.mostRecentVal.mapID)
         return self.mostRecentVal
 
-        
+    def _getLatest(self, valueType:type):
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            returns the most recent value of the given type sent over the pipe or None if none has been sent, used by render machines that draw more than one kind of value at once
+        """
+        self._get()
+        return self.mostRecentByType.get(valueType)
+
+    def _getLatestPoints(self):
+        """
+            INTERNAL FUNCTION, NOT FOR OUTSIDE USE
+            returns whichever of a lidarMap or a (n, 2) numpy array of points was sent over the pipe most recently, or None if neither has been sent.
+            Like the other getters this does not read the pipe, call _get or _getLatest first.
+        """
+        for value in reversed(list(self.mostRecentByType.values())):
+            if isinstance(value, (lidarMap.lidarMap, np.ndarray)):
+                return value
+        return None
+
     def send(self, sendable:lidarMap)->None:
-        """Sends the imputed lidar map to the other side of the pipe(aka the render machine)"""
-        
+        """
+            Sends the imputed lidar map to the other side of the pipe(aka the render machine)
+            If there is a feed anything it can hold is written into it instead, this never waits on the render machine and replaces anything it has not drawn yet.
+        """
+        if self.feed!=None and self.feed.write(sendable):
+            return
         self.pipe.send(sendable)
+        self.lastSent=perf_counter()
 
     def isConnected(self)->bool:
+        """
+            Returns wether or not the other side of the pipe is still open.
+            A ping is only sent if nothing else has been sent in the last constants.pipelineHeartbeatInterval seconds so calling this in a tight loop does not flood the pipe.
+        """
+        if perf_counter()-self.lastSent<constants.pipelineHeartbeatInterval:
+            return True
         try:
-            self.pipe.send(ping())
+            self.send(ping())
             return True
-        except EOFError:
+        except (EOFError, OSError):
             return False
     
     def close(self):
+        """Closes the pipe and the feed if there is one"""
         self.pipe.close()
+        if self.feed!=None:
+            self.feed.close()
 
 
 class ping:
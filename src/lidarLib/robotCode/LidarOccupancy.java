@@ -0,0 +1,84 @@
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+
+/**
+ * Robot side decoder for the occupancy grid topics published by the lidar library (see lidarWireFormat.py).
+ * Copy this file into a robot project, read the newest values of lidar/occupancyKeyframe and lidar/occupancyDelta with RawSubscribers and pass both to decode.
+ */
+public final class LidarOccupancy {
+    public static final int GRID_FORMAT_VERSION = 1;
+    public static final int HEADER_SIZE = 24;
+    public static final int KEYFRAME = 0;
+    public static final int DELTA = 1;
+
+    public final long generation;
+    public final int rows;
+    public final int cols;
+    /** Side length of a cell in meters. Cell [row][col] covers x from col*cellSize and y from row*cellSize. */
+    public final double cellSize;
+    /** Occupancy of every cell, indexed row*cols+col. */
+    public final boolean[] occupied;
+
+    private LidarOccupancy(long generation, int rows, int cols, double cellSize, boolean[] occupied) {
+        this.generation = generation;
+        this.rows = rows;
+        this.cols = cols;
+        this.cellSize = cellSize;
+        this.occupied = occupied;
+    }
+
+    public boolean isOccupied(int row, int col) {
+        return occupied[row * cols + col];
+    }
+
+    /** Returns wether or not the cell holding the given field coordinates is occupied, coordinates outside of the grid are not. */
+    public boolean isOccupiedAtMeters(double x, double y) {
+        int row = (int) Math.floor(y / cellSize);
+        int col = (int) Math.floor(x / cellSize);
+        return row >= 0 && row < rows && col >= 0 && col < cols && isOccupied(row, col);
+    }
+
+    /**
+     * Decodes a keyframe and applies the delta on top of it. delta may be null or empty.
+     * A delta made for a different keyframe is ignored and the keyframe is returned on its own.
+     */
+    public static LidarOccupancy decode(byte[] keyframe, byte[] delta) {
+        ByteBuffer buffer = header(keyframe, KEYFRAME);
+        long generation = Integer.toUnsignedLong(buffer.getInt(4));
+        int rows = Short.toUnsignedInt(buffer.getShort(12));
+        int cols = Short.toUnsignedInt(buffer.getShort(14));
+        double cellSize = buffer.getFloat(16);
+
+        boolean[] occupied = new boolean[rows * cols];
+        for (int i = 0; i < occupied.length; i++) {
+            occupied[i] = (keyframe[HEADER_SIZE + i / 8] >> (i % 8) & 1) != 0;
+        }
+
+        if (delta != null && delta.length > 0) {
+            ByteBuffer deltaBuffer = header(delta, DELTA);
+            if (Integer.toUnsignedLong(deltaBuffer.getInt(8)) == generation) {
+                int count = deltaBuffer.getInt(20);
+                for (int i = 0; i < count; i++) {
+                    int index = deltaBuffer.getInt(HEADER_SIZE + 4 * i);
+                    occupied[index] = !occupied[index];
+                }
+                generation = Integer.toUnsignedLong(deltaBuffer.getInt(4));
+            }
+        }
+        return new LidarOccupancy(generation, rows, cols, cellSize, occupied);
+    }
+
+    private static ByteBuffer header(byte[] data, int kind) {
+        ByteBuffer buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN);
+        if (data.length < HEADER_SIZE || buffer.get(0) != 'L' || buffer.get(1) != 'G') {
+            throw new IllegalArgumentException("data is not a packed occupancy grid");
+        }
+        if (buffer.get(2) != GRID_FORMAT_VERSION) {
+            throw new IllegalArgumentException("unsupported packed occupancy grid version " + buffer.get(2));
+        }
+        if (buffer.get(3) != kind) {
+            throw new IllegalArgumentException(kind == KEYFRAME ? "expected a occupancy keyframe" : "expected a occupancy delta");
+        }
+        return buffer;
+    }
+}
@@ -0,0 +1,69 @@
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+
+/**
+ * Robot side decoder for the point topics published by the lidar library (see lidarWireFormat.py).
+ * Copy this file into a robot project and read lidar/packedReadings with a RawSubscriber or lidar/readingsXY with a DoubleArraySubscriber.
+ */
+public final class LidarPoints {
+    public static final int POINTS_FORMAT_VERSION = 1;
+    public static final int HEADER_SIZE = 20;
+    public static final int ARRAY_HEADER_LENGTH = 3;
+    public static final double RESOLUTION_METERS = 0.01;
+
+    /** Id of the scan (or fused cloud) the points came from. */
+    public final long scanID;
+    /** Time the points were measured on the robot's clock (network tables server time in seconds), 0 if it was not known. */
+    public final double timestamp;
+    /** Field coordinates in meters, x0, y0, x1, y1... */
+    public final double[] xy;
+
+    private LidarPoints(long scanID, double timestamp, double[] xy) {
+        this.scanID = scanID;
+        this.timestamp = timestamp;
+        this.xy = xy;
+    }
+
+    public int size() {
+        return xy.length / 2;
+    }
+
+    public double getX(int index) {
+        return xy[2 * index];
+    }
+
+    public double getY(int index) {
+        return xy[2 * index + 1];
+    }
+
+    /** Decodes the value of lidar/packedReadings (int16 centimeters behind a 20 byte header). */
+    public static LidarPoints decode(byte[] data) {
+        ByteBuffer buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN);
+        if (data.length < HEADER_SIZE || buffer.get(0) != 'L' || buffer.get(1) != 'P') {
+            throw new IllegalArgumentException("data is not packed lidar points");
+        }
+        if (buffer.get(2) != POINTS_FORMAT_VERSION) {
+            throw new IllegalArgumentException("unsupported packed lidar points version " + buffer.get(2));
+        }
+        long scanID = Integer.toUnsignedLong(buffer.getInt(4));
+        int count = buffer.getInt(8);
+        double timestamp = buffer.getDouble(12);
+
+        double[] xy = new double[2 * count];
+        buffer.position(HEADER_SIZE);
+        for (int i = 0; i < xy.length; i++) {
+            xy[i] = buffer.getShort() * RESOLUTION_METERS;
+        }
+        return new LidarPoints(scanID, timestamp, xy);
+    }
+
+    /** Decodes the value of lidar/readingsXY (scan id, timestamp and count followed by x, y pairs). */
+    public static LidarPoints decodeArray(double[] values) {
+        if (values.length < ARRAY_HEADER_LENGTH || values.length != ARRAY_HEADER_LENGTH + 2 * (int) values[2]) {
+            throw new IllegalArgumentException("lidar point array has the wrong length");
+        }
+        double[] xy = new double[values.length - ARRAY_HEADER_LENGTH];
+        System.arraycopy(values, ARRAY_HEADER_LENGTH, xy, 0, xy.length);
+        return new LidarPoints((long) values[0], values[1], xy);
+    }
+}
@@ -11,6 +11,9 @@ class translation:
         self.rotation=rotation
         self.x, self.y = polarToCart(self.r, self.theta)
 
+    def __reduce__(self):
+        return (translation, (self.r, self.theta, self.rotation))
+
     def __str__(self):
         return "Translation with coordinates: x = " + str(self.x) + ", y = " + str(self.y) + ", rotation = " + str(self.rotation) + ", r = " + str(self.r) + ", theta = " + str(self.theta)
 
@@ -40,6 +43,12 @@ class translation:
         
         lidarPoint.distance, lidarPoint.angle = cartToPolar(lidarPoint.getX()-self.x, lidarPoint.getY()-self.y)
 
+    def applyToCart(self, x:float, y:float)->tuple[float, float]:
+        """Returns where the point x, y ends up when the translation is applied to it, the same way applyTranslation moves a lidarMeasurement"""
+        r, theta = cartToPolar(x, y)
+        rotatedX, rotatedY = polarToCart(r, (theta-self.rotation)%360)
+        return rotatedX-self.x, rotatedY-self.y
+
 
     def combineTranslation(self, addTranslation:"translation")->"translation":
         """Combines to translations. the composite translation will be returned"""
@@ -0,0 +1,22 @@
+'''Checks that a translated lidar map keeps every point through a pickle round trip'''
+import pickle
+import numpy as np
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarMeasurement import lidarMeasurement
+from lidarLib.translation import translation
+
+random = np.random.default_rng(0)
+map = lidarMap(None, mapID=3)
+pose = translation.fromCart(3, 2, 30)
+for angle, distance in zip(np.linspace(0, 360, 2000, endpoint=False), random.uniform(0.2, 6, 2000)):
+    map.addVal(lidarMeasurement.default(False, 15, float(angle), float(distance), isInMM=False), pose)
+map.sensorPose=pose
+
+copy = pickle.loads(pickle.dumps(map))
+print("len", map.len, copy.len)
+assert copy.len==map.len==2000
+assert len(copy.getArrays()[0])==2000
+assert len(copy.points)==2000
+assert len(copy.getArrays()[0])==2000
+assert np.allclose(copy.getCartArray(), map.getCartArray(), atol=0.01)
+print("translated map round trip ok")
@@ -0,0 +1,26 @@
+'''Checks the distance transform against a brute force search and the distance field lookups'''
+import numpy as np
+from lidarLib.lidarDistanceField import euclideanDistanceTransform, lidarDistanceField
+
+random = np.random.default_rng(2)
+for trial in range(20):
+    obstacles = random.random((random.integers(1, 30), random.integers(1, 30)))<random.uniform(0.01, 0.3)
+    distances = euclideanDistanceTransform(obstacles)
+    rows, cols = np.nonzero(obstacles)
+    if len(rows)==0:
+        assert np.allclose(distances, np.hypot(*obstacles.shape))
+        continue
+    gridRows, gridCols = np.indices(obstacles.shape)
+    expected = np.min(np.hypot(gridRows[..., None]-rows, gridCols[..., None]-cols), axis=2)
+    assert np.allclose(distances, expected), trial
+print("distance transform ok")
+
+#a single obstacle cell in the corner, lookups are in meters from cell centers
+obstacles = np.zeros((10, 10), dtype=bool)
+obstacles[0, 0] = True
+field = lidarDistanceField(obstacles, 0.5)
+assert abs(field.getDistance(0.25, 0.25))<1e-9
+assert abs(field.getDistance(0.25+3*0.5, 0.25)-1.5)<1e-9
+gradient = field.getGradients(np.array([[3.25, 3.25]]))[0]
+assert gradient[0]>0 and gradient[1]>0
+print("distance field ok")
@@ -0,0 +1,42 @@
+'''Checks that clusters are split at gaps and that rectangles are fitted to the one or two sides a lidar sees'''
+import math
+import pickle
+import numpy as np
+from lidarLib.lidarObstacleFitting import clusterScanPoints, fitObstacles
+
+def rectangleSides(centerX, centerY, length, width, degrees, spacing=0.02):
+    '''Points along the two sides of a rectangle facing the origin, in the order a lidar would measure them'''
+    corners = np.array([[-length/2, -width/2], [length/2, -width/2], [length/2, width/2]])
+    points = []
+    for start, end in zip(corners, corners[1:]):
+        steps = int(np.hypot(*(end-start))/spacing)
+        points.extend(start+(end-start)*t for t in np.linspace(0, 1, steps, endpoint=False))
+    angle = math.radians(degrees)
+    rotation = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+    return np.array(points)@rotation.T+(centerX, centerY)
+
+#two robots far apart and a lone noise point between them
+first = rectangleSides(2, 3, 0.9, 0.6, 20)
+second = rectangleSides(6, 1, 0.8, 0.8, 65)
+xy = np.concatenate((first, [[4, 8]], second))
+labels = clusterScanPoints(xy)
+assert len(set(labels[:len(first)]))==1 and len(set(labels[len(first)+1:]))==1
+assert labels[len(first)]==-1 and labels[0]!=labels[-1]
+print("clusters ok")
+
+obstacles = sorted(fitObstacles(xy, labels), key=lambda obstacle: obstacle.pose.X())
+assert len(obstacles)==2
+robot = obstacles[0]
+assert abs(robot.pose.X()-2)<0.03 and abs(robot.pose.Y()-3)<0.03, robot
+assert abs(robot.length-0.9)<0.03 and abs(robot.width-0.6)<0.03, robot
+#rectangles repeat every 180 degrees along the long side
+assert abs((robot.pose.rotation().degrees()-20+90)%180-90)<1, robot
+assert robot.confidence>0.9 and robot.pointCount==len(first)
+#a square has no long side so only the angle modulo 90 degrees is known
+square = obstacles[1]
+assert abs((square.pose.rotation().degrees()-65+45)%90-45)<1, square
+
+copy = pickle.loads(pickle.dumps(robot))
+assert copy.pose==robot.pose and copy.length==robot.length and copy.pointCount==robot.pointCount
+assert fitObstacles(np.zeros((0, 2)), np.zeros(0))==[]
+print("fitting ok")
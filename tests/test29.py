@@ -0,0 +1,40 @@
+'''Checks that obstacle tracks keep their ids between scans and that their velocity converges'''
+from wpimath.geometry import Pose2d, Rotation2d
+from lidarLib.lidarObstacleFitting import lidarObstacle
+from lidarLib.lidarObstacleTracker import lidarObstacleTracker
+
+def obstacle(x, y):
+    return lidarObstacle(Pose2d(x, y, Rotation2d()), 0.9, 0.6, 1, 30)
+
+tracker = lidarObstacleTracker()
+#one obstacle drives at (1, -0.5) m/s while a second stands still, scans come every 0.1 seconds
+for step in range(30):
+    time = step*0.1
+    tracks = tracker.update([obstacle(1+time, 4-0.5*time), obstacle(6, 2)], time)
+    if step<2:
+        assert tracks==[], "tracks are only returned once confirmed"
+
+assert len(tracks)==2
+moving, still = sorted(tracks, key=lambda track: track.pose.Y(), reverse=True)
+assert abs(moving.vx-1)<0.05 and abs(moving.vy+0.5)<0.05, moving
+assert abs(still.vx)<0.05 and abs(still.vy)<0.05, still
+assert moving.hits==still.hits==30
+ids = {moving.id, still.id}
+print("velocity ok")
+
+#a scan with only one obstacle keeps the other track alive for maxMisses scans
+for step in range(30, 30+tracker.maxMisses):
+    tracks = tracker.update([obstacle(6, 2)], step*0.1)
+    assert {track.id for track in tracks}==ids
+tracks = tracker.update([obstacle(6, 2)], 3.6)
+assert [track.id for track in tracks]==[still.id]
+
+#a late scan is treated as happening at the last update, tracks never move backwards
+tracker.update([obstacle(6, 2)], 1.0)
+assert tracker.lastTime==3.6
+
+#a obstacle far outside the gate starts a new track
+tracker.update([obstacle(6, 2), obstacle(0, 0)], 3.7)
+assert len(tracker.getTracks(confirmedOnly=False))==2 and len(tracker.getTracks())==1
+assert max(tracker.ids)==2
+print("tracks ok")
@@ -0,0 +1,33 @@
+'''Checks that planned paths reach the goal and keep clear of obstacles'''
+import numpy as np
+from wpimath.geometry import Pose2d, Rotation2d
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarPathPlanner import lidarPathPlanner
+
+map = lidarHitboxMap(seed=None, xHeight=6, yWidth=6, nodeSideLen=0.2)
+#a wall across the middle with a gap at the top
+wallCol = 15
+map.occupancy[:20, wallCol] = True
+
+planner = lidarPathPlanner(robotRadius=0.3)
+start = Pose2d(1, 1, Rotation2d())
+goal = Pose2d(5, 1, Rotation2d.fromDegrees(90))
+path = planner.plan(map, start, goal)
+assert len(path)>=3, "the path has to go around the wall"
+assert abs(path[-1].X()-5)<1e-6 and abs(path[-1].Y()-1)<1e-6 and abs(path[-1].rotation().degrees()-90)<1e-6
+
+#every point along the path keeps the robot radius from the wall
+field = map.getDistanceField()
+for first, second in zip(path, path[1:]):
+    for t in np.linspace(0, 1, 20):
+        x = first.X()+(second.X()-first.X())*t
+        y = first.Y()+(second.Y()-first.Y())*t
+        assert field.getDistance(x, y)>=0.3-0.2, (x, y)
+print("path ok", [(round(pose.X(), 2), round(pose.Y(), 2)) for pose in path])
+
+#the same request again reuses the path, a blocked goal gives no path
+assert [(pose.X(), pose.Y()) for pose in planner.plan(map, start, goal)]==[(pose.X(), pose.Y()) for pose in path]
+map = lidarHitboxMap(seed=None, xHeight=6, yWidth=6, nodeSideLen=0.2)
+map.occupancy[:, wallCol] = True
+assert planner.plan(map, start, goal)==[]
+print("blocked ok")
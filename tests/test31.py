@@ -0,0 +1,59 @@
+'''Checks that scans pass through the shared scan ring whole, and that a slot overwritten while it is copied is never returned'''
+import pickle
+from multiprocessing import Event, Process
+import numpy as np
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarSharedMemory import sharedScanBuffer
+from lidarLib.translation import translation
+
+def scan(value, count=500):
+    '''A map where every point has the same distance, so a map mixing two writes can be spotted'''
+    return lidarMap.fromArrays(np.linspace(0, 360, count, endpoint=False), np.full(count, value), np.full(count, 15), mapID=int(value), startTime=value, endTime=value+0.1)
+
+def writer(buffer, stopEvent):
+    value = 1
+    while not stopEvent.is_set():
+        buffer.writeMap(scan(value, 2000), translation.fromCart(value, 0, 0))
+        value = value%1000+1
+
+if __name__ == '__main__':
+    buffer = sharedScanBuffer(maxPoints=2000)
+    assert buffer.readLatest()==None
+
+    map = scan(3)
+    buffer.writeMap(map, translation.fromCart(1, 2, 30))
+    copy = sharedScanBuffer.slotToMap(buffer.readLatest())
+    assert copy.mapID==3 and copy.len==500 and copy.startTime==3 and abs(copy.endTime-3.1)<1e-9
+    assert np.allclose(copy.getArrays()[0], map.getArrays()[0], atol=1e-4) and np.all(copy.getArrays()[1]==3)
+    assert np.allclose((copy.sensorPose.x, copy.sensorPose.y, copy.sensorPose.rotation), (1, 2, 30))
+    print("round trip ok")
+
+    #the writer laps the ring between reading the slot and copying it
+    slot = buffer.readLatest()
+    for value in range(4, 4+buffer.slots):
+        buffer.writeMap(scan(value), translation.fromCart(value, 0, 0))
+    assert not slot.isValid() and sharedScanBuffer.slotToMap(slot)==None
+    print("overwritten slot ok")
+
+    #another process writes as fast as it can while this one reads, every map read must come from a single write
+    reader = pickle.loads(pickle.dumps(buffer))
+    stopEvent = Event()
+    process = Process(target=writer, args=(buffer, stopEvent), daemon=True)
+    process.start()
+    reads = torn = 0
+    while reads<2000:
+        slot = reader.readLatest()
+        if slot==None:
+            continue
+        map = sharedScanBuffer.slotToMap(slot)
+        if map==None:
+            torn += 1
+            continue
+        distances = map.getArrays()[1]
+        assert np.all(distances==distances[0]) and map.mapID==distances[0] and abs(map.sensorPose.x-distances[0])<1e-6, "map mixes two writes"
+        reads += 1
+    stopEvent.set()
+    process.join()
+    print("concurrent reads ok,", torn, "overwritten copies dropped")
+    reader.close()
+    buffer.close()
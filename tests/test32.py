@@ -0,0 +1,39 @@
+'''Checks that scans survive the binary scan format, with and without a sensor pose'''
+import pickle
+import numpy as np
+from lidarLib import lidarWireFormat
+from lidarLib.lidarMap import lidarMap
+from lidarLib.translation import translation
+
+random = np.random.default_rng(1)
+
+#scans keep the lidar's own resolution, 1/64 of a degree and 1 mm
+angles = random.uniform(0, 360, 1000)
+distances = random.uniform(0.1, 12, 1000)
+qualities = random.integers(0, 64, 1000)
+scan = lidarWireFormat.decodeScan(lidarWireFormat.encodeScan(angles, distances, qualities, 42, 1.5, 1.6, (1, 2, 30)))
+assert scan["mapID"]==42 and scan["startTime"]==1.5 and scan["endTime"]==1.6 and scan["pose"]==(1, 2, 30)
+assert np.all(np.abs((scan["angles"]-angles+180)%360-180)<=1/128+1e-9)
+assert np.all(np.abs(scan["distances"]-distances)<=0.0005+1e-9)
+assert np.array_equal(scan["qualities"], qualities)
+
+scan = lidarWireFormat.decodeScan(lidarWireFormat.encodeScan(angles, distances, qualities))
+assert scan["pose"]==None and scan["startTime"]==None and scan["endTime"]==None
+#a pose at the origin is still a pose
+scan = lidarWireFormat.decodeScan(lidarWireFormat.encodeScan(angles, distances, qualities, pose=(0, 0, 0)))
+assert scan["pose"]==(0, 0, 0)
+try:
+    lidarWireFormat.decodeScan(b"LP"+bytes(lidarWireFormat.SCAN_HEADER.size))
+    raise AssertionError("bad magic was accepted")
+except ValueError:
+    pass
+print("scan ok")
+
+#maps keep wether or not they have a sensor pose through pickling
+map = lidarMap.fromArrays(angles, distances, qualities, mapID=5)
+copy = pickle.loads(pickle.dumps(map))
+assert copy.sensorPose is None and copy.mapID==5 and copy.len==1000
+map.sensorPose = translation.fromCart(3, -1, 90)
+copy = pickle.loads(pickle.dumps(map))
+assert np.allclose((copy.sensorPose.x, copy.sensorPose.y, copy.sensorPose.rotation), (3, -1, 90), atol=1e-5)
+print("map pose ok")
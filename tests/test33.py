@@ -0,0 +1,39 @@
+'''Checks that a finished scan wakes the lidar side straight away and reaches a client waiting on the pipeline'''
+from multiprocessing import Pipe
+from time import perf_counter
+import numpy as np
+from lidarLib.Lidar import Lidar
+from lidarLib.LidarConfigs import lidarConfigs
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarPipeline import lidarPipeline
+from lidarLib.lidarSharedMemory import sharedScanBuffer
+from lidarLib.translation import translation
+
+#a lidar that is never connected still keeps track of its maps
+lidar = Lidar(lidarConfigs(port="/dev/null", autoConnect=False))
+assert not lidar.waitForNextMap(0.01)
+lidar._mapIsDone()
+assert lidar.waitForNextMap(0) and not lidar.waitForNextMap(0.01)
+print("new map event ok")
+
+buffer = sharedScanBuffer(maxPoints=1000)
+clientPipe, lidarPipe = Pipe(duplex=True)
+client = lidarPipeline(clientPipe, scanBuffer=buffer)
+lidarSide = lidarPipeline(lidarPipe, scanBuffer=buffer)
+assert client.waitForNextScan(0.05)==None and client.getScanCount()==0
+
+for mapID in range(1, 4):
+    map = lidarMap.fromArrays(np.linspace(0, 360, 500, endpoint=False), np.full(500, mapID), np.full(500, 15), mapID=mapID, startTime=mapID, endTime=mapID+0.1)
+    start = perf_counter()
+    lidarSide._writeScan(map, translation.fromCart(1, 2, 0))
+    received = client.waitForNextScan(1)
+    assert perf_counter()-start<0.05, "the scan waited for a tick instead of being pushed"
+    assert received.mapID==mapID and np.all(received.getArrays()[1]==mapID)
+    assert client.getLastMap() is received, "the same scan is not rebuilt twice"
+assert client.getScanCount()==3
+#a scan is only returned once
+assert client.waitForNextScan(0.05)==None
+print("scan push ok")
+
+lidarSide.close()
+client.close()
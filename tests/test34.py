@@ -0,0 +1,77 @@
+'''Checks command futures, batches and error handling of the pipeline rpc layer against a lidar that is never connected'''
+from multiprocessing import Pipe
+import time
+from lidarLib.Lidar import Lidar
+from lidarLib.LidarConfigs import lidarConfigs
+from lidarLib.lidarManager import runActions
+from lidarLib.lidarPipeline import commandType, dataPacketType, lidarPipeline
+from lidarLib.translation import translation
+
+def runWhenReceived(lidarSide, lidar, expected, timeout=1):
+    '''Runs the lidar side's commands once expected of them have arrived'''
+    deadline = time.perf_counter()+timeout
+    while len(lidarSide._peakActionQue())<expected:
+        assert time.perf_counter()<deadline, "commands never arrived"
+        time.sleep(0.001)
+    return runActions(lidarSide, lidar)
+
+lidar = Lidar(lidarConfigs(port="/dev/null", autoConnect=False))
+clientPipe, lidarPipe = Pipe(duplex=True)
+client = lidarPipeline(clientPipe)
+lidarSide = lidarPipeline(lidarPipe)
+
+future = client.setDeadband([10, 20])
+assert not future.done()
+assert runWhenReceived(lidarSide, lidar, 1)==1
+assert future.result(1)==None and lidar.config.deadband==[10, 20]
+
+#errors raised by the lidar are raised again by the future, and results are not cached as data
+future = client.requestHealth()
+runWhenReceived(lidarSide, lidar, 1)
+assert isinstance(future.exception(1), ValueError) and client.getHealth()==None
+print("call ok")
+
+#a batch is only sent once it exits and its commands run in order
+with client.batch():
+    first = client.setCurrentLocalTranslation(translation.fromCart(1, 0, 0))
+    second = client.setCurrentGlobalTranslation(translation.fromCart(0, 2, 90))
+    time.sleep(0.05)
+    assert len(lidarSide._peakActionQue())==0, "the batch was sent before it exited"
+assert runWhenReceived(lidarSide, lidar, 2)==2
+assert first.result(1)==None and second.result(1)==None
+combined = lidar.getCombinedTrans()
+assert abs(combined.x-1)<1e-9 and abs(combined.y-2)<1e-9 and combined.rotation==90
+print("batch ok")
+
+#a result that can not be pickled fails the future instead of the io thread
+lidar.lidarInfo = lambda: None
+future = client.call(commandType.getInfo, returnType=dataPacketType.lidarInfo)
+runWhenReceived(lidarSide, lidar, 1)
+assert isinstance(future.exception(1), RuntimeError)
+
+#a response that fails to send is reported but the command is never run again
+runs = []
+setDeadband = commandType.functions[commandType.setDeadband]
+commandType.functions[commandType.setDeadband] = lambda lidar, deadband: (runs.append(deadband), setDeadband(lidar, deadband))[1]
+def failSend(action, result=None, error=None):
+    raise OSError("the pipe broke")
+lidarSide._sendResponse = failSend
+future = client.setDeadband([30, 40])
+runWhenReceived(lidarSide, lidar, 1)
+time.sleep(0.1)
+assert runActions(lidarSide, lidar)==0 and runs==[[30, 40]] and not future.done()
+commandType.functions[commandType.setDeadband] = setDeadband
+del lidarSide._sendResponse
+print("response failures ok")
+
+#poses are sent without asking for a response
+client.sendPoses([[1.0], [2.0], [3.0], [45.0]])
+runWhenReceived(lidarSide, lidar, 1)
+assert abs(lidar.globalTranslation.x-2)<1e-9 and abs(lidar.globalTranslation.rotation-45)<1e-9
+print("poses ok")
+
+#waiting on a command stops once the pipe closes instead of hanging
+future = client.setDeadband([0, 1])
+lidarSide.close()
+assert not client._waitForResponse(future, 1) and not future.done()
+client.close()
@@ -0,0 +1,59 @@
+'''Checks pipeline heartbeats, how a stalled or closed other side is seen and when the manager reports its client as lost'''
+from multiprocessing import Pipe
+from time import perf_counter, sleep
+from lidarLib.constants import constants
+from lidarLib.lidarManager import isClientLost
+from lidarLib.lidarPipeline import lidarPipeline, ping
+
+def waitFor(condition, timeout=2):
+    deadline = perf_counter()+timeout
+    while not condition():
+        assert perf_counter()<deadline, "timed out"
+        sleep(0.01)
+
+#the other end is a bare connection so the test decides when it is heard from
+lidarPipe, clientPipe = Pipe(duplex=True)
+lidarSide = lidarPipeline(lidarPipe)
+start = perf_counter()
+assert lidarSide.isConnected() and lidarSide.getHeartbeatAge()==None
+assert not isClientLost(lidarSide, start), "a client that is still starting up is not lost"
+assert isClientLost(lidarSide, start-constants.pipelineStartupGrace-1), "a client that never starts is lost after the grace period"
+
+#a idle pipeline sends heartbeats on its own
+pingTimes = []
+while len(pingTimes)<4:
+    assert isinstance(clientPipe.recv(), ping)
+    pingTimes.append(perf_counter())
+assert max(b-a for a, b in zip(pingTimes, pingTimes[1:]))<constants.pipelineHeartbeatInterval*3
+print("heartbeats sent ok")
+
+clientPipe.send(ping())
+waitFor(lambda: lidarSide.getHeartbeatAge()!=None)
+assert lidarSide.isConnected() and not isClientLost(lidarSide, start)
+
+#a stalled client is not connected but its pipe is still open
+sleep(constants.pipelineHeartbeatTimeout+0.2)
+assert not lidarSide.isConnected() and lidarSide.isPipeOpen() and isClientLost(lidarSide, start)
+clientPipe.send(ping())
+waitFor(lidarSide.isConnected)
+assert not isClientLost(lidarSide, start)
+print("stall ok")
+
+clientPipe.close()
+waitFor(lambda: not lidarSide.isPipeOpen())
+assert not lidarSide.isConnected()
+lidarSide.close()
+print("close ok")
+
+#two pipelines that never send anything keep each other alive with heartbeats
+first, second = Pipe(duplex=True)
+first, second = lidarPipeline(first), lidarPipeline(second)
+#using a pipeline starts its io threads
+first.isConnected()
+second.isConnected()
+sleep(constants.pipelineHeartbeatTimeout*1.5)
+assert first.isConnected() and second.isConnected()
+assert first.getHeartbeatAge()<constants.pipelineHeartbeatInterval*3 and second.getHeartbeatAge()<constants.pipelineHeartbeatInterval*3
+first.close()
+second.close()
+print("idle pair ok")
@@ -0,0 +1,52 @@
+'''Checks that data sent to a stalled reader is conflated to the newest value of each type while commands are never dropped'''
+from multiprocessing import Pipe
+from time import perf_counter, sleep
+from lidarLib.lidarPipeline import commandPacket, commandType, dataPacket, dataPacketType, lidarPipeline, ping, stagePacket
+
+lidarPipe, clientPipe = Pipe(duplex=True)
+lidarSide = lidarPipeline(lidarPipe)
+
+#large packets fill the pipe so the writer thread blocks until the other side reads
+start = perf_counter()
+for index in range(200):
+    lidarSide._sendData(dataPacket(dataPacketType.quitWarning, (index, bytes(1<<20))))
+    lidarSide._sendData(dataPacket(dataPacketType.scanNotify, index))
+    lidarSide._sendStageResult("obstacles", index, [index])
+lidarSide._sendAction(commandPacket(commandType.stop, []))
+lidarSide._sendAction(commandPacket(commandType.reset, []))
+assert perf_counter()-start<1, "sending blocked on a stalled reader"
+
+stats = lidarSide.getChannelStats()
+assert stats["overwrites"][dataPacketType.quitWarning]>=190 and stats["overwrites"][dataPacketType.scanNotify]>=190, stats
+assert stats["stageOverwrites"]["obstacles"]>=190 and stats["queueDepth"]<=8, stats
+print("conflation ok", stats["queueDepth"], "queued")
+
+#once the reader catches up it gets every command and the newest value of each channel
+received = []
+deadline = perf_counter()+5
+while lidarSide.getChannelStats()["queueDepth"]>0 or clientPipe.poll(0):
+    assert perf_counter()<deadline, "the outbox never emptied"
+    if clientPipe.poll(0.05):
+        received.append(clientPipe.recv())
+received = [value for value in received if not isinstance(value, ping)]
+commands = [value.command for value in received if isinstance(value, commandPacket)]
+assert commands==[commandType.stop, commandType.reset]
+notifies = [value.data for value in received if isinstance(value, dataPacket) and value.type==dataPacketType.scanNotify]
+warnings = [value.data[0] for value in received if isinstance(value, dataPacket) and value.type==dataPacketType.quitWarning]
+stages = [value.mapID for value in received if isinstance(value, stagePacket)]
+assert notifies[-1]==warnings[-1]==stages[-1]==199 and len(notifies)<10
+assert notifies==sorted(notifies) and stages==sorted(stages)
+print("catch up ok")
+
+#on the receiving side only the newest value is kept
+client = lidarPipeline(clientPipe)
+for index in range(5):
+    lidarSide._sendData(dataPacket(dataPacketType.scanNotify, index))
+    sleep(0.01)
+deadline = perf_counter()+1
+while client.getDataPacket(dataPacketType.scanNotify)!=4:
+    assert perf_counter()<deadline
+    sleep(0.01)
+lidarSide.close()
+client.close()
+print("latest value ok")
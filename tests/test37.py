@@ -0,0 +1,74 @@
+'''Checks the built in processing stages on a scan with a known sensor pose, and that a failing stage does not stop the others'''
+from multiprocessing import Pipe
+import time
+import numpy as np
+from lidarLib.lidarManager import runStages
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarMeasurement import lidarMeasurement
+from lidarLib.lidarPipeline import lidarPipeline
+from lidarLib.lidarProcessingStages import getSensorRelativeArray, lidarProcessingStage, obstacleStage, occupancyGridStage, rangeFilterStage, sectorMinimaStage
+from lidarLib.translation import translation
+
+def scanAt(pose, distances, qualities=None):
+    '''A map of points at the given distances spread evenly around a sensor, moved into field coordinates by pose like the lidar does'''
+    map = lidarMap(None)
+    qualities = qualities if qualities is not None else np.full(len(distances), 15)
+    for angle, distance, quality in zip(np.linspace(0, 360, len(distances), endpoint=False), distances, qualities):
+        map.addVal(lidarMeasurement.default(False, int(quality), float(angle), float(distance), isInMM=False), pose)
+    map.sensorPose = pose
+    return map
+
+for pose in (translation.fromCart(3, 2, 0), translation.fromCart(3, 2, 30), translation.fromCart(-4, 1, 200)):
+    #every point is 1 m from the sensor wherever the pose puts it
+    offsets = getSensorRelativeArray(scanAt(pose, np.ones(360)))
+    assert np.allclose(np.hypot(offsets[:, 0], offsets[:, 1]), 1), pose
+
+    #points that land on the same field angle replace each other so the count is taken from the map
+    map = scanAt(pose, np.ones(360))
+    count = map.len
+    assert count>300 and rangeFilterStage(0, 1.5).process(map, {})==0 and map.len==count
+    assert rangeFilterStage(0, 0.5).process(map, {})==count and map.len==0
+
+    minima = sectorMinimaStage(36).process(scanAt(pose, np.ones(360)), {})
+    assert np.allclose(minima, 1), minima
+
+#the closest point in a sector is found in field directions around the sensor
+pose = translation.fromCart(3, 2, 90)
+distances = np.full(360, 2.0)
+distances[180] = 0.5
+minima = sectorMinimaStage(4).process(scanAt(pose, distances), {})
+field = getSensorRelativeArray(scanAt(pose, distances))[180]
+assert abs(minima[int(np.degrees(np.arctan2(field[1], field[0]))%360//90)]-0.5)<1e-9 and np.sum(np.isclose(minima, 2))==3
+print("sensor relative stages ok")
+
+#quality and distance limits are both applied
+map = lidarMap.fromArrays(np.linspace(0, 360, 100, endpoint=False), np.linspace(0.1, 5, 100), np.tile([1, 15], 50), sensorPose=translation.default())
+rangeFilterStage(1, 4, 10).process(map, {})
+_, distances, qualities = map.getArrays()
+assert map.len==len([d for d, q in zip(np.linspace(0.1, 5, 100), np.tile([1, 15], 50)) if 1<=d<=4 and q>=10]) and distances.min()>=1 and distances.max()<=4 and np.all(qualities==15)
+
+#a grid stage marks the cells the points land in
+map = lidarMap.fromArrays(np.array([0, 90]), np.array([1.05, 2.05]), np.array([15, 15]))
+occupancy = occupancyGridStage(seed=None, xHeight=3, yWidth=3, cellSize=0.3).process(map, {})
+assert occupancy.sum()==2 and occupancy[0, 3] and occupancy[6, 0]
+print("filters ok")
+
+class failingStage(lidarProcessingStage):
+    def process(self, map, results):
+        raise RuntimeError("broken stage")
+
+#stage results go out on their own channels, a stage that throws is skipped for that scan only
+lidarPipe, clientPipe = Pipe(duplex=True)
+lidarSide, client = lidarPipeline(lidarPipe), lidarPipeline(clientPipe)
+map = scanAt(translation.fromCart(-4, -3, 0), np.ones(360))
+results = runStages(lidarSide, [rangeFilterStage(0, 0.5), failingStage("broken"), sectorMinimaStage(8), obstacleStage()], map)
+assert results["broken"]==None and results["rangeFilter"]>300 and map.len==0 and np.all(np.isinf(results["sectorMinima"]))
+deadline = time.perf_counter()+1
+while client.getStageResult("obstacles") is None:
+    assert time.perf_counter()<deadline
+    time.sleep(0.01)
+assert client.getStageResult("rangeFilter")==results["rangeFilter"] and client.getStageResultMapID("sectorMinima")==map.mapID
+assert client.getStageResult("broken")==None and client.getStageResult("obstacles")==[]
+lidarSide.close()
+client.close()
+print("stage chain ok")
@@ -0,0 +1,57 @@
+'''Checks that the fusion process merges the newest scan of every lidar and pairs each cloud with its own grid'''
+from types import SimpleNamespace
+import numpy as np
+from lidarLib.lidarFusion import clusterFusedCloud, lidarFusion
+from lidarLib.lidarMap import lidarMap
+from lidarLib.lidarSharedMemory import sharedScanBuffer
+
+def scanOf(xy, mapID):
+    '''A finished map holding the given field points'''
+    xy = np.asarray(xy, dtype=np.float64)
+    return lidarMap.fromArrays(np.degrees(np.arctan2(xy[:, 1], xy[:, 0]))%360, np.hypot(xy[:, 0], xy[:, 1]), np.full(len(xy), 15), mapID=mapID, endTime=mapID)
+
+if __name__ == '__main__':
+    #fusion only needs the scan buffer of each piped lidar
+    lidars = [SimpleNamespace(scanBuffer=sharedScanBuffer(maxPoints=100)) for _ in range(2)]
+    seed = np.zeros((10, 10), dtype=bool)
+    seed[0, 0] = True
+    fusion = lidarFusion(lidars, seed=seed.tolist(), xHeight=3, yWidth=3, cellSize=0.3)
+    assert fusion.getFusionID()==0 and fusion.getGrid()==None and len(fusion.getCloud()[0])==0
+
+    lidars[0].scanBuffer.writeMap(scanOf([[1.05, 1.05], [1.1, 1.1], [0.1, 0.1]], 1), None)
+    fusionID = fusion.waitForNext(0, 2)
+    assert fusionID>0
+    xy, source, meta = fusion.getCloud()
+    assert len(xy)==3 and np.all(source==0) and meta["sources"]==2
+
+    lidars[1].scanBuffer.writeMap(scanOf([[2.5, 0.5]], 1), None)
+    fusionID = fusion.waitForNext(fusionID, 2)
+    xy, source, meta = fusion.getCloud()
+    assert int(meta["fusionID"])==fusionID and len(xy)==4 and list(source)==[0, 0, 0, 1]
+    assert np.allclose(xy[3], [2.5, 0.5], atol=1e-5)
+
+    grid = fusion.getGrid(fusionID)
+    assert grid.shape==(10, 10) and grid.sum()==2 and grid[3, 3] and grid[1, 8]
+    assert not grid[0, 0], "cells on the seed are never marked"
+    assert fusion.getGrid(fusionID+1)==None and fusion.getGrid(fusionID-1)==None
+    print("fusion ok")
+
+    #a new scan from one lidar replaces only that lidar's points
+    lidars[0].scanBuffer.writeMap(scanOf([[0.5, 2.5]], 2), None)
+    fusionID = fusion.waitForNext(fusionID, 2)
+    xy, source, meta = fusion.getCloud()
+    assert len(xy)==2 and list(source)==[0, 1] and meta["newestEndTime"]==2
+    assert fusion.getGrid(fusionID).sum()==2
+    assert fusion.waitForNext(fusionID, 0.05)==fusionID
+    print("replace ok")
+
+    #clusters never join points from two lidars even when they touch
+    xy = np.array([[0, 0], [0.05, 0], [0.1, 0], [0.15, 0], [0.2, 0], [0.25, 0]])
+    labels = clusterFusedCloud(xy, np.array([0, 0, 0, 1, 1, 1]))
+    assert labels[0]==labels[2] and labels[3]==labels[5] and labels[0]!=labels[3]
+    print("clusters ok")
+
+    fusion.stop()
+    assert not fusion.process.is_alive()
+    for lidar in lidars:
+        lidar.scanBuffer.close()
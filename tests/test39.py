@@ -0,0 +1,46 @@
+'''Checks that scheduling settings are applied and reported, and that settings that can not be applied are reported instead of raised'''
+from multiprocessing import Process, Queue
+import os
+from lidarLib.lidarScheduling import applyProcessScheduling, applyRealtimeScheduling, getSchedulingReport
+
+def run(queue, function, *args):
+    '''Applies the settings in a separate process so this one keeps its own scheduling'''
+    try:
+        queue.put(function(*args))
+    except Exception as e:
+        queue.put(e)
+
+def inProcess(function, *args):
+    queue = Queue()
+    process = Process(target=run, args=(queue, function)+args)
+    process.start()
+    result = queue.get(timeout=10)
+    process.join()
+    assert not isinstance(result, Exception), result
+    return result
+
+if __name__ == '__main__':
+    current = getSchedulingReport()
+    assert current["errors"]==[] and current["niceness"]==os.getpriority(os.PRIO_PROCESS, 0)
+
+    report = inProcess(applyProcessScheduling)
+    assert report["errors"]==[] and report["cpuAffinity"]==current["cpuAffinity"] and report["niceness"]==current["niceness"]
+
+    cpu = current["cpuAffinity"][0]
+    report = inProcess(applyProcessScheduling, [cpu], current["niceness"]+1)
+    assert report["errors"]==[] and report["cpuAffinity"]==[cpu] and report["niceness"]==current["niceness"]+1, report
+    print("process scheduling ok")
+
+    report = inProcess(applyProcessScheduling, [100000], None)
+    assert len(report["errors"])==1 and report["cpuAffinity"]==current["cpuAffinity"], report
+
+    report = inProcess(applyRealtimeScheduling, "sometimes", 10)
+    assert len(report["errors"])==1 and report["realtimePolicy"]==None, report
+
+    #real time scheduling needs permissions this process may not have, either way the report has to say what happened
+    report = inProcess(applyRealtimeScheduling, "fifo", 10)
+    assert (report["realtimePolicy"]=="fifo" and report["realtimePriority"]==10 and report["errors"]==[]) or (report["realtimePolicy"]==None and len(report["errors"])==1), report
+    report = inProcess(applyRealtimeScheduling, "rr", 1000)
+    assert report["realtimePolicy"]==None and len(report["errors"])==1, report
+    print("errors reported ok")
+    assert getSchedulingReport()==current
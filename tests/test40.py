@@ -0,0 +1,74 @@
+'''Checks that the supervisor restarts a crashing manager with exponential backoff, and records the recovery once a new manager sends a scan'''
+from multiprocessing import Pipe
+from time import perf_counter, sleep
+from lidarLib.LidarConfigs import lidarConfigs
+from lidarLib.lidarPipeline import commandType, lidarPipeline
+from lidarLib.lidarSupervisor import lidarSupervisor
+
+if __name__ == '__main__':
+    #there is no lidar on this port so every manager crashes as soon as it starts
+    supervisor = lidarSupervisor(lidarConfigs(port="/dev/lidarThatIsNotThere", name="missing"), minBackoff=0.2, maxBackoff=0.8, checkInterval=0.01, startupGrace=30)
+    supervisor.pipeline.setDeadband([10, 20])
+
+    #the restart count goes up before the new manager is attached so the reconnects themselves are watched
+    restartTimes = []
+    managers = []
+    reconnect = supervisor.pipeline._reconnect
+    def watchedReconnect(pipe, host=None):
+        reconnect(pipe, host)
+        restartTimes.append(perf_counter())
+        managers.append(host)
+        #this runs on the supervisor thread between restarts, so the restart after this one is the last
+        if len(managers)==8:
+            supervisor.minBackoff = supervisor.maxBackoff = 100
+    supervisor.pipeline._reconnect = watchedReconnect
+
+    start = perf_counter()
+    while len(managers)<9 or managers[-1].is_alive():
+        assert perf_counter()-start<30, restartTimes
+        sleep(0.01)
+    restarts = supervisor.getRestartCount()
+    del supervisor.pipeline._reconnect
+    assert restarts==9 and supervisor.lastFailure.startswith("manager process exited"), supervisor.lastFailure
+    assert supervisor.isRecovering() and supervisor.getRecoveryTimes()==[]
+
+    #each restart waits at least twice as long as the last until maxBackoff, how long a manager takes to crash is added on top
+    #the times are compared from the first restart so one restart being slow to attach can not make the gap after it look too short
+    gaps = [second-first for first, second in zip(restartTimes, restartTimes[1:])]
+    expected = [min(0.8, 0.2*2**index) for index in range(len(gaps))]
+    assert all(restartTimes[index+1]-restartTimes[0]>=sum(expected[:index+1])-0.2 for index in range(len(gaps))), (gaps, expected)
+    #without the cap the last wait would be 25.6 seconds
+    assert gaps[-1]<3, gaps
+    print("backoff ok", [round(gap, 2) for gap in gaps])
+
+    #the test takes the place of a working manager, the same pipeline moves onto it and gets its newest settings sent again
+    lidarEnd, clientEnd = Pipe(duplex=True)
+    lidarSide = lidarPipeline(lidarEnd)
+    #a reconnect right after another one leaves the first one's settings unsent, they should not be sent twice
+    unusedEnd, unusedClientEnd = Pipe(duplex=True)
+    supervisor.pipeline._reconnect(unusedClientEnd)
+    supervisor.pipeline._reconnect(clientEnd)
+    deadline = perf_counter()+2
+    while len(lidarSide._peakActionQue())==0:
+        assert perf_counter()<deadline, "settings were not sent again"
+        sleep(0.01)
+    actions = lidarSide._getActionQue()
+    assert [(action.command, action.args) for action in actions]==[(commandType.setDeadband, [[10, 20]])]
+
+    lidarSide._sendScanNotify(1)
+    deadline = perf_counter()+2
+    while supervisor.isRecovering():
+        assert perf_counter()<deadline, "the recovery was never seen"
+        sleep(0.01)
+    status = supervisor.getStatus()
+    assert status["recoveryTimes"]==[status["lastRecoveryTime"]] and status["lastRecoveryTime"]>sum(expected) and status["downtime"]==None
+    print("recovery ok")
+
+    supervisor.stop()
+    deadline = perf_counter()+2
+    while lidarSide.shouldLive:
+        assert perf_counter()<deadline, "the quit request never arrived"
+        sleep(0.01)
+    assert supervisor.getRestartCount()==restarts
+    lidarSide.close()
+    print("stop ok")
@@ -0,0 +1,45 @@
+'''Checks that point clouds survive the packed point and point array encoders and decoders of lidarWireFormat'''
+import numpy as np
+from lidarLib import lidarWireFormat
+
+random = np.random.default_rng(1)
+
+#packed points are rounded to the centimeter
+xy = random.uniform(-20, 20, (500, 2))
+points = lidarWireFormat.decodePoints(lidarWireFormat.encodePoints(xy, 7, 3.25))
+assert points["scanID"]==7 and points["timestamp"]==3.25
+assert np.all(np.abs(points["points"]-xy)<=lidarWireFormat.POINT_RESOLUTION_METERS/2+1e-9)
+
+#anything out of range of a int16 is clipped instead of wrapping around
+points = lidarWireFormat.decodePoints(lidarWireFormat.encodePoints([[400, -400], [1, 2]]))
+assert points["timestamp"]==None and np.allclose(points["points"], [[327.67, -327.68], [1, 2]])
+points = lidarWireFormat.decodePoints(lidarWireFormat.encodePoints(np.empty((0, 2))))
+assert points["points"].shape==(0, 2)
+
+try:
+    lidarWireFormat.decodePoints(b"XX"+bytes(30))
+    raise AssertionError("bad magic was accepted")
+except ValueError:
+    pass
+try:
+    lidarWireFormat.decodePoints(lidarWireFormat.POINTS_HEADER.pack(lidarWireFormat.POINTS_MAGIC, lidarWireFormat.POINTS_FORMAT_VERSION+1, 0, 0, 0))
+    raise AssertionError("a newer format version was accepted")
+except ValueError:
+    pass
+print("packed points ok")
+
+#the array layout is exact
+values = lidarWireFormat.encodePointsArray(xy, 8)
+assert len(values)==lidarWireFormat.POINTS_ARRAY_HEADER_LENGTH+2*len(xy)
+points = lidarWireFormat.decodePointsArray(values.tolist())
+assert points["scanID"]==8 and points["timestamp"]==None and np.array_equal(points["points"], xy)
+points = lidarWireFormat.decodePointsArray(lidarWireFormat.encodePointsArray(xy[:3], 9, 1.5))
+assert points["timestamp"]==1.5 and np.array_equal(points["points"], xy[:3])
+
+for values in ([], values[:-1].tolist()):
+    try:
+        lidarWireFormat.decodePointsArray(values)
+        raise AssertionError("a array of the wrong length was accepted")
+    except ValueError:
+        pass
+print("point arrays ok")
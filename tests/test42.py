@@ -0,0 +1,35 @@
+'''Checks that occupancy grids survive the keyframe and delta encoders of lidarWireFormat'''
+import numpy as np
+from lidarLib import lidarWireFormat
+
+random = np.random.default_rng(1)
+
+#a delta always holds every change since its keyframe
+keyframe = random.random((27, 59))<0.1
+later = keyframe.copy()
+later[random.integers(0, 27, 40), random.integers(0, 59, 40)] ^= True
+keyframeData = lidarWireFormat.encodeGridKeyframe(keyframe, 0.3, 5)
+grid = lidarWireFormat.decodeGrid(keyframeData)
+assert grid["generation"]==5 and np.array_equal(grid["occupancy"], keyframe)
+grid = lidarWireFormat.decodeGrid(keyframeData, lidarWireFormat.encodeGridDelta(keyframe, later, 0.3, 9, 5))
+assert grid["generation"]==9 and abs(grid["cellSize"]-0.3)<1e-6 and np.array_equal(grid["occupancy"], later)
+
+#a delta with no changes is smaller than a keyframe and still moves the generation on
+unchanged = lidarWireFormat.encodeGridDelta(keyframe, keyframe, 0.3, 10, 5)
+assert len(unchanged)<len(keyframeData)
+grid = lidarWireFormat.decodeGrid(keyframeData, unchanged)
+assert grid["generation"]==10 and np.array_equal(grid["occupancy"], keyframe)
+
+#a delta made against a different keyframe is ignored
+grid = lidarWireFormat.decodeGrid(keyframeData, lidarWireFormat.encodeGridDelta(keyframe, later, 0.3, 9, 4))
+assert grid["generation"]==5 and np.array_equal(grid["occupancy"], keyframe)
+print("grid ok")
+
+#keyframes and deltas can not be swapped
+for keyframeData, deltaData in ((lidarWireFormat.encodeGridDelta(keyframe, later, 0.3, 9, 5), None), (keyframeData, keyframeData), (b"XX"+bytes(30), None)):
+    try:
+        lidarWireFormat.decodeGrid(keyframeData, deltaData)
+        raise AssertionError("a bad grid was accepted")
+    except ValueError:
+        pass
+print("bad grids ok")
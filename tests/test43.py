@@ -0,0 +1,78 @@
+'''Checks that lidarPublishThread holds each channel to its rate, keeps only the newest value and skips values that did not change'''
+import threading
+from time import perf_counter, sleep
+import numpy as np
+from lidarLib.lidarPublishThread import contentHash, lidarPublishThread
+
+published = {}
+lock = threading.Lock()
+def record(channel, value):
+    with lock:
+        published.setdefault(channel, []).append((perf_counter(), value))
+
+publisher = lidarPublishThread({"slow" : 10, "fast" : 50}, defaultRate=20)
+
+#the first value goes out straight away
+start = perf_counter()
+publisher.submit("slow", record, "slow", -1, key=-1)
+while "slow" not in published:
+    assert perf_counter()-start<0.5, "the first value was held back"
+    sleep(0.001)
+
+#every channel is held to its own rate and only the newest value waiting is published
+start = perf_counter()
+submitted = 0
+while perf_counter()-start<1:
+    for channel in ("slow", "fast", "other"):
+        publisher.submit(channel, record, channel, submitted, key=submitted)
+    submitted += 1
+    sleep(0.001)
+sleep(0.2)
+stats = publisher.getStats()
+for channel, rate in (("slow", 10), ("fast", 50), ("other", 20)):
+    times = [time for time, _ in published[channel] if time>=start]
+    assert 0.7*rate<=len(times)<=1.2*rate+1, (channel, len(times))
+    assert min(np.diff(times))>=1/rate-0.002, (channel, min(np.diff(times)))
+    assert stats[channel]["coalesced"]>=submitted-1.3*rate-2 and stats[channel]["errors"]==0, (channel, stats[channel])
+    #nothing is published twice and the last value submitted is the last one published
+    values = [value for _, value in published[channel]]
+    assert values==sorted(set(values)) and values[-1]==submitted-1, channel
+print("rates ok")
+
+#values with the same key as the last one published are skipped, without a key the content is compared
+publisher.submit("slow", record, "slow", submitted-1, key=submitted-1)
+sleep(0.2)
+assert len([1 for _, value in published["slow"] if value==submitted-1])==1
+assert publisher.getStats()["slow"]["unchanged"]==1
+
+array = np.arange(5.0)
+publisher.submit("array", record, "array", array)
+sleep(0.1)
+publisher.submit("array", record, "array", array.copy())
+sleep(0.1)
+publisher.submit("array", record, "array", array+1)
+sleep(0.1)
+assert len(published["array"])==2 and publisher.getStats()["array"]["unchanged"]==1
+assert contentHash((array, [1, "a"]))==contentHash((array.copy(), [1, "a"]))
+assert contentHash(array)!=contentHash(array.astype(np.float32)) and contentHash([1, 2])!=contentHash([[1, 2]])
+print("unchanged values ok")
+
+#a failing publish is counted and does not stop the thread
+def fail():
+    raise RuntimeError("publish failed")
+publisher.submit("broken", fail)
+sleep(0.1)
+publisher.submit("broken", record, "broken", 1)
+sleep(0.1)
+assert publisher.getStats()["broken"]=={"published" : 1, "coalesced" : 0, "unchanged" : 0, "errors" : 1}
+print("errors ok")
+
+#values still waiting when the thread stops are dropped
+publisher.submit("slow", record, "slow", "published")
+while published["slow"][-1][1]!="published":
+    sleep(0.001)
+publisher.submit("slow", record, "slow", "dropped")
+publisher.stop()
+sleep(0.2)
+assert "dropped" not in [value for _, value in published["slow"]]
+print("stop ok")
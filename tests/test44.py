@@ -0,0 +1,27 @@
+'''Checks the pose ring keeps the newest samples in order and interpolates between them'''
+import numpy as np
+from lidarLib.lidarPoseBuffer import lidarPoseBuffer
+
+buffer = lidarPoseBuffer(capacity=5)
+assert buffer.getAt(1)==None and buffer.getLatest()==None
+for index in range(8):
+    assert buffer.add(index, index, 2*index, (350+20*index)%360)
+assert not buffer.add(7, 0, 0, 0), "samples that are not newer are dropped"
+assert len(buffer)==5 and buffer.getNewestTime()==7
+batch = buffer.getBatch()
+assert np.array_equal(batch[lidarPoseBuffer.TIME], [3, 4, 5, 6, 7])
+assert np.array_equal(buffer.getBatch(5)[lidarPoseBuffer.TIME], [6, 7])
+
+#interpolation takes the short way around 0 degrees
+pose = buffer.getAt(3.5)
+assert abs(pose.x-3.5)<1e-9 and abs(pose.y-7)<1e-9
+assert abs(pose.rotation-60)<1e-9, pose.rotation
+#times outside the buffer are clamped
+assert abs(buffer.getAt(0).x-3)<1e-9 and abs(buffer.getAt(100).x-7)<1e-9
+
+x, y, rotation = buffer.getArraysAt(np.array([3.5, 6.25, 100]))
+assert np.allclose(x, [3.5, 6.25, 7]) and np.allclose(y, [7, 12.5, 14]) and np.allclose(rotation, [60, 115, 130])
+
+copy = lidarPoseBuffer(capacity=5)
+assert copy.addBatch(batch)==5 and np.array_equal(copy.getBatch(), batch)
+print("pose buffer ok")
@@ -0,0 +1,49 @@
+'''Checks that lidarClockSync smooths the server time offset, resets on a jump, and that publisher.toNTTime stays monotonic per topic'''
+import time
+import ntcore
+from lidarLib.FRCLidarPublisher import publisher
+from lidarLib.lidarClockSync import lidarClockSync
+
+#samples are made so the server clock is 1000 seconds ahead of time.monotonic plus whatever noise is given
+def update(sync, noise):
+    ntNow = 5_000_000
+    serverTimeOffset = int((time.monotonic()+1000+noise)*1e6)-ntNow
+    return sync.update(serverTimeOffset, ntNow)
+
+sync = lidarClockSync(smoothing=0.1, resetThreshold=0.05)
+assert not sync.isSynced() and sync.toServerTime(1)==None and sync.toLidarTime(1)==None
+assert sync.update(None, 0)==None and sync.resets==0
+
+#the first sample is taken as is, later ones are averaged in
+offset = update(sync, 0)
+assert abs(offset-1000)<0.002 and sync.resets==1 and sync.isSynced()
+offset = update(sync, 0.02)
+assert abs(offset-1000.002)<0.002 and sync.resets==1, offset
+for _ in range(100):
+    offset = update(sync, 0.02)
+assert abs(offset-1000.02)<0.002 and sync.resets==1, offset
+assert abs(sync.toServerTime(10)-(10+offset))<1e-9 and abs(sync.toLidarTime(sync.toServerTime(10))-10)<1e-9
+
+#a jump (the robot restarted) replaces the offset instead of being averaged in
+offset = update(sync, -500)
+assert abs(offset-500)<0.002 and sync.resets==2, offset
+print("clock sync ok")
+
+#network tables drops values stamped older than the last one so each topic only moves forward
+ntPublisher = publisher(0, autoConnect=False)
+now = time.monotonic()
+first = ntPublisher.toNTTime(now, "points")
+assert abs(first-ntcore._now())<5000
+older = ntPublisher.toNTTime(now-1, "points")
+assert older==first+1
+assert ntPublisher.toNTTime(now-1, "tracks")<first-900_000
+later = ntPublisher.toNTTime(now+1, "points")
+assert later>first+900_000 and ntPublisher.toNTTime(None, "points")==later+1
+#without a topic nothing is remembered
+assert ntPublisher.toNTTime(now-2)<first-1_900_000
+print("nt times ok")
+
+#without a server the lidar clock is used for received values
+assert not ntPublisher.isConnected() and ntPublisher.toServerTime(now)==None
+assert abs(ntPublisher.toLidarTime(0, ntcore._now()-250_000)-(time.monotonic()-0.25))<0.01
+print("unsynced publisher ok")
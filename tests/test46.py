@@ -0,0 +1,68 @@
+'''Checks the polar and cart render machines move their scatter artists to the newest map and leave them alone when nothing new arrived, without a display'''
+from multiprocessing import Pipe
+import warnings
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.animation as animation
+import matplotlib.pyplot as plot
+import numpy as np
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarMap import lidarMap
+from lidarLib.renderLib import renderMachine
+from lidarLib.renderLib.renderPipeCap import renderPipeCap
+
+userEnd, machineEnd = Pipe(duplex=True)
+user, machine = renderPipeCap(userEnd), renderPipeCap(machineEnd)
+
+#show does not block without a display, so the machines can be built here and their figures checked
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", UserWarning)
+    renderMachine.polarRenderMachine(machine)
+figure = plot.gcf()
+assert isinstance(figure.animation, animation.FuncAnimation), "the animation was not kept"
+scatter = figure.axes[0].collections[0]
+assert len(scatter.get_offsets())==0
+
+lastRendered = [None]
+assert renderMachine.updateLinePolar(0, machine, scatter, lastRendered)==(scatter,)
+assert len(scatter.get_offsets())==0 and lastRendered==[None]
+
+scan = lidarMap.fromArrays(np.array([0, 90, 180]), np.array([1, 2, 3]), np.array([15, 15, 15]), mapID=3, endTime=1.5)
+user.send(scan)
+renderMachine.updateLinePolar(0, machine, scatter, lastRendered)
+assert lastRendered==[(3, 1.5)]
+assert np.allclose(scatter.get_offsets(), [[0, 1], [np.pi/2, 2], [np.pi, 3]])
+
+#the same map sent again is not drawn again, even if the points were changed locally
+scatter.set_offsets(np.zeros((1, 2)))
+user.send(scan)
+renderMachine.updateLinePolar(0, machine, scatter, lastRendered)
+assert np.array_equal(scatter.get_offsets(), np.zeros((1, 2)))
+plot.close("all")
+print("polar render ok")
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", UserWarning)
+    renderMachine.cartRenderMachine(machine)
+figure = plot.gcf()
+assert isinstance(figure.animation, animation.FuncAnimation), "the animation was not kept"
+scatter = figure.axes[0].collections[0]
+
+hitboxMap = lidarHitboxMap(None, 3, 2, 0.5)
+occupancy = np.zeros(hitboxMap.occupancy.shape, dtype=bool)
+occupancy[1, 2] = occupancy[3, 0] = True
+hitboxMap.addOccupancy(occupancy)
+lastRendered = [None]
+user.send(hitboxMap)
+renderMachine.updateLineCart(0, machine, scatter, lastRendered)
+#nodes are drawn at their (column, row) index
+assert sorted(map(tuple, scatter.get_offsets().tolist()))==[(0, 3), (2, 1)]
+
+scatter.set_offsets(np.zeros((1, 2)))
+user.send(hitboxMap)
+renderMachine.updateLineCart(0, machine, scatter, lastRendered)
+assert np.array_equal(scatter.get_offsets(), np.zeros((1, 2)))
+plot.close("all")
+user.close()
+machine.close()
+print("cart render ok")
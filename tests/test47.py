@@ -0,0 +1,71 @@
+'''Checks the image render machine draws closed nodes over static structure and lines the point overlay up with the cells, without a display'''
+from multiprocessing import Pipe
+import warnings
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.animation as animation
+import matplotlib.pyplot as plot
+import numpy as np
+from lidarLib.constants import constants
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarMap import lidarMap
+from lidarLib.renderLib import renderMachine
+from lidarLib.renderLib.renderPipeCap import renderPipeCap
+
+userEnd, machineEnd = Pipe(duplex=True)
+user, machine = renderPipeCap(userEnd), renderPipeCap(machineEnd)
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", UserWarning)
+    renderMachine.imageRenderMachine(machine)
+figure = plot.gcf()
+assert isinstance(figure.animation, animation.FuncAnimation), "the animation was not kept"
+image = figure.axes[0].images[0]
+artists = [image, figure.axes[0].collections[0]]
+
+#one static node and one closed node
+seed = [[False]*4 for _ in range(3)]
+seed[0][1] = True
+hitboxMap = lidarHitboxMap(seed, 4*constants.mapNodeSizeMeters, 3*constants.mapNodeSizeMeters)
+occupancy = np.zeros((3, 4), dtype=bool)
+occupancy[2, 3] = True
+hitboxMap.addOccupancy(occupancy)
+user.send(hitboxMap)
+
+lastRendered = [None, None]
+assert renderMachine.updateImage(0, machine, artists, lastRendered) is artists
+pixels = np.asarray(image.get_array())
+expected = np.zeros((3, 4), dtype=np.uint8)
+expected[0, 1] = renderMachine.IMAGE_STATIC
+expected[2, 3] = renderMachine.IMAGE_CLOSED
+assert np.array_equal(pixels, expected), pixels
+assert tuple(image.get_extent())==(-0.5, 3.5, -0.5, 2.5)
+assert len(artists[1].get_offsets())==0 and lastRendered[0] is not None and lastRendered[1] is None
+
+#a point inside a cell is drawn inside that cell's square
+size = constants.mapNodeSizeMeters
+scan = lidarMap.fromArrays(np.array([0.0]), np.array([3.5*size]), np.array([15]))
+user.send(scan)
+renderMachine.updateImage(0, machine, artists, lastRendered)
+assert np.allclose(artists[1].get_offsets(), [[3, -0.5]])
+user.send(np.array([[1.25*size, 2.75*size]]))
+renderMachine.updateImage(0, machine, artists, lastRendered)
+column, row = artists[1].get_offsets()[0]
+assert 0.5<=column<1.5 and 1.5<=row<2.5 and np.allclose((column, row), (0.75, 2.25))
+
+#nothing new means nothing is redrawn
+image.set_data(np.zeros((3, 4), dtype=np.uint8))
+artists[1].set_offsets(np.zeros((1, 2)))
+renderMachine.updateImage(0, machine, artists, lastRendered)
+assert not np.asarray(image.get_array()).any() and np.array_equal(artists[1].get_offsets(), np.zeros((1, 2)))
+plot.close("all")
+
+#without points only the image is animated
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", UserWarning)
+    renderMachine.imageRenderMachine(machine, showPoints=False)
+assert len(plot.gcf().axes[0].collections)==0
+plot.close("all")
+user.close()
+machine.close()
+print("image render ok")
@@ -0,0 +1,95 @@
+'''Checks the headless rasterizer puts cells and points in the right pixels, the frame writers read back, and the headless process writes frames until its pipe is closed'''
+import io
+import os
+import shutil
+import tempfile
+from time import sleep
+import numpy as np
+from PIL import Image
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.renderLib import headlessRenderMachine
+from lidarLib.renderLib.headlessRenderMachine import PALETTE, POINT_COLOR, frameRasterizer, frameWriter, initHeadlessMachine
+
+if __name__ == '__main__':
+    #a 3 by 2 meter field of half meter cells drawn 4 pixels to a cell
+    rasterizer = frameRasterizer(4, 3, 2, 0.5)
+    assert (rasterizer.rows, rasterizer.cols, rasterizer.height, rasterizer.width)==(4, 6, 16, 24)
+    seed = [[False]*6 for _ in range(4)]
+    seed[0][0] = True
+    hitboxMap = lidarHitboxMap(seed, 3, 2, 0.5)
+    occupancy = np.zeros((4, 6), dtype=bool)
+    occupancy[3, 5] = True
+    hitboxMap.addOccupancy(occupancy)
+
+    frame = rasterizer.draw(hitboxMap)
+    assert frame.shape==(16, 24, 3) and frame.dtype==np.uint8
+    #y goes up so row 0 is at the bottom of the image
+    assert (frame[12:16, 0:4]==PALETTE[1]).all() and (frame[0:4, 20:24]==PALETTE[2]).all()
+    assert (frame[4:12]==PALETTE[0]).all()
+
+    #a point lands on the pixel that holds it, points off the field are dropped
+    frame = rasterizer.draw(None, np.array([[0.1, 0.1], [2.9, 1.9], [-1, 0.5], [1, 5]]))
+    assert (frame[15, 0]==POINT_COLOR).all() and (frame[0, 23]==POINT_COLOR).all()
+    assert (frame==POINT_COLOR).all(axis=2).sum()==2
+    assert rasterizer.draw() is frame and (frame==PALETTE[0]).all(), "the buffer is reused and cleared"
+    print("rasterizer ok")
+
+    with tempfile.TemporaryDirectory() as directory:
+        first = rasterizer.draw(hitboxMap).copy()
+        second = rasterizer.draw(hitboxMap, np.array([[1.0, 1.0]])).copy()
+
+        writer = frameWriter(os.path.join(directory, "png"), "png", rasterizer.width, rasterizer.height, 10)
+        writer.write(first)
+        writer.write(second)
+        writer.close()
+        names = sorted(os.listdir(os.path.join(directory, "png")))
+        assert names==["frame000000.png", "frame000001.png"] and writer.frames==2
+        for name, expected in zip(names, (first, second)):
+            assert np.array_equal(np.asarray(Image.open(os.path.join(directory, "png", name))), expected), "png is lossless"
+
+        writer = frameWriter(os.path.join(directory, "out.mjpeg"), "mjpeg", rasterizer.width, rasterizer.height, 10, quality=95)
+        writer.write(first)
+        writer.write(second)
+        writer.close()
+        data = open(os.path.join(directory, "out.mjpeg"), "rb").read()
+        jpegs = [b"\xff\xd8"+part for part in data.split(b"\xff\xd8")[1:]]
+        assert len(jpegs)==2
+        for jpeg, expected in zip(jpegs, (first, second)):
+            decoded = np.asarray(Image.open(io.BytesIO(jpeg)).convert("RGB")).astype(int)
+            assert decoded.shape==expected.shape and np.abs(decoded-expected).mean()<8
+
+        if shutil.which("ffmpeg")==None:
+            try:
+                frameWriter(os.path.join(directory, "out.mp4"), "mp4", rasterizer.width, rasterizer.height, 10)
+                raise AssertionError("mp4 was accepted without ffmpeg")
+            except ValueError:
+                pass
+        try:
+            frameWriter(directory, "gif", rasterizer.width, rasterizer.height, 10)
+            raise AssertionError("a unknown format was accepted")
+        except ValueError:
+            pass
+        print("writers ok")
+
+        #png frames are only written when something new arrives, closing the pipe finishes the output
+        path = os.path.join(directory, "machine")
+        process, pipe = initHeadlessMachine(path, "png", fps=20, scale=1, sharedFeed=False)
+        sleep(0.5)
+        fieldMap = lidarHitboxMap()
+        fieldMap.occupancy[0, 0] = True
+        pipe.send(fieldMap)
+        sleep(0.3)
+        pipe.send(np.array([[5.0, 3.0]]))
+        sleep(0.3)
+        pipe.close()
+        process.join(5)
+        assert process.exitcode==0
+        names = sorted(os.listdir(path))
+        assert len(names)==3, names
+        last = np.asarray(Image.open(os.path.join(path, names[-1])))
+        assert (last[-1, 0]==PALETTE[2]).all() and (last==POINT_COLOR).all(axis=2).sum()==1
+        print("headless machine ok")
+
+    rates = headlessRenderMachine.benchmark(frames=20, format="mjpeg", scale=2, points=500)
+    assert rates["drawFps"]>0 and rates["writeFps"]>0 and rates["width"]==frameRasterizer(2).width
+    print("benchmark ok")
@@ -0,0 +1,78 @@
+'''Checks that scans, point arrays and hitbox maps come back out of a renderFeed unchanged, in this process and in a render process'''
+from multiprocessing import Pipe, Process, Queue
+import numpy as np
+from lidarLib.lidarHitboxingMap import lidarHitboxMap
+from lidarLib.lidarMap import lidarMap
+from lidarLib.renderLib.renderFeed import renderFeed, renderGrid
+from lidarLib.renderLib.renderPipeCap import renderPipeCap
+
+
+def readInChild(pipeCap:renderPipeCap, results:Queue):
+    #the render side only ever sees the newest value of each kind
+    while pipeCap.pipe.recv()!="sent":
+        pass
+    hitboxMap = pipeCap._getLatest(lidarHitboxMap)
+    scan = pipeCap._getLatest(lidarMap)
+    results.put((hitboxMap.occupancy, scan.getArrays(), pipeCap._getLatestPoints()))
+    pipeCap.pipe.close()
+
+
+if __name__ == '__main__':
+    feed = renderFeed(maxPoints=100, xHeight=2, yWidth=1, nodeSideLen=0.5)
+    assert feed.readNew()==[]
+
+    hitboxMap = lidarHitboxMap([[True, False, False, False], [False]*4], 2, 1, 0.5)
+    occupancy = np.zeros((2, 4), dtype=bool)
+    occupancy[1, 2] = True
+    hitboxMap.addOccupancy(occupancy)
+    scan = lidarMap.fromArrays(np.array([10.0, 20.0]), np.array([1.0, 2.0]), np.array([15, 3]), mapID=4, startTime=1.0, endTime=1.5)
+    xy = np.array([[0.25, 0.5], [1.5, 0.75], [1.75, 0.25]])
+    assert feed.write(hitboxMap) and feed.write(scan) and feed.write(xy)
+
+    updates = dict(feed.readNew())
+    assert set(updates)=={lidarHitboxMap, lidarMap, np.ndarray}
+    grid = updates[lidarHitboxMap]
+    assert isinstance(grid, renderGrid) and grid.nodeSideLen==0.5
+    assert np.array_equal(grid.occupancy, hitboxMap.occupancy) and np.array_equal(grid.staticMask, hitboxMap.staticMask)
+    angles, distances, qualities = updates[lidarMap].getArrays()
+    assert np.allclose(angles, [10, 20]) and np.allclose(distances, [1, 2]) and np.array_equal(qualities, [15, 3])
+    assert updates[lidarMap].mapID==4 and updates[lidarMap].endTime==1.5
+    assert np.array_equal(updates[np.ndarray], xy)
+    #values are only returned once and the copies do not change when the feed is written again
+    assert feed.readNew()==[]
+    feed.write(xy+1)
+    assert np.array_equal(updates[np.ndarray], xy) and np.array_equal(dict(feed.readNew())[np.ndarray], xy+1)
+
+    #anything the feed can not hold is left for the pipe
+    assert not feed.write(lidarHitboxMap(None, 3, 1, 0.5))
+    assert not feed.write(np.zeros((101, 2))) and not feed.write(np.zeros(3))
+    assert not feed.write("text")
+    print("feed ok")
+
+    #a render pipe cap sends what fits through the feed and everything else over the pipe
+    userEnd, machineEnd = Pipe(duplex=True)
+    user, machine = renderPipeCap(userEnd, feed), renderPipeCap(machineEnd, feed)
+    user.send(xy)
+    assert not machineEnd.poll(0.1), "a point array went over the pipe"
+    user.send("text")
+    assert machine._getLatest(str)=="text" and np.array_equal(machine._getLatestPoints(), xy)
+    user.send(xy*2)
+    assert np.array_equal(machine._get(), xy*2)
+    print("pipe cap ok")
+
+    #the feed goes to the render process with its pipe cap and is read from there
+    results = Queue()
+    process = Process(target=readInChild, args=(machine, results))
+    process.start()
+    user.send(hitboxMap)
+    user.send(lidarMap.fromArrays(np.array([0.0]), np.array([9.0]), np.array([1]), mapID=1))
+    user.send(scan)
+    user.send(xy*3)
+    user.pipe.send("sent")
+    childOccupancy, (angles, distances, qualities), points = results.get(timeout=10)
+    process.join(5)
+    assert process.exitcode==0
+    assert np.array_equal(childOccupancy, hitboxMap.occupancy)
+    assert np.allclose(angles, [10, 20]) and np.allclose(distances, [1, 2]) and np.array_equal(points, xy*3)
+    user.close()
+    print("render process ok")
@@ -0,0 +1,102 @@
+'''Checks the lidar probe finds fake lidars on ptys at whatever baud rate they answer at, skips ports with nothing on them and prints a table of what it found'''
+import os
+import struct
+import termios
+import threading
+import time
+import tty
+from lidarLib.lidarProbe import formatProbeTable, probePorts
+
+#command bytes and config keys of the rplidar protocol the fake lidar answers
+STOP, RESET, GET_INFO, GET_HEALTH, GET_SAMPLERATE, GET_LIDAR_CONF = 0x25, 0x40, 0x50, 0x52, 0x59, 0x84
+SCAN_MODE_COUNT, SCAN_MODE_TYPICAL, SCAN_MODE_NAME = 0x70, 0x7C, 0x7F
+
+
+def fakeLidar(master:int, slave:int, answersAt):
+    """Answers rplidar requests on the master end of a pty, but only while the slave end is set to a baud rate answersAt accepts"""
+    def reply(data:bytes):
+        os.write(master, b"\xa5\x5a"+struct.pack("<L", len(data))+b"\x06"+data)
+
+    buffer = b""
+    while True:
+        try:
+            buffer += os.read(master, 256)
+        except OSError:
+            return
+        speed = termios.tcgetattr(slave)[4]
+        while len(buffer)>=2:
+            if buffer[0]!=0xA5:
+                buffer = buffer[1:]
+                continue
+            command = buffer[1]
+            payload = b""
+            if command==GET_LIDAR_CONF:
+                if len(buffer)<3 or len(buffer)<4+buffer[2]:
+                    break
+                payload = buffer[3:3+buffer[2]]
+                buffer = buffer[4+buffer[2]:]
+            elif command in (STOP, RESET, GET_INFO, GET_HEALTH, GET_SAMPLERATE):
+                buffer = buffer[2:]
+            else:
+                buffer = buffer[1:]
+                continue
+
+            if not answersAt(speed):
+                continue
+            if command==GET_HEALTH:
+                reply(b"\x00\x00\x00")
+            elif command==GET_INFO:
+                reply(bytes([0x18, 29, 1, 7])+bytes(range(16)))
+            elif command==GET_SAMPLERATE:
+                reply(struct.pack("<HH", 500, 125))
+            elif command==GET_LIDAR_CONF:
+                key = struct.unpack("<I", payload[:4])[0]
+                if key==SCAN_MODE_COUNT:
+                    reply(struct.pack("<IH", key, 2))
+                elif key==SCAN_MODE_TYPICAL:
+                    reply(struct.pack("<IH", key, 1))
+                elif key==SCAN_MODE_NAME:
+                    reply(payload[:4]+(b"Standard\0" if payload[4]==0 else b"Sensitivity\0"))
+                else:
+                    reply(payload[:4]+struct.pack("<I", 100))
+
+
+if __name__ == '__main__':
+    assert probePorts([])==[] and probePorts(["/dev/lidarThatIsNotThere"])==[]
+
+    #256000 baud has no termios constant, so that lidar answers at any rate that is not one of the other two
+    answers = [
+        lambda speed: speed==termios.B115200,
+        lambda speed: speed not in (termios.B115200, termios.B1000000),
+        lambda speed: speed==termios.B1000000,
+        None
+    ]
+    ports = []
+    for answersAt in answers:
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        if answersAt:
+            threading.Thread(target=fakeLidar, args=(master, slave, answersAt), daemon=True).start()
+        ports.append(os.ttyname(slave))
+
+    start = time.perf_counter()
+    devices = probePorts(ports)
+    #every port is probed at once, so this takes about as long as the silent port takes to time out at every baud rate
+    assert time.perf_counter()-start<2
+    assert [device["port"] for device in devices]==ports[:3]
+    assert [device["baudrate"] for device in devices]==[115200, 256000, 1000000]
+    for device in devices:
+        assert device["deviceSerialNumber"]=="000102030405060708090A0B0C0D0E0F" and device["model"]==0x18
+        assert device["firmware"]=="1.29" and device["hardware"]==7 and device["health"]=="GOOD"
+        assert device["scanModes"]==["Standard", "Sensitivity"] and device["vendorID"]==None
+        metadata = device["deviceMetadata"]
+        assert metadata["scanModeCount"]==2 and metadata["typicalScanMode"]==1 and metadata["scanModes"][1].name=="Sensitivity"
+    print("probe ok")
+
+    table = formatProbeTable(devices).split("\n")
+    assert len(table)==4 and table[0].split()==["port", "deviceSerialNumber", "model", "firmware", "baudrate", "health", "scanModes"]
+    assert table[2].split()==[ports[1], "000102030405060708090A0B0C0D0E0F", "24", "1.29", "256000", "GOOD", "Standard,", "Sensitivity"]
+    #columns line up
+    assert len({line.index("GOOD") for line in table[1:]})==1 and table[0].index("health")==table[1].index("GOOD")
+    assert formatProbeTable([]).split()==["port", "deviceSerialNumber", "model", "firmware", "baudrate", "health", "scanModes"]
+    print("table ok")